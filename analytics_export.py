@@ -0,0 +1,202 @@
+# src/analytics_export.py
+import json
+import os
+from collections import defaultdict
+from datetime import datetime
+import numpy as np
+from config import Config
+from src.database_handler import DatabaseHandler, decode_features
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+SCALAR_COLUMNS = ['id', 'timestamp', 'product_id', 'defect_type', 'confidence',
+                  'edge_density', 'feature_schema_version', 'image_path']
+
+WATERMARK_FILE = '_watermark.json'
+
+def partition_name(value):
+    """Directory-safe partition value"""
+    return ''.join(c if c.isalnum() or c in '-_.' else '_' for c in str(value or 'UNKNOWN'))
+
+class AnalyticsExporter:
+    """Incremental columnar export of the defects table.
+
+    Rows are written to export_dir/day=YYYY-MM-DD/product=<id>/ partitions
+    as NPZ files, or Parquet when pyarrow is installed and selected.
+    Feature vectors become a float32 (N, D) matrix. A
+    watermark file records the last exported defect id, so each export
+    only appends rows inserted since the previous one.
+    """
+
+    def __init__(self, db_handler=None, export_dir=None, export_format=None):
+        self.db_handler = db_handler or DatabaseHandler()
+        self.export_dir = export_dir or Config.ANALYTICS_EXPORT_DIR
+        export_format = export_format or Config.ANALYTICS_EXPORT_FORMAT
+        if export_format == 'auto':
+            export_format = 'parquet' if pa is not None else 'npz'
+        if export_format not in ('npz', 'parquet'):
+            raise ValueError(f"Unknown export format: {export_format}")
+        if export_format == 'parquet' and pa is None:
+            raise ImportError('Parquet export requires pyarrow')
+        self.export_format = export_format
+
+    def read_watermark(self):
+        """Id of the last exported defect row (0 before the first export)"""
+        path = os.path.join(self.export_dir, WATERMARK_FILE)
+        if not os.path.exists(path):
+            return 0
+        with open(path) as f:
+            return json.load(f)['last_id']
+
+    def _write_watermark(self, last_id):
+        path = os.path.join(self.export_dir, WATERMARK_FILE)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump({'last_id': last_id,
+                       'exported_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')}, f)
+        os.replace(temp_path, path)
+
+    def export(self, batch_size=50000):
+        """Append every defect row inserted since the last export.
+
+        Each database batch is split by day and product and written as
+        one file per partition; the watermark advances after each batch,
+        so an interrupted export resumes from the last complete batch.
+        """
+        os.makedirs(self.export_dir, exist_ok=True)
+        last_id = self.read_watermark()
+        summary = {'rows': 0, 'files': 0, 'first_id': last_id + 1, 'last_id': last_id}
+
+        for rows in self.db_handler.iter_defect_records(last_id, batch_size):
+            partitions = defaultdict(list)
+            for row in rows:
+                partitions[(row[1][:10], partition_name(row[2]))].append(row)
+
+            for (day, product), partition_rows in partitions.items():
+                self._write_partition(day, product, partition_rows)
+                summary['files'] += 1
+
+            summary['rows'] += len(rows)
+            summary['last_id'] = rows[-1][0]
+            self._write_watermark(summary['last_id'])
+
+        return summary
+
+    def _columns(self, rows):
+        """Convert defect rows to numpy columns"""
+        ids, timestamps, products, types, confidences, edge_densities, blobs, versions, paths = zip(*rows)
+        sizes = [len(blob) if blob else 0 for blob in blobs]
+        width = max(sizes) // 4
+        if min(sizes) == max(sizes):
+            matrix = decode_features(blobs, width) if width else np.empty((len(rows), 0), np.float32)
+        else:
+            # Rows without features, or from another schema version, are NaN-padded
+            matrix = np.full((len(rows), width), np.nan, dtype=np.float32)
+            for i, blob in enumerate(blobs):
+                if blob:
+                    matrix[i, :len(blob) // 4] = np.frombuffer(blob, dtype=np.float32)
+
+        return {
+            'id': np.array(ids, dtype=np.int64),
+            'timestamp': np.array([t.replace(' ', 'T') for t in timestamps], dtype='datetime64[s]'),
+            'product_id': np.array([p or '' for p in products], dtype=str),
+            'defect_type': np.array(types, dtype=str),
+            'confidence': np.array(confidences, dtype=np.float64),
+            'edge_density': np.array([e if e is not None else np.nan for e in edge_densities],
+                                     dtype=np.float64),
+            'feature_schema_version': np.array([v or 0 for v in versions], dtype=np.int32),
+            'image_path': np.array([p or '' for p in paths], dtype=str),
+            'features': matrix
+        }
+
+    def _write_partition(self, day, product, rows):
+        directory = os.path.join(self.export_dir, f"day={day}", f"product={product}")
+        os.makedirs(directory, exist_ok=True)
+        # Named by id range, so re-running an interrupted batch overwrites its files
+        base = os.path.join(directory, f"part-{rows[0][0]:012d}-{rows[-1][0]:012d}")
+        columns = self._columns(rows)
+
+        if self.export_format == 'npz':
+            temp_path = f"{base}.tmp.npz"
+            np.savez(temp_path, **columns)
+            os.replace(temp_path, f"{base}.npz")
+            return
+
+        features = columns.pop('features')
+        arrays = {name: pa.array(values) for name, values in columns.items()}
+        for i in range(features.shape[1]):
+            arrays[f"features_{i}"] = pa.array(features[:, i])
+        temp_path = f"{base}.tmp.parquet"
+        pq.write_table(pa.table(arrays), temp_path)
+        os.replace(temp_path, f"{base}.parquet")
+
+    def partition_files(self, start_date=None, end_date=None, product_id=None):
+        """Export files whose partition matches the filters, pruning by directory name"""
+        if not os.path.isdir(self.export_dir):
+            return []
+        start = start_date.strftime('%Y-%m-%d') if start_date else None
+        end = end_date.strftime('%Y-%m-%d') if end_date else None
+        product = partition_name(product_id) if product_id is not None else None
+
+        files = []
+        for day_dir in sorted(os.listdir(self.export_dir)):
+            if not day_dir.startswith('day='):
+                continue
+            day = day_dir[4:]
+            if (start and day < start) or (end and day > end):
+                continue
+            for product_dir in sorted(os.listdir(os.path.join(self.export_dir, day_dir))):
+                if product is not None and product_dir != f"product={product}":
+                    continue
+                directory = os.path.join(self.export_dir, day_dir, product_dir)
+                files.extend(os.path.join(directory, name) for name in sorted(os.listdir(directory))
+                             if name.endswith(('.npz', '.parquet')) and '.tmp.' not in name)
+        return files
+
+    def load(self, start_date=None, end_date=None, product_id=None):
+        """Read matching partitions into one dict of numpy columns, ordered by id.
+
+        features is a float32 (N, D) matrix whose columns follow
+        FEATURE_SCHEMAS[feature_schema_version] (0 for rows stored without
+        features); rows narrower than the widest partition are NaN-padded.
+        """
+        parts = [self.read_file(path) for path in self.partition_files(start_date, end_date, product_id)]
+        if not parts:
+            columns = {name: np.empty(0) for name in SCALAR_COLUMNS}
+            columns['features'] = np.empty((0, 0), dtype=np.float32)
+            return columns
+
+        width = max(part['features'].shape[1] for part in parts)
+        for part in parts:
+            features = part['features']
+            if features.shape[1] < width:
+                padded = np.full((len(features), width), np.nan, dtype=np.float32)
+                padded[:, :features.shape[1]] = features
+                part['features'] = padded
+
+        columns = {name: np.concatenate([part[name] for part in parts])
+                   for name in SCALAR_COLUMNS + ['features']}
+        order = np.argsort(columns['id'], kind='stable')
+        return {name: values[order] for name, values in columns.items()}
+
+    @staticmethod
+    def read_file(path):
+        """Columns of one exported file"""
+        if path.endswith('.npz'):
+            with np.load(path) as data:
+                return {name: data[name] for name in data.files}
+
+        if pa is None:
+            raise ImportError('Reading Parquet exports requires pyarrow')
+        table = pq.read_table(path)
+        columns = {name: table.column(name).to_numpy() for name in SCALAR_COLUMNS}
+        feature_names = sorted((name for name in table.column_names if name.startswith('features_')),
+                               key=lambda name: int(name.split('_')[1]))
+        columns['features'] = np.column_stack(
+            [table.column(name).to_numpy() for name in feature_names]).astype(np.float32) \
+            if feature_names else np.empty((table.num_rows, 0), dtype=np.float32)
+        return columns
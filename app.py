@@ -1,24 +1,59 @@
 # app.py
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for, stream_with_context
+import json
 import os
+import queue
+import time
+import zipfile
+from datetime import datetime
 import cv2
 import numpy as np
 from src.image_acquisition import ImageCapture
-from src.preprocessing import ImagePreprocessor
-from src.edge_detection import EdgeDefectDetector
-from src.texture_analysis import TextureAnalyzer
-from src.defect_classifier import DefectClassifier
 from src.database_handler import DatabaseHandler
+from src.report_generator import ReportGenerator
+from src.inspection_pipeline import InspectionPipeline
+from src.model_registry import ModelRegistry
+from src.online_learning import OnlineTrainer
+from src.defect_classifier import SEVERITY_CLASSES
+from src.batch_processor import BatchInspector, read_zip_images
+from src.upload_store import UploadStore
+from src.stream_inspector import StreamInspector
+from src.color_analysis import ReferenceProfiles
+from src.utils.validation import validate_image_file, validate_product_id
 
 app = Flask(__name__)
 app.config.from_object('config.Config')
 
 # Initialize components
 db_handler = DatabaseHandler()
-image_preprocessor = ImagePreprocessor()
-edge_detector = EdgeDefectDetector()
-texture_analyzer = TextureAnalyzer()
-defect_classifier = DefectClassifier()
+report_generator = ReportGenerator(db_handler)
+image_capture = ImageCapture()
+# Loads the newest model artifact now, then picks up retrained versions in the background
+model_registry = ModelRegistry(app.config['MODEL_PATH'], app.config['MODEL_POLL_INTERVAL'],
+                               app.config['MODEL_SHADOW_FRACTION'])
+model_registry.check()
+model_registry.start()
+# Requests that name a product are also checked against its stored reference color
+reference_profiles = ReferenceProfiles(db_handler, app.config['REFERENCE_PROFILE_MISS_TTL'])
+inspection_pipeline = InspectionPipeline(defect_classifier=model_registry,
+                                         reference_profiles=reference_profiles)
+online_trainer = None
+if app.config['ONLINE_LEARNING']:
+    online_trainer = OnlineTrainer(db_handler, app.config['MODEL_PATH'],
+                                   batch_size=app.config['ONLINE_BATCH_SIZE'],
+                                   checkpoint_interval=app.config['ONLINE_CHECKPOINT_INTERVAL'],
+                                   min_labels=app.config['ONLINE_MIN_LABELS'],
+                                   keep_checkpoints=app.config['ONLINE_KEEP_CHECKPOINTS'],
+                                   poll_interval=app.config['ONLINE_POLL_INTERVAL'])
+    online_trainer.start()
+batch_inspector = BatchInspector(app.config['BATCH_MAX_WORKERS'], inspection_pipeline)
+upload_store = UploadStore(app.config['UPLOAD_FOLDER']) if app.config['PERSIST_UPLOADS'] else None
+stream_inspector = StreamInspector(
+    inspection_pipeline, image_capture,
+    buffer_size=app.config['STREAM_BUFFER_SIZE'],
+    workers=app.config['STREAM_WORKERS'],
+    frame_step=app.config['STREAM_FRAME_STEP'],
+    on_result=lambda frame, results: record_stream_result(results))
 
 @app.route('/')
 def index():
@@ -33,21 +68,211 @@ def inspect():
         image_file = request.files['image']
         if image_file.filename == '':
             return "No selected file", 400
+        product_id = request.form.get('product_id') or None
+        if product_id is not None and not validate_product_id(product_id):
+            return "Invalid product id", 400
         
         if image_file:
-            # Save uploaded image
-            filename = f"inspect_{np.random.randint(1000, 9999)}.jpg"
-            image_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            image_file.save(image_path)
+            # Decode straight from the upload stream
+            data = image_file.read()
+            image = image_capture.decode_image(data)
+            if image is None:
+                return "Could not decode image", 400
+            
+            # Persist the original in the background
+            image_path = save_upload(image_file.filename, data)
             
             # Process image for defects
-            image = cv2.imread(image_path)
-            results = process_image_for_defects(image)
+            results = process_image_for_defects(image, image_path, product_id)
             
             return jsonify(results)
     
     return render_template('inspection.html')
 
+@app.route('/inspect/batch', methods=['POST'])
+def inspect_batch():
+    product_id = request.form.get('product_id') or None
+    if product_id is not None and not validate_product_id(product_id):
+        return "Invalid product id", 400
+    
+    images = []
+    zip_bytes = 0
+    for image_file in request.files.getlist('images'):
+        if image_file.filename == '':
+            continue
+        if image_file.filename.lower().endswith('.zip'):
+            # Limits are checked before the archive is decompressed
+            try:
+                extracted = read_zip_images(
+                    image_file.read(), app.config['ALLOWED_EXTENSIONS'],
+                    max(app.config['MAX_BATCH_IMAGES'] - len(images), 0),
+                    app.config['MAX_BATCH_BYTES'] - zip_bytes)
+            except (ValueError, zipfile.BadZipFile) as e:
+                return str(e), 400
+            zip_bytes += sum(len(data) for _, data in extracted)
+            images.extend(extracted)
+        else:
+            images.append((image_file.filename, image_file.read()))
+    
+    if not images:
+        return "No images uploaded", 400
+    if len(images) > app.config['MAX_BATCH_IMAGES']:
+        return f"Too many images (max {app.config['MAX_BATCH_IMAGES']})", 400
+    
+    results, timing = batch_inspector.inspect(images, product_id)
+    
+    # Save to database in one transaction; the ids let operators label the results
+    recorded = []
+    for (filename, data), result in zip(images, results):
+        if 'error' not in result:
+            result['image_path'] = save_upload(filename, data)
+            recorded.append(result)
+    defect_ids = db_handler.record_defects(
+        [(result['defect_type'], result['confidence'], result) for result in recorded])
+    for result, defect_id in zip(recorded, defect_ids):
+        result['defect_id'] = defect_id
+    
+    return jsonify({'results': results, 'timing': timing})
+
+@app.route('/products/<product_id>/reference', methods=['POST'])
+def save_product_reference(product_id):
+    """Average uploaded images of good parts into the product's reference color"""
+    if not validate_product_id(product_id):
+        return "Invalid product id", 400
+    images = [image_capture.decode_image(image_file.read())
+              for image_file in request.files.getlist('images') if image_file.filename != '']
+    images = [image for image in images if image is not None]
+    if not images:
+        return "No decodable sample images uploaded", 400
+    
+    reference_lab = reference_profiles.save_samples(product_id, images)
+    return jsonify({'product_id': product_id, 'reference_lab': reference_lab.tolist(),
+                    'samples': len(images)})
+
+@app.route('/stream/start', methods=['POST'])
+def start_stream():
+    # A camera index or a video file standing in for the camera
+    source = parse_stream_source(request.values.get('source', '0'))
+    if source is None:
+        return jsonify({'error': "source must be a camera index or a video file in the video folder"}), 400
+    realtime = request.values.get('realtime', 'false').lower() == 'true'
+    
+    if not stream_inspector.start(source, realtime=realtime):
+        return jsonify({'error': f"Could not open source {source}"}), 400
+    return jsonify(stream_inspector.get_stats())
+
+@app.route('/stream/stop', methods=['POST'])
+def stop_stream():
+    stream_inspector.stop()
+    return jsonify(stream_inspector.get_stats())
+
+@app.route('/stream/stats')
+def stream_stats():
+    return jsonify(stream_inspector.get_stats())
+
+@app.route('/stream/events')
+def stream_events():
+    """Server-sent events: one 'result' per inspected frame plus periodic 'stats'"""
+    interval = app.config['STREAM_STATS_INTERVAL']
+    
+    def events():
+        subscriber = stream_inspector.subscribe()
+        try:
+            last_stats = 0.0
+            while True:
+                try:
+                    event, data = subscriber.get(timeout=interval)
+                    yield format_sse(event, data)
+                except queue.Empty:
+                    pass
+                if time.monotonic() - last_stats >= interval:
+                    last_stats = time.monotonic()
+                    yield format_sse('stats', stream_inspector.get_stats())
+        finally:
+            stream_inspector.unsubscribe(subscriber)
+    
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/export/csv')
+def export_csv():
+    """Stream defect rows as CSV, optionally filtered by date range, product and defect type"""
+    try:
+        start_date = parse_date(request.args.get('start_date'))
+        end_date = parse_date(request.args.get('end_date'))
+    except ValueError:
+        return "Dates must be formatted as YYYY-MM-DD", 400
+    defect_types = [t.strip().upper() for t in request.args.get('defect_type', '').split(',') if t.strip()]
+    
+    rows = report_generator.stream_csv(start_date, end_date,
+                                       product_id=request.args.get('product_id') or None,
+                                       defect_types=defect_types)
+    filename = f"defect_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    return Response(stream_with_context(rows), mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+@app.route('/api/charts/defects')
+def defect_chart_series():
+    """Per-day defect counts by type for the last `days` days, for client-side charts"""
+    days = request.args.get('days', 7, type=int)
+    if not 1 <= days <= 366:
+        return "days must be between 1 and 366", 400
+    return jsonify(report_generator.get_chart_series(days))
+
+@app.route('/api/defect_regions')
+def defect_regions():
+    """Stored defect regions filtered by pixel area, largest first"""
+    min_area = request.args.get('min_area', type=int)
+    max_area = request.args.get('max_area', type=int)
+    limit = request.args.get('limit', 100, type=int)
+    if not 1 <= limit <= 10000:
+        return "limit must be between 1 and 10000", 400
+    return jsonify(db_handler.get_defect_regions(min_area, max_area, request.args.get('source'), limit))
+
+@app.route('/metrics/database')
+def database_metrics():
+    return jsonify(db_handler.get_write_stats())
+
+@app.route('/metrics/inspection')
+def inspection_metrics():
+    return jsonify(inspection_pipeline.stage_stats.get_stats())
+
+@app.route('/metrics/models')
+def model_metrics():
+    return jsonify(model_registry.get_stats())
+
+@app.route('/models/promote', methods=['POST'])
+def promote_model():
+    if not model_registry.promote():
+        return "No candidate model", 409
+    return jsonify(model_registry.get_stats())
+
+@app.route('/models/reject', methods=['POST'])
+def reject_model():
+    if not model_registry.reject():
+        return "No candidate model", 409
+    return jsonify(model_registry.get_stats())
+
+@app.route('/defects/<int:defect_id>/label', methods=['POST'])
+def label_defect(defect_id):
+    """Record the defect type an operator confirmed for a stored inspection"""
+    label = (request.form.get('label') or '').strip().upper()
+    if label not in SEVERITY_CLASSES:
+        return f"label must be one of {', '.join(SEVERITY_CLASSES)}", 400
+    try:
+        label_id = db_handler.record_label(defect_id, label, request.form.get('operator'))
+    except ValueError as e:
+        return str(e), 404
+    return jsonify({'label_id': label_id, 'defect_id': defect_id, 'label': label})
+
+@app.route('/metrics/online')
+def online_metrics():
+    if online_trainer is None:
+        return jsonify({'enabled': False})
+    stats = online_trainer.get_stats()
+    stats['enabled'] = True
+    return jsonify(stats)
+
 @app.route('/dashboard')
 def dashboard():
     stats = db_handler.get_defect_statistics()
@@ -63,36 +288,50 @@ def alerts():
     critical_defects = db_handler.get_critical_defects()
     return render_template('alerts.html', defects=critical_defects)
 
-def process_image_for_defects(image):
+def save_upload(filename, data):
+    """Queue a content-addressed copy of an upload, if persistence is enabled"""
+    if upload_store is None:
+        return ''
+    extension = filename.rsplit('.', 1)[1] if validate_image_file(filename) else 'jpg'
+    return upload_store.save(data, extension)
+
+def parse_date(value):
+    """Parse an optional YYYY-MM-DD query parameter"""
+    return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+
+def parse_stream_source(value):
+    """A camera index, or the path of a file under STREAM_VIDEO_FOLDER; None for anything else"""
+    if value.isdigit():
+        return int(value)
+    video_folder = app.config['STREAM_VIDEO_FOLDER']
+    if not video_folder:
+        return None
+    # Resolved first, so absolute paths, '..' and symlinks cannot leave the folder
+    video_folder = os.path.realpath(video_folder)
+    path = os.path.realpath(os.path.join(video_folder, value))
+    if os.path.commonpath([video_folder, path]) != video_folder or not os.path.isfile(path):
+        return None
+    return path
+
+def format_sse(event, data):
+    """Encode one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=float)}\n\n"
+
+def record_stream_result(results):
+    """Persist a live-stream result, if enabled"""
+    if app.config['STREAM_RECORD_RESULTS']:
+        results['image_path'] = ''
+        db_handler.record_defect(results['defect_type'], results['confidence'], results)
+
+def process_image_for_defects(image, image_path='', product_id=None):
     """Main defect detection pipeline"""
-    results = {}
-    
-    # Preprocess image
-    processed_image = image_preprocessor.preprocess(image)
-    
-    # Edge-based defect detection
-    edge_defects = edge_detector.detect_cracks_canny(processed_image)
-    edge_density = np.sum(edge_defects) / (255 * edge_defects.size)
-    results['edge_density'] = edge_density
-    
-    # Texture analysis
-    texture_result, texture_features = texture_analyzer.analyze_texture_defects(processed_image)
-    results['texture_analysis'] = texture_result
-    results['texture_features'] = texture_features.tolist()
-    
-    # Combine features for classification
-    combined_features = np.concatenate([
-        [edge_density],
-        texture_features
-    ])
-    
-    # Classify defect
-    defect_type, confidence = defect_classifier.classify_defect_severity(combined_features)
-    results['defect_type'] = defect_type
-    results['confidence'] = confidence
+    results = inspection_pipeline.analyze(image, product_id)
+    results['image_path'] = image_path
     
-    # Save to database
-    db_handler.record_defect(defect_type, confidence, results)
+    # Written immediately, bypassing write-behind, so the response carries the
+    # defect id that POST /defects/<id>/label needs
+    results['defect_id'] = db_handler.record_defect(results['defect_type'], results['confidence'],
+                                                    results, wait=True)
     
     return results
 
@@ -1,7 +1,7 @@
 # scripts/backup_data.py
 #!/usr/bin/env python3
 
-import shutil
+import sqlite3
 import os
 from datetime import datetime
 from config import Config
@@ -23,8 +23,12 @@ def backup_database():
     backup_filename = f"defects_backup_{timestamp}.db"
     backup_path = os.path.join(backup_dir, backup_filename)
     
-    # Copy database file
-    shutil.copy2(Config.DATABASE_PATH, backup_path)
+    # Use SQLite's online backup so commits still in the WAL file are included
+    source = sqlite3.connect(Config.DATABASE_PATH)
+    destination = sqlite3.connect(backup_path)
+    source.backup(destination)
+    destination.close()
+    source.close()
     
     # Clean up old backups (keep only last 10)
     backup_files = sorted([f for f in os.listdir(backup_dir) if f.startswith('defects_backup_')])
@@ -0,0 +1,114 @@
+# src/batch_processor.py
+import io
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+import numpy as np
+from src.inspection_pipeline import InspectionPipeline
+
+# Each worker process builds its own pipeline once and reuses it for every image
+_worker_pipeline = None
+
+# Pipeline attributes copied from the parent, so workers gate frames the same way
+WORKER_SETTINGS = ('texture_mode', 'pyramid', 'edge_threshold', 'texture_threshold', 'cascade',
+                   'cascade_confidence', 'cascade_audit_fraction', 'defect_regions')
+
+def _init_worker(settings=None):
+    """Create the per-process inspection pipeline with the parent pipeline's settings"""
+    global _worker_pipeline
+    # One OpenCV thread per process, the pool already uses every core
+    cv2.setNumThreads(1)
+    _worker_pipeline = InspectionPipeline()
+    for name, value in (settings or {}).items():
+        setattr(_worker_pipeline, name, value)
+
+def _inspect_encoded_image(filename, data, classifier=None, product_id=None, reference_lab=None):
+    """Decode and inspect one encoded image inside a worker process"""
+    start = time.perf_counter()
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        return {'filename': filename, 'error': 'Could not decode image'}
+
+    # The parent's model drives the cascade's early exits, as it does for /inspect.
+    # Full classification happens in the parent, once for the whole batch
+    if classifier is not None:
+        _worker_pipeline.defect_classifier = classifier
+    results = _worker_pipeline.extract_features(image, product_id, reference_lab)
+    results['filename'] = filename
+    results['processing_time'] = time.perf_counter() - start
+    return results
+
+def read_zip_images(data, allowed_extensions, max_images=None, max_bytes=None):
+    """Extract (filename, bytes) pairs for every image inside a zip archive.
+
+    The image count and total uncompressed size are checked against
+    max_images and max_bytes from the archive's directory before anything
+    is decompressed, and ValueError is raised when either is exceeded.
+    """
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        entries = [info for info in archive.infolist()
+                   if not info.is_dir() and '.' in info.filename
+                   and info.filename.rsplit('.', 1)[1].lower() in allowed_extensions]
+        if max_images is not None and len(entries) > max_images:
+            raise ValueError(f"Too many images (max {max_images})")
+        # Reads stop at each entry's declared size, so the sum bounds memory use
+        if max_bytes is not None and sum(info.file_size for info in entries) > max_bytes:
+            raise ValueError(f"Images too large (max {max_bytes} bytes uncompressed)")
+        return [(info.filename, archive.read(info)) for info in entries]
+
+class BatchInspector:
+    def __init__(self, max_workers=None, pipeline=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.pipeline = pipeline or InspectionPipeline()
+        self.executor = None
+
+    def get_executor(self):
+        """Start the worker pool on first use"""
+        if self.executor is None:
+            settings = {name: getattr(self.pipeline, name) for name in WORKER_SETTINGS}
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                initializer=_init_worker, initargs=(settings,))
+        return self.executor
+
+    def inspect(self, images, product_id=None):
+        """Inspect a list of (filename, encoded bytes) pairs of one product in parallel"""
+        start = time.perf_counter()
+        executor = self.get_executor()
+
+        # Workers have no database or model registry, so the product's reference
+        # color and the current model are sent from here. A registry sends its live model
+        reference_lab = self.pipeline.reference_profile(product_id)
+        classifier = getattr(self.pipeline.defect_classifier, 'live', self.pipeline.defect_classifier)
+        futures = [executor.submit(_inspect_encoded_image, filename, data, classifier,
+                                   product_id, reference_lab)
+                   for filename, data in images]
+        results = [future.result() for future in futures]
+        self.pipeline.classify([r for r in results if 'feature_vector' in r])
+        # Workers keep their own pipelines, so report their stage exits and audits here
+        for r in results:
+            if 'exit_stage' in r:
+                self.pipeline.stage_stats.record(r['exit_stage'], r['processing_time'])
+            if 'early_exit_agreed' in r:
+                self.pipeline.stage_stats.record_audit(r['early_exit_agreed'])
+
+        total_time = time.perf_counter() - start
+        processing_times = [r['processing_time'] for r in results if 'processing_time' in r]
+
+        timing = {
+            'image_count': len(images),
+            'workers': self.max_workers,
+            'total_time': total_time,
+            'images_per_second': len(images) / total_time if total_time > 0 else 0,
+            'mean_image_time': float(np.mean(processing_times)) if processing_times else 0,
+            'sum_image_time': float(np.sum(processing_times)) if processing_times else 0
+        }
+
+        return results, timing
+
+    def shutdown(self):
+        """Stop the worker pool"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
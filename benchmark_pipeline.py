@@ -0,0 +1,567 @@
+# scripts/benchmark_pipeline.py
+#!/usr/bin/env python3
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+import cv2
+import numpy as np
+from config import Config
+from src.inspection_pipeline import InspectionPipeline, StageExitStats
+from src.batch_processor import BatchInspector
+from src.image_acquisition import ImageCapture
+from src.upload_store import UploadStore
+from src.stream_inspector import StreamInspector
+from src.database_handler import DatabaseHandler, encode_features, parse_feature_text
+from src.preprocessing import ImagePreprocessor
+from src.texture_analysis import TextureAnalyzer
+from src.report_generator import ChartCache, ReportGenerator
+from src.defect_classifier import DefectClassifier
+from src.color_analysis import ColorAnalyzer, ReferenceProfiles
+from src.frame_context import FrameContext
+from train_model import make_training_data
+from src import lbp
+
+def make_sample_images(count, width=1024, height=768, scratch_every=3, seed=42):
+    """Create synthetic product images, every scratch_every-th one with a simulated scratch"""
+    rng = np.random.RandomState(seed)
+    images = []
+    for i in range(count):
+        image = rng.randint(90, 160, (height, width, 3), dtype=np.uint8)
+        image = cv2.GaussianBlur(image, (7, 7), 0)
+        if i % scratch_every == 0:
+            x = rng.randint(0, width - 200)
+            y = rng.randint(0, height)
+            cv2.line(image, (x, y), (x + 200, y + rng.randint(-40, 40)), (20, 20, 20), 2)
+        images.append(image)
+    return images
+
+def benchmark_batch(count=32, workers=None):
+    """Compare sequential single-image inspection with the batch worker pool"""
+    images = make_sample_images(count)
+    encoded = [(f"image_{i}.jpg", cv2.imencode('.jpg', image)[1].tobytes())
+               for i, image in enumerate(images)]
+
+    pipeline = InspectionPipeline()
+    start = time.perf_counter()
+    for _, data in encoded:
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        pipeline.analyze(image)
+    sequential_time = time.perf_counter() - start
+
+    inspector = BatchInspector(workers)
+    # Warm up the pool so process start-up is not counted
+    inspector.inspect(encoded[:inspector.max_workers])
+    _, timing = inspector.inspect(encoded)
+    inspector.shutdown()
+
+    print(f"Batch inspection ({count} images, {inspector.max_workers} workers, {os.cpu_count()} cores)")
+    print(f"  Sequential: {sequential_time:.2f}s ({count / sequential_time:.1f} images/s)")
+    print(f"  Batch:      {timing['total_time']:.2f}s ({timing['images_per_second']:.1f} images/s)")
+    print(f"  Speed-up:   {sequential_time / timing['total_time']:.2f}x")
+
+def benchmark_ingest(count=50):
+    """Compare save-then-imread ingest with in-memory decoding"""
+    images = make_sample_images(count)
+    encoded = [cv2.imencode('.jpg', image)[1].tobytes() for image in images]
+    capture = ImageCapture()
+
+    with tempfile.TemporaryDirectory() as upload_folder:
+        start = time.perf_counter()
+        for i, data in enumerate(encoded):
+            image_path = os.path.join(upload_folder, f"inspect_{i}.jpg")
+            with open(image_path, 'wb') as f:
+                f.write(data)
+            cv2.imread(image_path)
+        disk_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for data in encoded:
+            capture.decode_image(data)
+        memory_time = time.perf_counter() - start
+
+        store = UploadStore(os.path.join(upload_folder, 'store'))
+        start = time.perf_counter()
+        for data in encoded:
+            capture.decode_image(data)
+            store.save(data)
+        persisted_time = time.perf_counter() - start
+        store.shutdown()
+
+    print(f"Upload ingest ({count} images)")
+    print(f"  Save + imread:          {1000 * disk_time / count:.2f} ms/image")
+    print(f"  imdecode:               {1000 * memory_time / count:.2f} ms/image")
+    print(f"  imdecode + async store: {1000 * persisted_time / count:.2f} ms/image")
+
+def benchmark_preprocess(count=50):
+    """Compare the colour preprocessing pipeline with the grayscale-native one"""
+    images = make_sample_images(count)
+    color_preprocessor = ImagePreprocessor()
+    gray_preprocessor = ImagePreprocessor(grayscale=True)
+
+    start = time.perf_counter()
+    for image in images:
+        cv2.cvtColor(color_preprocessor.preprocess(image), cv2.COLOR_BGR2GRAY)
+    color_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for image in images:
+        gray_preprocessor.preprocess(image)
+    gray_time = time.perf_counter() - start
+
+    print(f"Preprocessing ({count} images)")
+    print(f"  Colour + gray conversion: {1000 * color_time / count:.2f} ms/image")
+    print(f"  Grayscale-native:         {1000 * gray_time / count:.2f} ms/image")
+
+def benchmark_texture(count=20):
+    """Per-frame texture analysis time for each GLCM backend and quantization"""
+    preprocessor = ImagePreprocessor(grayscale=True)
+    frames = [preprocessor.preprocess(image) for image in make_sample_images(count)]
+
+    print(f"Texture analysis ({count} frames, {frames[0].shape[1]}x{frames[0].shape[0]})")
+    for backend, levels in [('mahotas', 256), ('numpy', 256), ('numpy', 64), ('numpy', 32)]:
+        analyzer = TextureAnalyzer(glcm_backend=backend, glcm_levels=levels)
+        start = time.perf_counter()
+        for frame in frames:
+            analyzer.analyze_texture_defects(frame)
+        elapsed = time.perf_counter() - start
+        print(f"  {backend:8s} {levels:3d} levels: {1000 * elapsed / count:.2f} ms/frame")
+
+    # Tiled mode as the pipeline runs it: global features plus the heat map
+    analyzer = TextureAnalyzer()
+    start = time.perf_counter()
+    for frame in frames:
+        frame = FrameContext(frame)
+        analyzer.analyze_texture_defects(frame)
+        analyzer.analyze_texture_tiles(frame)
+    elapsed = time.perf_counter() - start
+    print(f"  tiled ({analyzer.tile_size}px tiles, {analyzer.tile_stride}px stride, "
+          f"{analyzer.tile_levels} levels, with global features): {1000 * elapsed / count:.2f} ms/frame")
+
+def benchmark_lbp(count=10):
+    """Per-frame LBP time for mahotas and the built-in riu2 engine"""
+    from mahotas.features.lbp import lbp_transform
+    preprocessor = ImagePreprocessor(grayscale=True)
+    frames = [preprocessor.preprocess(image) for image in make_sample_images(count)]
+    
+    print(f"LBP ({count} frames, {frames[0].shape[1]}x{frames[0].shape[0]})")
+    # mahotas.features.lbp enumerates all 2**points codes, so time its transform only
+    start = time.perf_counter()
+    for frame in frames:
+        lbp_transform(frame, 3, 24)
+    elapsed = time.perf_counter() - start
+    print(f"  mahotas lbp_transform r=3 p=24: {1000 * elapsed / count:.2f} ms/frame")
+    
+    for sampling, radius, points in [('mahotas', 3, 24), ('bilinear', 3, 24),
+                                     ('bilinear', (1, 2, 3), (8, 16, 24))]:
+        start = time.perf_counter()
+        for frame in frames:
+            lbp.lbp_histogram(frame, radius, points, sampling)
+        elapsed = time.perf_counter() - start
+        print(f"  riu2 {sampling:8s} r={radius} p={points}: {1000 * elapsed / count:.2f} ms/frame")
+
+def benchmark_color(count=20, class_counts=(3, 8, 16)):
+    """Color defect detection: one cv2.inRange per range versus one pass of per-channel lookup tables"""
+    frames = [FrameContext(image) for image in make_sample_images(count)]
+    for frame in frames:
+        frame.hsv
+    
+    print(f"Color defects ({count} frames, {frames[0].shape[1]}x{frames[0].shape[0]}, HSV precomputed)")
+    for classes in class_counts:
+        analyzer = ColorAnalyzer()
+        if classes != len(analyzer.defect_types):
+            width = 180 // classes
+            analyzer.set_defect_color_ranges({f"hue_{i}": ([i * width, 40, 40], [(i + 1) * width + 5, 255, 255])
+                                              for i in range(classes)})
+        ranges = [(np.array(lower, dtype=np.uint8), np.array(upper, dtype=np.uint8))
+                  for lower, upper in analyzer.defect_color_ranges.values()]
+        
+        start = time.perf_counter()
+        for frame in frames:
+            [np.count_nonzero(cv2.inRange(frame.hsv, lower, upper)) for lower, upper in ranges]
+        per_range = time.perf_counter() - start
+        start = time.perf_counter()
+        for frame in frames:
+            analyzer.detect_color_defects(frame)
+        lookup = time.perf_counter() - start
+        print(f"  {classes:2d} classes: inRange per range {1000 * per_range / count:.2f} ms/frame, "
+              f"lookup table {1000 * lookup / count:.2f} ms/frame")
+
+def benchmark_discoloration(count=20, width=800, height=600):
+    """Discoloration: float64 BGR distances to the frame mean versus float32 LAB buffers and a profile"""
+    images = make_sample_images(count, width, height)
+    analyzer = ColorAnalyzer()
+    reference_lab = analyzer.reference_color(images[:5])
+    
+    def float64_bgr(image):
+        # The previous implementation
+        reference_color = np.mean(image, axis=(0, 1))
+        color_diff = np.sqrt(np.sum((image - reference_color) ** 2, axis=2))
+        color_diff_normalized = color_diff / max(np.max(color_diff), 1e-12)
+        mask = (color_diff_normalized > 0.3).astype(np.uint8) * 255
+        return mask, np.count_nonzero(mask) / mask.size
+    
+    # A cached profile, as after the first frame of a product
+    analyzer.reference_profiles = ReferenceProfiles(db_handler=None)
+    analyzer.reference_profiles.profiles['PROD001'] = reference_lab
+    variants = [('float64 BGR', float64_bgr),
+                ('float32 LAB', lambda image: analyzer.detect_discoloration(image, product_id='PROD001'))]
+    print(f"Discoloration ({count} frames, {width}x{height}, LAB conversion included)")
+    for name, detect in variants:
+        detect(images[0])
+        start = time.perf_counter()
+        for image in images:
+            detect(image)
+        elapsed = time.perf_counter() - start
+        tracemalloc.start()
+        detect(images[0])
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"  {name}: {1000 * elapsed / count:.2f} ms/frame, peak allocation {peak / 1e6:.2f} MB")
+
+def compare_inspection_modes(modes, train_count=60, test_count=100, scratch_every=10):
+    """Classify labelled held-out frames with each pipeline mode against full resolution.
+    
+    A classifier is trained on full-resolution features of labelled frames,
+    then every mode classifies held-out frames of which one in scratch_every
+    is scratched. modes maps a name to InspectionPipeline keyword arguments.
+    """
+    train_images = make_sample_images(train_count, scratch_every=3, seed=1)
+    train_labels = np.where(np.arange(train_count) % 3 == 0, 'MAJOR', 'GOOD')
+    test_images = make_sample_images(test_count, scratch_every=scratch_every, seed=2)
+    test_labels = np.where(np.arange(test_count) % scratch_every == 0, 'MAJOR', 'GOOD')
+    
+    classifier = DefectClassifier('nystroem')
+    full = InspectionPipeline(defect_classifier=classifier, pyramid=False, cascade=False)
+    classifier.train_classifier([full.extract_features(image)['feature_vector'] for image in train_images],
+                                train_labels)
+    
+    print(f"  {test_count} held-out frames, 1 in {scratch_every} scratched")
+    pipelines = [('full resolution', full)] + [
+        (name, InspectionPipeline(defect_classifier=classifier, **options)) for name, options in modes.items()]
+    expected = None
+    for name, pipeline in pipelines:
+        pipeline.stage_stats = StageExitStats()
+        start = time.perf_counter()
+        verdicts = np.array([pipeline.analyze(image)['defect_type'] for image in test_images])
+        elapsed = time.perf_counter() - start
+        if expected is None:
+            expected = verdicts
+        exits = ', '.join(f"{stage} {stats['exit_rate']:.0%} ({stats['latency_mean_ms']:.1f} ms)"
+                          for stage, stats in pipeline.stage_stats.get_stats()['stages'].items())
+        print(f"  {name:17s}: {1000 * elapsed / test_count:6.2f} ms/frame, "
+              f"accuracy {np.mean(verdicts == test_labels):.3f}, "
+              f"agreement {np.mean(verdicts == expected):.3f}; exits: {exits}")
+
+def benchmark_pyramid():
+    """Coarse-to-fine screening versus full-resolution inspection on mostly good frames"""
+    print(f"Pyramid inspection ({Config.PYRAMID_LEVELS} levels, {Config.PYRAMID_REGION_SIZE}px regions)")
+    compare_inspection_modes({'pyramid': {'pyramid': True, 'cascade': False}})
+
+def benchmark_cascade():
+    """Cheap-first cascade with a confidence-gated edge exit, alone and behind pyramid screening"""
+    print(f"Cascade inspection (edge-only verdicts exit at confidence >= {Config.CASCADE_CONFIDENCE})")
+    compare_inspection_modes({'cascade': {'pyramid': False, 'cascade': True},
+                              'pyramid + cascade': {'pyramid': True, 'cascade': True}})
+
+def benchmark_stream(count=150, fps=30, buffer_size=4):
+    """Sustained live-inspection throughput on a video file played at camera speed"""
+    with tempfile.TemporaryDirectory() as video_folder:
+        video_path = os.path.join(video_folder, 'line.avi')
+        writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*'MJPG'), fps, (1024, 768))
+        for image in make_sample_images(count):
+            writer.write(image)
+        writer.release()
+        
+        inspector = StreamInspector(buffer_size=buffer_size)
+        inspector.start(video_path, realtime=True)
+        inspector.wait()
+        stats = inspector.get_stats()
+    
+    print(f"Live stream ({count} frames at {fps} FPS, buffer of {buffer_size})")
+    print(f"  Capture:    {stats['capture_fps']:.1f} FPS")
+    print(f"  Inspection: {stats['processing_fps']:.1f} FPS, {1000 * stats['mean_latency']:.1f} ms mean latency")
+    print(f"  Dropped:    {stats['dropped_frames']} of {stats['captured_frames']} frames")
+
+def benchmark_database(count=2000, threads=4):
+    """record_defect throughput with per-row commits and with write-behind group commits"""
+    import threading
+    results = {'product_id': 'PROD001', 'edge_density': 0.1, 'texture_features': [0.0] * 5}
+    
+    print(f"Defect inserts ({count} rows from {threads} threads)")
+    with tempfile.TemporaryDirectory() as db_folder:
+        for write_behind in (False, True):
+            handler = DatabaseHandler(os.path.join(db_folder, f"defects_{write_behind}.db"),
+                                      write_behind=write_behind)
+            
+            def record():
+                for _ in range(count // threads):
+                    handler.record_defect('MINOR', 0.5, results)
+            
+            workers = [threading.Thread(target=record) for _ in range(threads)]
+            start = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            handler.flush()
+            elapsed = time.perf_counter() - start
+            handler.close()
+            
+            label = 'Write-behind' if write_behind else 'Per-row commit'
+            print(f"  {label:14s}: {count / elapsed:.0f} inserts/s")
+
+def benchmark_regions(count=30, inserts=2000):
+    """Edge region extraction per frame, and defect inserts carrying their regions"""
+    pipeline = InspectionPipeline(pyramid=False, cascade=False, defect_regions=True)
+    frames = [FrameContext(pipeline.preprocessor.preprocess(image)) for image in make_sample_images(count)]
+    for frame in frames:
+        pipeline.edge_detector.detect_cracks_canny(frame)
+    
+    start = time.perf_counter()
+    regions = [pipeline.edge_detector.extract_defect_regions(frame, pipeline.region_min_area,
+                                                             pipeline.region_max_per_frame)
+               for frame in frames]
+    elapsed = time.perf_counter() - start
+    print(f"Defect regions ({count} frames, Canny edges precomputed)")
+    print(f"  extraction: {1000 * elapsed / count:.2f} ms/frame, "
+          f"{sum(map(len, regions)) / count:.1f} regions/frame")
+    
+    results = {'product_id': 'PROD001', 'edge_density': 0.1, 'texture_features': [0.0] * 5,
+               'defect_regions': [{'x': 10 * i, 'y': 20, 'width': 30, 'height': 4, 'area': 100 + i,
+                                   'elongation': 7.5, 'score': 0.6} for i in range(10)]}
+    with tempfile.TemporaryDirectory() as db_folder:
+        for write_behind in (False, True):
+            handler = DatabaseHandler(os.path.join(db_folder, f"regions_{write_behind}.db"),
+                                      write_behind=write_behind)
+            start = time.perf_counter()
+            for _ in range(inserts):
+                handler.record_defect('MINOR', 0.5, results)
+            handler.flush()
+            elapsed = time.perf_counter() - start
+            handler.close()
+            label = 'Write-behind' if write_behind else 'Per-row commit'
+            print(f"  {label:14s}: {inserts / elapsed:.0f} defects/s with "
+                  f"{len(results['defect_regions'])} regions each")
+
+def benchmark_dashboard(count=500000, repeats=20):
+    """Dashboard statistics latency from raw DATE(timestamp) scans and from the rollups"""
+    import sqlite3
+    rng = np.random.RandomState(0)
+    types = np.array(['GOOD', 'MINOR', 'MAJOR', 'CRITICAL'])
+    
+    with tempfile.TemporaryDirectory() as db_folder:
+        handler = DatabaseHandler(os.path.join(db_folder, 'defects.db'), write_behind=False)
+        # 30 days of history ending now
+        offsets = rng.randint(0, 30 * 86400, count)
+        rows = [(str(types[i % 4]), float(c), f"-{int(o)} seconds")
+                for i, (c, o) in enumerate(zip(rng.rand(count), offsets))]
+        with handler.pool.connection() as conn:
+            conn.executemany("INSERT INTO defects (defect_type, confidence, timestamp) "
+                             "VALUES (?, ?, DATETIME('now', ?))", rows)
+        
+        def raw_statistics(conn):
+            conn.execute("SELECT COUNT(*) FROM defects WHERE DATE(timestamp) = DATE('now')").fetchone()
+            conn.execute("SELECT defect_type, COUNT(*) FROM defects WHERE DATE(timestamp) = DATE('now') "
+                         "GROUP BY defect_type").fetchall()
+            conn.execute("SELECT DATE(timestamp), COUNT(*) FROM defects WHERE timestamp >= DATE('now', '-7 days') "
+                         "GROUP BY DATE(timestamp) ORDER BY DATE(timestamp)").fetchall()
+        
+        with handler.pool.connection() as conn:
+            start = time.perf_counter()
+            for _ in range(repeats):
+                raw_statistics(conn)
+            raw_time = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        for _ in range(repeats):
+            handler.get_defect_statistics()
+        rollup_time = time.perf_counter() - start
+        handler.close()
+    
+    print(f"Dashboard statistics ({count} defect rows)")
+    print(f"  Raw scans: {1000 * raw_time / repeats:.2f} ms")
+    print(f"  Rollups:   {1000 * rollup_time / repeats:.2f} ms")
+
+def benchmark_features(count=200000):
+    """Database size and feature matrix load time for str(list) text and float32 BLOBs"""
+    features = np.random.RandomState(0).rand(count, 6).astype(np.float32)
+    
+    print(f"Feature storage ({count} rows of {features.shape[1]} features)")
+    with tempfile.TemporaryDirectory() as db_folder:
+        for storage in ('text', 'blob'):
+            db_path = os.path.join(db_folder, f"defects_{storage}.db")
+            handler = DatabaseHandler(db_path, write_behind=False)
+            with handler.pool.connection() as conn:
+                if storage == 'text':
+                    conn.executemany("INSERT INTO defects (defect_type, confidence, texture_features) "
+                                     "VALUES ('GOOD', 0.9, ?)", [(str(row.tolist()),) for row in features])
+                else:
+                    conn.executemany("INSERT INTO defects (defect_type, confidence, feature_vector, "
+                                     "feature_schema_version) VALUES ('GOOD', 0.9, ?, 1)",
+                                     [(encode_features(row),) for row in features])
+            
+            start = time.perf_counter()
+            if storage == 'text':
+                with handler.pool.connection() as conn:
+                    matrix = np.array([parse_feature_text(text) for (text,) in
+                                       conn.execute('SELECT texture_features FROM defects ORDER BY id')])
+            else:
+                matrix = handler.get_feature_matrix()
+            elapsed = time.perf_counter() - start
+            handler.close()
+            
+            assert matrix.shape == features.shape
+            size = os.path.getsize(db_path)
+            print(f"  {storage:4s}: {size / 1e6:6.1f} MB, {1000 * elapsed:7.1f} ms to load")
+
+def benchmark_charts(repeats=10):
+    """Defect chart time for a fresh pyplot figure at 300 dpi, the reused Agg figure and a cache hit"""
+    import matplotlib.pyplot as plt
+    report = {'date': '2024-03-01', 'defect_breakdown': {'GOOD': 120, 'MINOR': 14, 'MAJOR': 5, 'CRITICAL': 1}}
+    
+    with tempfile.TemporaryDirectory() as folder:
+        start = time.perf_counter()
+        for i in range(repeats):
+            plt.figure(figsize=(10, 6))
+            plt.bar(list(report['defect_breakdown']), list(report['defect_breakdown'].values()))
+            plt.savefig(os.path.join(folder, f"pyplot_{i}.png"), dpi=300, bbox_inches='tight')
+            plt.close()
+        pyplot_time = time.perf_counter() - start
+        
+        handler = DatabaseHandler(os.path.join(folder, 'defects.db'), write_behind=False)
+        generator = ReportGenerator(handler, ChartCache(os.path.join(folder, 'charts')))
+        start = time.perf_counter()
+        for i in range(repeats):
+            generator.create_defect_chart(report, os.path.join(folder, f"agg_{i}.png"))
+        render_time = time.perf_counter() - start
+        
+        generator.create_defect_chart(report)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            generator.create_defect_chart(report)
+        cached_time = time.perf_counter() - start
+        handler.close()
+    
+    print(f"Defect chart ({repeats} renders)")
+    print(f"  pyplot, 300 dpi: {1000 * pyplot_time / repeats:.1f} ms")
+    print(f"  Reused figure:   {1000 * render_time / repeats:.1f} ms")
+    print(f"  Cache hit:       {1000 * cached_time / repeats:.2f} ms")
+
+def benchmark_classify(sizes=(1, 1000), repeats=200):
+    """Per-sample SVC latency: separate predict and predict_proba calls per vector vs classify_batch"""
+    features, labels = make_training_data()
+    classifier = DefectClassifier()
+    classifier.train_svm_classifier(features, labels)
+    
+    def classify_each(batch):
+        # The previous per-vector path: scale, predict, then predict_proba again
+        for vector in batch:
+            scaled = classifier.scaler.transform([vector])
+            classifier.model.predict(scaled)
+            np.max(classifier.model.predict_proba(scaled))
+    
+    print("SVC classification latency per sample")
+    for size in sizes:
+        batch = features[np.random.RandomState(size).randint(0, len(features), size)]
+        runs = max(1, repeats // size)
+        timings = {}
+        for label, classify in (('Per vector', classify_each), ('Batch', classifier.classify_batch)):
+            start = time.perf_counter()
+            for _ in range(runs):
+                classify(batch)
+            timings[label] = (time.perf_counter() - start) / (runs * size)
+        print(f"  N={size:<5d} per vector: {1e6 * timings['Per vector']:8.1f} us, "
+              f"batch: {1e6 * timings['Batch']:7.1f} us")
+
+def benchmark_models(train_samples=4000, test_samples=2000, label_noise=0.1, repeats=1000):
+    """Held-out accuracy and single-vector p50/p99 latency of each classifier backend"""
+    train_features, train_labels = make_training_data(train_samples, seed=42)
+    test_features, test_labels = make_training_data(test_samples, seed=7)
+    # Real inspector labels are noisy, which is what inflates the SVC's support vectors
+    rng = np.random.RandomState(0)
+    train_labels = np.array(train_labels)
+    noisy = rng.rand(len(train_labels)) < label_noise
+    train_labels[noisy] = rng.choice(np.unique(train_labels), noisy.sum())
+    
+    print(f"Classifier backends ({len(train_labels)} training samples with {label_noise:.0%} label noise, "
+          f"{len(test_labels)} held out)")
+    for backend in ('svc', 'nystroem'):
+        classifier = DefectClassifier(backend)
+        start = time.perf_counter()
+        classifier.train_classifier(train_features, train_labels)
+        train_time = time.perf_counter() - start
+        
+        predicted, _ = classifier.classify_batch(test_features)
+        accuracy = np.mean(predicted == np.array(test_labels))
+        
+        latencies = []
+        for vector in test_features[np.arange(repeats) % len(test_features)]:
+            start = time.perf_counter()
+            classifier.classify_defect_severity(vector)
+            latencies.append(time.perf_counter() - start)
+        p50, p99 = 1e6 * np.percentile(latencies, [50, 99])
+        
+        size = (f"{len(classifier.model.support_vectors_)} support vectors" if backend == 'svc'
+                else f"{len(classifier.model.components_)} components")
+        print(f"  {backend:8s}: accuracy {accuracy:.3f}, p50 {p50:6.1f} us, p99 {p99:6.1f} us, "
+              f"train {train_time:.2f}s ({size})")
+
+def benchmark_online(history=20000, new_labels=200, batch_size=256):
+    """Folding new labels into the model: full retrain on all labels versus partial_fit on the new ones"""
+    features, labels = make_training_data(history + new_labels, seed=42)
+    # make_training_data groups samples by class; operator labels arrive interleaved
+    order = np.random.RandomState(0).permutation(len(labels))
+    features, labels = features[order], np.array(labels)[order]
+    new = slice(history, None)
+    print(f"Learning {new_labels} new labels on top of {history}")
+    
+    for backend in ('svc', 'sgd'):
+        classifier = DefectClassifier(backend)
+        start = time.perf_counter()
+        classifier.train_classifier(features, labels)
+        print(f"  {backend:4s} full retrain:   {time.perf_counter() - start:8.3f}s")
+    
+    classifier = DefectClassifier('sgd')
+    for offset in range(0, history, batch_size):
+        classifier.partial_fit(features[offset:offset + batch_size], labels[offset:offset + batch_size])
+    start = time.perf_counter()
+    classifier.partial_fit(features[new], labels[new])
+    print(f"  sgd  partial_fit:     {time.perf_counter() - start:8.3f}s")
+    
+    test_features, test_labels = make_training_data(2000, seed=7)
+    predicted, _ = classifier.classify_batch(test_features)
+    print(f"  sgd  held-out accuracy after {-(-history // batch_size) + 1} mini-batches: "
+          f"{np.mean(predicted == np.array(test_labels)):.3f}")
+
+BENCHMARKS = {
+    'batch': benchmark_batch,
+    'ingest': benchmark_ingest,
+    'preprocess': benchmark_preprocess,
+    'texture': benchmark_texture,
+    'lbp': benchmark_lbp,
+    'pyramid': benchmark_pyramid,
+    'cascade': benchmark_cascade,
+    'color': benchmark_color,
+    'discoloration': benchmark_discoloration,
+    'stream': benchmark_stream,
+    'database': benchmark_database,
+    'dashboard': benchmark_dashboard,
+    'regions': benchmark_regions,
+    'features': benchmark_features,
+    'charts': benchmark_charts,
+    'classify': benchmark_classify,
+    'models': benchmark_models,
+    'online': benchmark_online
+}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the defect inspection pipeline')
+    parser.add_argument('benchmarks', nargs='*', default=list(BENCHMARKS),
+                        help=f"benchmarks to run ({', '.join(BENCHMARKS)})")
+    args = parser.parse_args()
+
+    for name in args.benchmarks:
+        BENCHMARKS[name]()
@@ -1,46 +1,183 @@
 # src/color_analysis.py
+import threading
+import time
 import cv2
 import numpy as np
+from src.frame_context import FrameContext
+from src.utils.image_utils import extract_regions
+
+class ColorDefectMap:
+    """Per-pixel color defect classes of one image, from a single LUT pass.
+    
+    label_map holds a bitmask per pixel, with bit i set when the pixel
+    falls in the range of defect_types[i]. Ranges may overlap, so a
+    pixel can carry several bits. Boolean masks are only built when
+    mask() is called.
+    """
+    
+    def __init__(self, label_map, defect_types, pixel_counts, defect_pixels):
+        self.label_map = label_map
+        self.defect_types = defect_types
+        self.pixel_counts = pixel_counts
+        self.defect_pixels = defect_pixels
+        self.masks = {}
+    
+    @property
+    def total_pixels(self):
+        return self.label_map.size
+    
+    @property
+    def total_percentage(self):
+        """Share of pixels matching at least one defect color"""
+        return self.defect_pixels / self.total_pixels
+    
+    def percentage(self, defect_type):
+        return self.pixel_counts[defect_type] / self.total_pixels
+    
+    def mask(self, defect_type):
+        """0/255 uint8 mask of one defect type, built on first request"""
+        if defect_type not in self.masks:
+            bit = 1 << self.defect_types.index(defect_type)
+            self.masks[defect_type] = ((self.label_map & bit) != 0).astype(np.uint8) * 255
+        return self.masks[defect_type]
+    
+    def regions(self, defect_type, min_area=20, max_regions=50):
+        """Connected regions of one defect color, in the format of extract_regions"""
+        regions = extract_regions(self.mask(defect_type), min_area, max_regions)
+        for region in regions:
+            region['source'] = defect_type
+        return regions
+    
+    def summary(self):
+        """Pixel count and percentage per defect type"""
+        return {defect_type: {'pixel_count': count, 'percentage': count / self.total_pixels}
+                for defect_type, count in self.pixel_counts.items()}
+
+def mean_lab_color(images):
+    """Mean LAB color over sample images of a good product, for a reference profile"""
+    means = [cv2.mean(FrameContext.wrap(image).lab)[:3] for image in images]
+    return np.mean(means, axis=0).astype(np.float32)
+
+class ReferenceProfiles:
+    """Per-product reference LAB colors from the products table, cached in memory.
+    
+    Products without a profile are remembered for miss_ttl seconds, so
+    frames of such a product do not query the database each time, while
+    a profile saved later, also by another process, is still picked up.
+    """
+    
+    def __init__(self, db_handler, miss_ttl=60.0):
+        self.db_handler = db_handler
+        self.miss_ttl = miss_ttl
+        self.profiles = {}
+        self.misses = {}  # product_id -> time.monotonic() when the miss expires
+        self.lock = threading.Lock()
+    
+    def get(self, product_id):
+        """float32 (L, a, b) reference of a product, or None"""
+        with self.lock:
+            if product_id in self.profiles:
+                return self.profiles[product_id]
+            if self.misses.get(product_id, 0.0) > time.monotonic():
+                return None
+        profile = self.db_handler.get_reference_profile(product_id)
+        with self.lock:
+            if profile is None:
+                self.misses[product_id] = time.monotonic() + self.miss_ttl
+            else:
+                self.profiles[product_id] = profile
+                self.misses.pop(product_id, None)
+        return profile
+    
+    def save(self, product_id, reference_lab):
+        reference_lab = np.asarray(reference_lab, dtype=np.float32)
+        self.db_handler.save_reference_profile(product_id, reference_lab)
+        with self.lock:
+            self.profiles[product_id] = reference_lab
+            self.misses.pop(product_id, None)
+    
+    def save_samples(self, product_id, images):
+        """Store the mean color of good sample images as the product's profile; returns it"""
+        if not images:
+            raise ValueError('At least one sample image is needed for a reference profile')
+        reference_lab = mean_lab_color(images)
+        self.save(product_id, reference_lab)
+        return reference_lab
 
 class ColorAnalyzer:
-    def __init__(self):
-        self.defect_color_ranges = {
+    MAX_COLOR_CLASSES = 16
+    DISCOLORATION_THRESHOLD = 0.3  # Share of the largest color distance in the frame
+    
+    def __init__(self, reference_profiles=None):
+        self.reference_profiles = reference_profiles
+        # Distance buffers are reused between frames, one set per thread
+        self.buffers = threading.local()
+        self.set_defect_color_ranges({
             'rust': ([0, 50, 50], [20, 255, 255]),  # HSV range for rust
             'discoloration': ([0, 0, 0], [180, 50, 150]),  # Dark discoloration
             'stain': ([0, 0, 100], [180, 50, 200])  # Light stains
-        }
+        })
     
-    def detect_color_defects(self, image):
-        """Detect defects based on color anomalies"""
-        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-        
-        defect_masks = {}
-        total_defect_pixels = 0
+    def set_defect_color_ranges(self, ranges):
+        """Replace the HSV ranges and rebuild the per-channel lookup tables"""
+        if len(ranges) > self.MAX_COLOR_CLASSES:
+            raise ValueError(f"At most {self.MAX_COLOR_CLASSES} color defect classes are supported")
+        self.defect_color_ranges = dict(ranges)
+        self.defect_types = list(self.defect_color_ranges)
+        dtype = np.uint8 if len(ranges) <= 8 else np.uint16
         
-        for defect_type, (lower, upper) in self.defect_color_ranges.items():
-            lower = np.array(lower, dtype=np.uint8)
-            upper = np.array(upper, dtype=np.uint8)
-            
-            # Create mask for defect color
-            mask = cv2.inRange(hsv, lower, upper)
-            defect_pixels = np.count_nonzero(mask)
-            
-            defect_masks[defect_type] = {
-                'mask': mask,
-                'pixel_count': defect_pixels,
-                'percentage': defect_pixels / (image.shape[0] * image.shape[1])
-            }
-            
-            total_defect_pixels += defect_pixels
+        # Each range is a box in HSV, so a pixel is inside it exactly when each
+        # channel is inside the range's interval: one 256-entry table per
+        # channel holds the classes whose interval contains that value
+        self.color_luts = [np.zeros(256, dtype=dtype) for _ in range(3)]
+        for bit, (lower, upper) in enumerate(self.defect_color_ranges.values()):
+            for lut, low, high in zip(self.color_luts, lower, upper):
+                lut[low:high + 1] |= 1 << bit
+    
+    def label_colors(self, image):
+        """Bitmask of matching defect color classes for every pixel"""
+        h, s, v = (cv2.LUT(plane, lut) for plane, lut in zip(cv2.split(FrameContext.wrap(image).hsv),
+                                                              self.color_luts))
+        cv2.bitwise_and(h, s, dst=h)
+        return cv2.bitwise_and(h, v, dst=h)
+    
+    def detect_color_defects(self, image):
+        """Detect defects based on color anomalies.
         
-        total_percentage = total_defect_pixels / (image.shape[0] * image.shape[1])
+        Returns (ColorDefectMap, total_percentage). A pixel matching several
+        overlapping ranges is counted once in total_percentage.
+        """
+        label_map = self.label_colors(image)
+        # One histogram of the label map gives every class count, whatever the
+        # number of classes: each class sums the occupied bins with its bit set
+        classes = len(self.defect_types)
+        histogram = self._label_histogram(label_map, 1 << classes)
+        values = np.flatnonzero(histogram)
+        bits = (values[:, None] >> np.arange(classes)) & 1
+        counts = histogram[values] @ bits
+        pixel_counts = {defect_type: int(count) for defect_type, count in zip(self.defect_types, counts)}
+        defect_pixels = label_map.size - int(histogram[0])
+        defects = ColorDefectMap(label_map, self.defect_types, pixel_counts, defect_pixels)
+        return defects, defects.total_percentage
+    
+    @staticmethod
+    def _label_histogram(label_map, bins):
+        """Pixel count of every label value.
         
-        return defect_masks, total_percentage
+        Most pixels usually share one label, and counting them all into one
+        bin serializes the histogram on that bin. The value at the center
+        is taken as the common one: it is masked out of the histogram and
+        counted with countNonZero, which gives exact counts whatever it is.
+        """
+        common = int(label_map[label_map.shape[0] // 2, label_map.shape[1] // 2])
+        others = cv2.compare(label_map, common, cv2.CMP_NE)
+        histogram = cv2.calcHist([label_map], [0], others, [bins], [0, bins]).ravel()
+        histogram[common] = label_map.size - cv2.countNonZero(others)
+        return histogram
     
     def analyze_color_consistency(self, image):
         """Analyze color consistency across the image"""
-        lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
-        l, a, b = cv2.split(lab)
+        l, a, b = FrameContext.wrap(image).lab_planes
         
         # Calculate color standard deviations
         l_std = np.std(l)
@@ -52,25 +189,49 @@ class ColorAnalyzer:
         
         return color_variation, (l_std, a_std, b_std)
     
-    def detect_discoloration(self, image, reference_color=None):
-        """Detect discoloration compared to reference color"""
-        if reference_color is None:
-            # Use average color as reference
-            reference_color = np.mean(image, axis=(0, 1))
+    def reference_color(self, images):
+        """Mean LAB color over sample images of a good product, for a reference profile"""
+        return mean_lab_color(images)
+    
+    def _distance_buffers(self, shape):
+        """Reusable float32 (H, W, 3) difference and (H, W) distance arrays"""
+        if getattr(self.buffers, 'shape', None) != shape:
+            self.buffers.shape = shape
+            self.buffers.difference = np.empty(shape + (3,), dtype=np.float32)
+            self.buffers.distance = np.empty(shape, dtype=np.float32)
+        return self.buffers.difference, self.buffers.distance
+    
+    def detect_discoloration(self, image, reference_color=None, product_id=None, reference_lab=None):
+        """Detect discoloration compared to a reference color.
+        
+        Distances are measured in LAB space. The reference is reference_color
+        (BGR) if given, else reference_lab (a profile already looked up),
+        else the stored profile of product_id, else the frame's own mean color. Pixels further than DISCOLORATION_THRESHOLD of the
+        largest distance in the frame are marked. The work is done in
+        preallocated float32 buffers, so only the returned mask is allocated.
+        """
+        frame = FrameContext.wrap(image)
+        lab = frame.lab
         
-        # Calculate color difference for each pixel
-        color_diff = np.sqrt(np.sum((image - reference_color) ** 2, axis=2))
+        if reference_color is not None:
+            reference_bgr = np.clip(np.round(reference_color), 0, 255).astype(np.uint8).reshape(1, 1, 3)
+            reference_lab = cv2.cvtColor(reference_bgr, cv2.COLOR_BGR2LAB)[0, 0]
+        elif reference_lab is None and product_id is not None and self.reference_profiles is not None:
+            reference_lab = self.reference_profiles.get(product_id)
+        if reference_lab is None:
+            reference_lab = cv2.mean(lab)[:3]
         
-        # Normalize and threshold
-        max_diff = np.max(color_diff)
-        if max_diff > 0:
-            color_diff_normalized = color_diff / max_diff
-        else:
-            color_diff_normalized = color_diff
+        # Squared distances; comparing against a squared threshold avoids the sqrt
+        difference, distance = self._distance_buffers(lab.shape[:2])
+        cv2.subtract(lab, tuple(float(value) for value in reference_lab) + (0.0,),
+                     dst=difference, dtype=cv2.CV_32F)
+        cv2.multiply(difference, difference, dst=difference)
+        cv2.transform(difference, np.ones((1, 3), dtype=np.float32), dst=distance)
         
-        # Create discoloration mask
-        discoloration_mask = (color_diff_normalized > 0.3).astype(np.uint8) * 255
+        max_distance = cv2.minMaxLoc(distance)[1]
+        threshold = self.DISCOLORATION_THRESHOLD ** 2 * max_distance
+        discoloration_mask = cv2.compare(distance, threshold, cv2.CMP_GT)
         
-        discoloration_percentage = np.count_nonzero(discoloration_mask) / discoloration_mask.size
+        discoloration_percentage = cv2.countNonZero(discoloration_mask) / discoloration_mask.size
         
-        return discoloration_mask, discoloration_percentage
\ No newline at end of file
+        return discoloration_mask, discoloration_percentage
@@ -4,15 +4,71 @@ import os
 class Config:
     SECRET_KEY = 'industrial-defect-secret-key-2024'
     DATABASE_PATH = 'database/defects.db'
+    DB_POOL_SIZE = 4
+    DB_POOL_TIMEOUT = 1.0  # Seconds to wait for a pooled connection before opening an extra one
+    DB_WRITE_BEHIND = True  # Queue record_defect inserts and group-commit them
+    DB_BATCH_SIZE = 100  # Commit once this many rows are queued...
+    DB_FLUSH_INTERVAL_MS = 50  # ...or this long after the first queued row
+    ANALYTICS_EXPORT_DIR = 'exports/defects'
+    ANALYTICS_EXPORT_FORMAT = 'auto'  # 'npz', 'parquet' (needs pyarrow) or 'auto'
+    CHART_CACHE_DIR = 'reports/charts'
+    CHART_CACHE_SIZE = 64  # Rendered charts kept on disk, least recently used evicted first
+    CHART_DPI = 100
     UPLOAD_FOLDER = 'static/uploads'
     MODEL_PATH = 'models'
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'bmp'}
+    PERSIST_UPLOADS = True  # Keep originals, written asynchronously by content hash
     
     # Image processing settings
     IMAGE_WIDTH = 800
     IMAGE_HEIGHT = 600
     CANNY_THRESHOLD1 = 50
     CANNY_THRESHOLD2 = 150
+    GRAYSCALE_PREPROCESSING = True  # Keep one uint8 plane through the pipeline
+    GLCM_BACKEND = 'numpy'  # 'numpy' (built-in engine) or 'mahotas'
+    GLCM_LEVELS = 256  # Gray levels for texture GLCMs, e.g. 32 or 64 for speed
+    TEXTURE_MODE = 'global'  # 'global' or 'tiled' (adds a per-tile heat map)
+    TEXTURE_TILE_SIZE = 100
+    TEXTURE_TILE_STRIDE = 50
+    TEXTURE_TILE_LEVELS = 16
+    PYRAMID_INSPECTION = False  # Screen a coarse pyramid level; only suspicious frames run at full resolution
+    PYRAMID_LEVELS = 2  # pyrDown steps to the screening level (800x600 -> 200x150)
+    PYRAMID_REGION_SIZE = 100  # Screening region edge, in full-resolution pixels
+    PYRAMID_EDGE_THRESHOLD = 0.02  # Coarse edge density that escalates a region
+    PYRAMID_TEXTURE_THRESHOLD = 0.6  # Coarse texture defect probability that escalates a region
+    CASCADE_INSPECTION = False  # Classify on edge density first; confident frames skip texture analysis
+    CASCADE_CONFIDENCE = 0.95  # Lowest edge-only confidence that ends inspection early
+    CASCADE_AUDIT_FRACTION = 0.05  # Share of early exits also run through the full pipeline to measure agreement
+    DEFECT_REGIONS = False  # Extract connected edge regions per frame and store them in defect_regions
+    REGION_MIN_AREA = 20  # Pixels; smaller edge fragments are ignored
+    REGION_MAX_PER_FRAME = 50  # Largest regions kept per frame
+    REFERENCE_PROFILE_MISS_TTL = 60.0  # Seconds before a product without a reference color is looked up again
+    
+    # Batch inspection settings
+    BATCH_MAX_WORKERS = None  # None uses every CPU core
+    MAX_BATCH_IMAGES = 500
+    MAX_BATCH_BYTES = 512 * 1024 * 1024  # Total uncompressed size of the images in uploaded zips
+    
+    # Live stream inspection settings
+    STREAM_BUFFER_SIZE = 4  # Frames held for analysis; the oldest is dropped when full
+    STREAM_WORKERS = 1
+    STREAM_FRAME_STEP = 1  # Inspect every Nth captured frame
+    STREAM_RECORD_RESULTS = True
+    STREAM_STATS_INTERVAL = 1.0  # Seconds between SSE stats events
+    STREAM_VIDEO_FOLDER = 'videos'  # Only video files under this folder can be streamed; None allows cameras only
+    
+    # Severity model
+    CLASSIFIER_BACKEND = 'svc'  # 'svc' (RBF SVC) or 'nystroem' (kernel approximation, fixed inference cost)
+    NYSTROEM_COMPONENTS = 100  # Landmark samples for the nystroem backend
+    SGD_ALPHA = 1e-4  # L2 regularization of the incremental sgd backend
+    MODEL_POLL_INTERVAL = 5.0  # Seconds between checks of MODEL_PATH for new artifacts
+    MODEL_SHADOW_FRACTION = 0.0  # 0 swaps new models in at once; otherwise score them on this share of batches first
+    ONLINE_LEARNING = False  # Update an sgd model from operator labels and checkpoint it to MODEL_PATH
+    ONLINE_BATCH_SIZE = 256
+    ONLINE_POLL_INTERVAL = 10.0  # Seconds between checks for new labels
+    ONLINE_CHECKPOINT_INTERVAL = 300.0  # Seconds between checkpoints while labels arrive
+    ONLINE_MIN_LABELS = 200  # Labels learned before the first checkpoint
+    ONLINE_KEEP_CHECKPOINTS = 5  # Newest online checkpoints kept on disk; at least 1
     
     # Defect classification thresholds
     MINOR_DEFECT_THRESHOLD = 0.3
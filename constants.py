@@ -40,4 +40,10 @@ DB_SETTINGS = {
     'MAX_RECORDS': 10000,
     'BACKUP_INTERVAL': 24,  # hours
     'CLEANUP_DAYS': 30      # days
+}
+
+# Stored feature vectors (float32 BLOBs); bump the version when the layout changes
+FEATURE_SCHEMA_VERSION = 1
+FEATURE_SCHEMAS = {
+    1: ['edge_density', 'contrast', 'correlation', 'energy', 'homogeneity', 'defect_probability']
 }
\ No newline at end of file
@@ -1,146 +1,818 @@
 # src/database_handler.py
+import atexit
+import queue
 import sqlite3
 import os
-from datetime import datetime
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+import numpy as np
 from config import Config
+from src.utils.constants import FEATURE_SCHEMAS, FEATURE_SCHEMA_VERSION
+
+# Applied to every pooled connection. WAL lets readers run alongside the
+# writer, and NORMAL synchronous only fsyncs at checkpoints under WAL.
+CONNECTION_PRAGMAS = [
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA busy_timeout=5000',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-16000'
+]
+
+INSERT_DEFECT_SQL = '''
+    INSERT INTO defects (product_id, defect_type, confidence, timestamp, edge_density,
+                         feature_vector, feature_schema_version, image_path)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+INSERT_REGION_SQL = '''
+    INSERT INTO defect_regions (defect_id, source, x, y, width, height, area, elongation, score)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+# Hourly and daily per-defect-type counts, kept current by triggers on the
+# defects table so dashboard queries never scan raw inspections. Their DDL
+# lives in schema.sql between these markers and is applied from there
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'database', 'schema.sql')
+ROLLUP_BEGIN = '-- BEGIN rollups'
+ROLLUP_END = '-- END rollups'
+
+def load_rollup_schema(schema_path=SCHEMA_PATH):
+    """The rollup section of schema.sql, as a script"""
+    with open(schema_path) as f:
+        schema = f.read()
+    start = schema.index(ROLLUP_BEGIN)
+    return schema[start:schema.index(ROLLUP_END, start)]
+
+def parse_feature_text(text):
+    """Parse a legacy texture_features value stored as str(list), e.g. '[0.1, 0.2]'"""
+    text = (text or '').strip().strip('[]')
+    if not text:
+        return np.empty(0, dtype=np.float32)
+    return np.array(text.split(','), dtype=np.float32)
+
+def encode_features(values):
+    """Feature vector as a float32 BLOB"""
+    return np.ascontiguousarray(values, dtype=np.float32).tobytes()
+
+def decode_features(blobs, width):
+    """(N, width) float32 matrix from N BLOBs of width floats each, in one copy"""
+    buffer = bytearray().join(blobs)
+    if len(buffer) != len(blobs) * width * 4:
+        raise ValueError(f"Feature BLOBs do not all hold {width} float32 values")
+    return np.frombuffer(buffer, dtype=np.float32).reshape(len(blobs), width)
+
+def insert_defects(conn, batch, return_ids=False):
+    """Insert (defect row, region rows) pairs; returns the defect ids if needed for regions or asked for.
+    
+    Without regions the defects go in with one executemany. Otherwise, or
+    when return_ids is set, each defect is inserted on its own to learn
+    its id, and all of the batch's regions follow in one executemany, in
+    the same transaction.
+    """
+    if not return_ids and not any(regions for _, regions in batch):
+        conn.executemany(INSERT_DEFECT_SQL, [row for row, _ in batch])
+        return None
+    
+    defect_ids = []
+    region_rows = []
+    for row, regions in batch:
+        defect_id = conn.execute(INSERT_DEFECT_SQL, row).lastrowid
+        defect_ids.append(defect_id)
+        region_rows.extend((defect_id,) + region for region in regions)
+    conn.executemany(INSERT_REGION_SQL, region_rows)
+    return defect_ids
+
+def day_bounds(start_date, end_date):
+    """Timestamp strings bounding whole days, for index-friendly range queries"""
+    return (start_date.strftime('%Y-%m-%d 00:00:00'),
+            (end_date + timedelta(days=1)).strftime('%Y-%m-%d 00:00:00'))
+
+class ConnectionPool:
+    """Thread-safe pool of persistent SQLite connections.
+
+    A borrower that waits longer than timeout seconds for a free
+    connection gets an extra one, closed when returned, so long-held
+    connections such as a streaming export cannot starve other threads.
+    """
+
+    def __init__(self, db_path, size=4, timeout=1.0):
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self.idle = queue.LifoQueue()
+        self.created = 0
+        self.overflow = 0
+        self.lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=5.0, check_same_thread=False)
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _acquire(self):
+        """(connection, pooled) where pooled is False for an overflow connection"""
+        try:
+            return self.idle.get_nowait(), True
+        except queue.Empty:
+            pass
+        with self.lock:
+            if self.created < self.size:
+                self.created += 1
+                return self._connect(), True
+        try:
+            return self.idle.get(timeout=self.timeout), True
+        except queue.Empty:
+            with self.lock:
+                self.overflow += 1
+            return self._connect(), False
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; the transaction commits on success and rolls back on error"""
+        conn, pooled = self._acquire()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            if pooled:
+                self.idle.put(conn)
+            else:
+                conn.close()
+
+    def close(self):
+        """Close every idle connection"""
+        while True:
+            try:
+                conn = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self.lock:
+                self.created -= 1
+
+class DefectWriter:
+    """Write-behind queue that group-commits defect inserts.
+
+    Rows are committed in one transaction once batch_size rows are waiting
+    or flush_interval seconds after the first row of a batch arrived.
+    """
+
+    RATE_WINDOW = 10.0  # Seconds of history behind inserts_per_second
+
+    def __init__(self, pool, batch_size=100, flush_interval=0.05):
+        self.pool = pool
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rows = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+        self.recent_batches = deque()
+
+    def put(self, row, regions=()):
+        """Queue a row and its region rows for insertion, starting the writer thread on first use"""
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='defect-writer', daemon=True)
+                self.thread.start()
+        self.rows.put((row, regions))
+
+    def flush(self):
+        """Block until every queued row has been committed"""
+        self.rows.join()
+
+    def shutdown(self):
+        """Commit pending rows and stop the writer thread"""
+        with self.lock:
+            thread, self.thread = self.thread, None
+        if thread is not None:
+            self.rows.put(None)
+            thread.join()
+
+    def _run(self):
+        while True:
+            row = self.rows.get()
+            if row is None:
+                self.rows.task_done()
+                break
+
+            batch = [row]
+            stop = False
+            deadline = time.perf_counter() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    row = self.rows.get(timeout=remaining) if remaining > 0 else self.rows.get_nowait()
+                except queue.Empty:
+                    break
+                if row is None:
+                    self.rows.task_done()
+                    stop = True
+                    break
+                batch.append(row)
+
+            try:
+                self._write(batch)
+            finally:
+                for _ in batch:
+                    self.rows.task_done()
+            if stop:
+                break
+
+    def _write(self, batch):
+        try:
+            with self.pool.connection() as conn:
+                insert_defects(conn, batch)
+        except Exception as e:
+            # Anything escaping here would kill the writer and hang flush()
+            print(f"Error writing {len(batch)} defect records: {e}")
+            with self.lock:
+                self.failed += len(batch)
+            return
+
+        now = time.perf_counter()
+        with self.lock:
+            self.written += len(batch)
+            self.batches += 1
+            self.recent_batches.append((now, len(batch)))
+            while self.recent_batches and now - self.recent_batches[0][0] > self.RATE_WINDOW:
+                self.recent_batches.popleft()
+
+    def get_stats(self):
+        """Write-behind counters and the insert rate over the last RATE_WINDOW seconds"""
+        now = time.perf_counter()
+        with self.lock:
+            recent = [rows for at, rows in self.recent_batches if now - at <= self.RATE_WINDOW]
+            return {
+                'queued_rows': self.rows.qsize(),
+                'written_rows': self.written,
+                'failed_rows': self.failed,
+                'batches': self.batches,
+                'mean_batch_size': self.written / self.batches if self.batches else 0.0,
+                'inserts_per_second': sum(recent) / self.RATE_WINDOW
+            }
 
 class DatabaseHandler:
-    def __init__(self):
-        self.db_path = Config.DATABASE_PATH
+    def __init__(self, db_path=None, write_behind=None):
+        self.db_path = db_path or Config.DATABASE_PATH
+        self.pool = ConnectionPool(self.db_path, Config.DB_POOL_SIZE, Config.DB_POOL_TIMEOUT)
         self.init_database()
+        
+        if write_behind is None:
+            write_behind = Config.DB_WRITE_BEHIND
+        self.writer = None
+        if write_behind:
+            self.writer = DefectWriter(self.pool, Config.DB_BATCH_SIZE,
+                                       Config.DB_FLUSH_INTERVAL_MS / 1000.0)
+            # Queued inserts must reach the database before the process exits
+            atexit.register(self.close)
     
     def init_database(self):
         """Initialize database with required tables"""
-        os.makedirs('database', exist_ok=True)
-        
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Create defects table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS defects (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                product_id TEXT,
-                defect_type TEXT NOT NULL,
-                confidence REAL NOT NULL,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                edge_density REAL,
-                texture_features TEXT,
-                image_path TEXT
-            )
-        ''')
-        
-        # Create products table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS products (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                product_id TEXT UNIQUE NOT NULL,
-                product_type TEXT,
-                specification TEXT,
-                created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Create system_logs table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS system_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                log_level TEXT,
-                module TEXT,
-                message TEXT
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
-    
-    def record_defect(self, defect_type, confidence, additional_data=None):
-        """Record a new defect in the database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            
+            # Create defects table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS defects (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    product_id TEXT,
+                    defect_type TEXT NOT NULL,
+                    confidence REAL NOT NULL,
+                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    edge_density REAL,
+                    texture_features TEXT,
+                    image_path TEXT,
+                    feature_vector BLOB,
+                    feature_schema_version INTEGER
+                )
+            ''')
+            
+            # Feature vectors used to be stored as str(list) in texture_features
+            cursor.execute('PRAGMA table_info(defects)')
+            columns = {row[1] for row in cursor.fetchall()}
+            feature_columns_added = 'feature_vector' not in columns
+            if feature_columns_added:
+                cursor.execute('ALTER TABLE defects ADD COLUMN feature_vector BLOB')
+                cursor.execute('ALTER TABLE defects ADD COLUMN feature_schema_version INTEGER')
+            
+            # Create products table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS products (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    product_id TEXT UNIQUE NOT NULL,
+                    product_type TEXT,
+                    specification TEXT,
+                    created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    reference_lab BLOB,
+                    reference_updated TIMESTAMP
+                )
+            ''')
+            cursor.execute('PRAGMA table_info(products)')
+            if 'reference_lab' not in {row[1] for row in cursor.fetchall()}:
+                cursor.execute('ALTER TABLE products ADD COLUMN reference_lab BLOB')
+                cursor.execute('ALTER TABLE products ADD COLUMN reference_updated TIMESTAMP')
+            
+            # Create system_logs table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS system_logs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    log_level TEXT,
+                    module TEXT,
+                    message TEXT
+                )
+            ''')
+            
+            # Operator-confirmed severities, consumed by online learning
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS defect_labels (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    defect_id INTEGER NOT NULL REFERENCES defects(id),
+                    label TEXT NOT NULL,
+                    operator TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_labels_defect ON defect_labels(defect_id)')
+            
+            # Connected defect regions, for localization and queries by size
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS defect_regions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    defect_id INTEGER NOT NULL REFERENCES defects(id),
+                    source TEXT NOT NULL,
+                    x INTEGER NOT NULL,
+                    y INTEGER NOT NULL,
+                    width INTEGER NOT NULL,
+                    height INTEGER NOT NULL,
+                    area INTEGER NOT NULL,
+                    elongation REAL,
+                    score REAL
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_regions_defect ON defect_regions(defect_id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_regions_area ON defect_regions(area)')
+            
+            # quality_reports used to be a table nothing wrote to; it is now a view
+            # over the daily rollups, so keep any old rows under another name
+            cursor.execute("SELECT type FROM sqlite_master WHERE name = 'quality_reports'")
+            existing = cursor.fetchone()
+            if existing and existing[0] == 'table':
+                cursor.execute('ALTER TABLE quality_reports RENAME TO quality_reports_legacy')
+            
+            cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'defect_rollups_daily'")
+            rollups_exist = cursor.fetchone()[0] > 0
+            cursor.executescript(load_rollup_schema())
+        
+        # Databases created before the rollups need them built from history once
+        if not rollups_exist:
+            self.rebuild_rollups()
+        if feature_columns_added:
+            self.migrate_feature_vectors()
+    
+    def rebuild_rollups(self):
+        """Recompute the hourly and daily rollups from the defects table"""
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM defect_rollups_hourly')
+            cursor.execute('DELETE FROM defect_rollups_daily')
+            cursor.execute('''
+                INSERT INTO defect_rollups_hourly (hour, defect_type, defect_count, confidence_sum)
+                SELECT strftime('%Y-%m-%d %H:00:00', timestamp), defect_type, COUNT(*), SUM(confidence)
+                FROM defects
+                GROUP BY 1, 2
+            ''')
+            cursor.execute('''
+                INSERT INTO defect_rollups_daily (day, defect_type, defect_count, confidence_sum)
+                SELECT DATE(timestamp), defect_type, COUNT(*), SUM(confidence)
+                FROM defects
+                GROUP BY 1, 2
+            ''')
+    
+    def migrate_feature_vectors(self, batch_size=5000):
+        """Convert legacy texture_features text into feature_vector BLOBs.
+        
+        Legacy rows stored the texture features only, so edge_density is
+        prepended to match FEATURE_SCHEMAS[1]. Converted rows have their
+        text cleared; rows that do not parse to that layout are left alone.
+        Returns the number of rows converted.
+        """
+        width = len(FEATURE_SCHEMAS[1])
+        converted = 0
+        last_id = 0
+        while True:
+            with self.pool.connection() as conn:
+                rows = conn.execute('''
+                    SELECT id, edge_density, texture_features
+                    FROM defects
+                    WHERE id > ? AND feature_vector IS NULL AND texture_features IS NOT NULL
+                    ORDER BY id
+                    LIMIT ?
+                ''', (last_id, batch_size)).fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                
+                updates = []
+                for row_id, edge_density, text in rows:
+                    try:
+                        features = parse_feature_text(text)
+                    except ValueError:
+                        continue
+                    if len(features) == width - 1:
+                        vector = np.concatenate([[edge_density or 0.0], features])
+                        updates.append((encode_features(vector), 1, row_id))
+                conn.executemany('''
+                    UPDATE defects
+                    SET feature_vector = ?, feature_schema_version = ?, texture_features = NULL
+                    WHERE id = ?
+                ''', updates)
+                converted += len(updates)
+        return converted
+    
+    def record_defect(self, defect_type, confidence, additional_data=None, wait=False):
+        """Record a new defect in the database.
+        
+        With write-behind enabled the row is queued for a group commit and
+        None is returned, unless wait is set; otherwise it is written
+        immediately and its id returned.
+        """
+        row, regions = self._defect_row(defect_type, confidence, additional_data)
         
+        if self.writer is not None and not wait:
+            self.writer.put(row, regions)
+            return None
+        
+        with self.pool.connection() as conn:
+            return insert_defects(conn, [(row, regions)], return_ids=True)[0]
+    
+    def record_defects(self, records):
+        """Write (defect_type, confidence, additional_data) records in one transaction; returns their ids"""
+        batch = [self._defect_row(*record) for record in records]
+        if not batch:
+            return []
+        with self.pool.connection() as conn:
+            return insert_defects(conn, batch, return_ids=True)
+    
+    def _defect_row(self, defect_type, confidence, additional_data):
+        """(defects row, defect_regions rows) for a result"""
         product_id = additional_data.get('product_id', 'UNKNOWN') if additional_data else 'UNKNOWN'
         edge_density = additional_data.get('edge_density', 0) if additional_data else 0
-        texture_features = str(additional_data.get('texture_features', [])) if additional_data else '[]'
         image_path = additional_data.get('image_path', '') if additional_data else ''
+        feature_blob, schema_version = self._feature_blob(edge_density, additional_data)
+        # Stamp the row now (UTC, like CURRENT_TIMESTAMP) rather than at commit time
+        timestamp = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        row = (product_id, defect_type, float(confidence), timestamp, float(edge_density),
+               feature_blob, schema_version, image_path)
+        return row, self._region_rows(additional_data)
+    
+    @staticmethod
+    def _region_rows(additional_data):
+        """defect_regions rows, without the defect id, for a result's extracted regions"""
+        if not additional_data:
+            return ()
+        return [(region.get('source', 'edges'), region['x'], region['y'], region['width'],
+                 region['height'], region['area'], region.get('elongation'), region.get('score'))
+                for region in additional_data.get('defect_regions') or ()]
+    
+    @staticmethod
+    def _feature_blob(edge_density, additional_data):
+        """(BLOB, schema version) for a result's feature vector, or (None, None)"""
+        if not additional_data:
+            return None, None
+        features = additional_data.get('feature_vector')
+        if features is None:
+            if additional_data.get('texture_features') is None:
+                return None, None
+            features = np.concatenate([[edge_density], additional_data['texture_features']])
         
-        cursor.execute('''
-            INSERT INTO defects (product_id, defect_type, confidence, edge_density, texture_features, image_path)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (product_id, defect_type, confidence, edge_density, texture_features, image_path))
+        width = len(FEATURE_SCHEMAS[FEATURE_SCHEMA_VERSION])
+        if len(features) != width:
+            raise ValueError(f"Expected {width} features for schema version "
+                             f"{FEATURE_SCHEMA_VERSION}, got {len(features)}")
+        return encode_features(features), FEATURE_SCHEMA_VERSION
+    
+    def flush(self):
+        """Wait for queued defect inserts to be committed"""
+        if self.writer is not None:
+            self.writer.flush()
+    
+    def close(self):
+        """Commit queued inserts, stop the writer and close pooled connections"""
+        if self.writer is not None:
+            self.writer.shutdown()
+        self.pool.close()
+    
+    def get_write_stats(self):
+        """Write-behind metrics, including the recent inserts per second"""
+        if self.writer is None:
+            return {'write_behind': False, 'overflow_connections': self.pool.overflow}
+        stats = self.writer.get_stats()
+        stats['write_behind'] = True
+        stats['overflow_connections'] = self.pool.overflow
+        return stats
+    
+    def record_label(self, defect_id, label, operator=None):
+        """Record an operator-confirmed defect type for a stored defect; returns the label id"""
+        with self.pool.connection() as conn:
+            cursor = conn.execute('''
+                INSERT INTO defect_labels (defect_id, label, operator)
+                SELECT id, ?, ? FROM defects WHERE id = ?
+            ''', (label, operator, defect_id))
+        if not cursor.rowcount:
+            raise ValueError(f"No defect with id {defect_id}")
+        return cursor.lastrowid
+    
+    def iter_labeled_features(self, after_id=0, batch_size=256, schema_version=FEATURE_SCHEMA_VERSION):
+        """Yield (label_ids, labels, features) for labels with id > after_id, in id order.
         
-        conn.commit()
-        conn.close()
+        Labels for defects stored without features of schema_version are
+        skipped; features is an (n, D) float32 matrix.
+        """
+        width = len(FEATURE_SCHEMAS[schema_version])
+        with self.pool.connection() as conn:
+            cursor = conn.execute('''
+                SELECT l.id, l.label, d.feature_vector
+                FROM defect_labels l
+                JOIN defects d ON d.id = l.defect_id
+                WHERE l.id > ? AND d.feature_schema_version = ?
+                ORDER BY l.id
+            ''', (after_id, schema_version))
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                label_ids, labels, blobs = zip(*rows)
+                yield np.array(label_ids), np.array(labels), decode_features(blobs, width)
+    
+    def get_reference_profile(self, product_id):
+        """Reference LAB color of a product as float32 (L, a, b), or None"""
+        with self.pool.connection() as conn:
+            row = conn.execute('SELECT reference_lab FROM products WHERE product_id = ?',
+                               (product_id,)).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return np.frombuffer(row[0], dtype=np.float32)
+    
+    def save_reference_profile(self, product_id, reference_lab):
+        """Store the reference LAB color of a product, adding the product if needed"""
+        with self.pool.connection() as conn:
+            conn.execute('''
+                INSERT INTO products (product_id, reference_lab, reference_updated)
+                VALUES (?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(product_id) DO UPDATE SET
+                    reference_lab = excluded.reference_lab,
+                    reference_updated = excluded.reference_updated
+            ''', (product_id, encode_features(reference_lab)))
+    
+    def get_defect_regions(self, min_area=None, max_area=None, source=None, limit=100):
+        """Stored defect regions within an area range, largest first, with their defect"""
+        conditions, params = [], []
+        if min_area is not None:
+            conditions.append('r.area >= ?')
+            params.append(min_area)
+        if max_area is not None:
+            conditions.append('r.area <= ?')
+            params.append(max_area)
+        if source:
+            conditions.append('r.source = ?')
+            params.append(source)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
         
-        return cursor.lastrowid
+        with self.pool.connection() as conn:
+            cursor = conn.execute(f'''
+                SELECT r.defect_id, r.source, r.x, r.y, r.width, r.height, r.area,
+                       r.elongation, r.score, d.product_id, d.defect_type, d.timestamp, d.image_path
+                FROM defect_regions r
+                JOIN defects d ON d.id = r.defect_id
+                {where}
+                ORDER BY r.area DESC
+                LIMIT ?
+            ''', params + [limit])
+            columns = [column[0] for column in cursor.description]
+            regions = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        return regions
     
     def get_recent_defects(self, limit=50):
         """Get recent defect records"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT product_id, defect_type, confidence, timestamp, edge_density
-            FROM defects 
-            ORDER BY timestamp DESC 
-            LIMIT ?
-        ''', (limit,))
-        
-        defects = cursor.fetchall()
-        conn.close()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                SELECT product_id, defect_type, confidence, timestamp, edge_density, id
+                FROM defects
+                ORDER BY timestamp DESC
+                LIMIT ?
+            ''', (limit,))
+            
+            defects = cursor.fetchall()
         
         return defects
     
     def get_defects_by_date(self, date):
         """Get defects for a specific date"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            
+            # A timestamp range keeps idx_defects_timestamp usable, unlike DATE(timestamp)
+            start, end = day_bounds(date, date)
+            cursor.execute('''
+                SELECT product_id, defect_type, confidence, timestamp, edge_density
+                FROM defects
+                WHERE timestamp >= ? AND timestamp < ?
+                ORDER BY timestamp DESC
+            ''', (start, end))
+            
+            defects = cursor.fetchall()
+        
+        return defects
+    
+    def iter_defects(self, start_date=None, end_date=None, batch_size=1000, **filters):
+        """Yield defect rows oldest first, fetching batch_size rows at a time.
         
-        cursor.execute('''
-            SELECT product_id, defect_type, confidence, timestamp, edge_density
-            FROM defects 
-            WHERE DATE(timestamp) = ?
-            ORDER BY timestamp DESC
-        ''', (date.strftime('%Y-%m-%d'),))
+        Rows have the same columns as get_defects_by_date; see
+        iter_defect_batches for the filters.
+        """
+        for rows in self.iter_defect_batches(start_date, end_date, batch_size, **filters):
+            yield from rows
+    
+    def iter_defect_batches(self, start_date=None, end_date=None, batch_size=1000,
+                            product_id=None, defect_types=None):
+        """Yield lists of up to batch_size defect rows from one server-side cursor.
         
-        defects = cursor.fetchall()
-        conn.close()
+        Dates are inclusive whole days; product_id and defect_types (a list)
+        narrow the rows further. The pooled connection is held until the
+        generator is exhausted or closed.
+        """
+        conditions, params = self._defect_filters(start_date, end_date, product_id, defect_types)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
         
-        return defects
+        with self.pool.connection() as conn:
+            cursor = conn.execute(f'''
+                SELECT product_id, defect_type, confidence, timestamp, edge_density
+                FROM defects
+                {where}
+                ORDER BY timestamp
+            ''', params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+    
+    @staticmethod
+    def _defect_filters(start_date=None, end_date=None, product_id=None, defect_types=None):
+        """SQL conditions and parameters for the common defect filters"""
+        conditions, params = [], []
+        if start_date is not None:
+            conditions.append('timestamp >= ?')
+            params.append(day_bounds(start_date, start_date)[0])
+        if end_date is not None:
+            conditions.append('timestamp < ?')
+            params.append(day_bounds(end_date, end_date)[1])
+        if product_id is not None:
+            conditions.append('product_id = ?')
+            params.append(product_id)
+        if defect_types:
+            conditions.append(f"defect_type IN ({', '.join('?' * len(defect_types))})")
+            params.extend(defect_types)
+        return conditions, params
+    
+    def read_feature_matrix(self, query, params=(), schema_version=FEATURE_SCHEMA_VERSION):
+        """Run a query whose first column is feature_vector and return an (N, D) float32 matrix.
+        
+        Every row must hold a vector of the given schema version; filter on
+        feature_schema_version in the query when versions are mixed.
+        """
+        width = len(FEATURE_SCHEMAS[schema_version])
+        with self.pool.connection() as conn:
+            blobs = [row[0] for row in conn.execute(query, params)]
+        return decode_features(blobs, width)
+    
+    def get_feature_matrix(self, start_date=None, end_date=None, product_id=None, defect_types=None,
+                           schema_version=FEATURE_SCHEMA_VERSION):
+        """(N, D) float32 feature matrix for the filtered defects, in id order.
+        
+        Columns follow FEATURE_SCHEMAS[schema_version]; rows stored under
+        another schema version, or without features, are skipped.
+        """
+        conditions, params = self._defect_filters(start_date, end_date, product_id, defect_types)
+        conditions.append('feature_schema_version = ?')
+        params.append(schema_version)
+        return self.read_feature_matrix(f'''
+            SELECT feature_vector
+            FROM defects
+            WHERE {' AND '.join(conditions)}
+            ORDER BY id
+        ''', params, schema_version)
+    
+    def iter_feature_batches(self, start_date=None, end_date=None, batch_size=10000, product_id=None,
+                             defect_types=None, schema_version=FEATURE_SCHEMA_VERSION):
+        """Yield (ids, defect_types, features) for the filtered defects in id order.
+        
+        ids and defect_types are arrays and features an (n, D) float32
+        matrix, for replaying stored vectors through a classifier.
+        """
+        conditions, params = self._defect_filters(start_date, end_date, product_id, defect_types)
+        conditions.append('feature_schema_version = ?')
+        params.append(schema_version)
+        width = len(FEATURE_SCHEMAS[schema_version])
+        
+        with self.pool.connection() as conn:
+            cursor = conn.execute(f'''
+                SELECT id, defect_type, feature_vector
+                FROM defects
+                WHERE {' AND '.join(conditions)}
+                ORDER BY id
+            ''', params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                ids, types, blobs = zip(*rows)
+                yield np.array(ids), np.array(types), decode_features(blobs, width)
+    
+    def iter_defect_records(self, after_id=0, batch_size=10000):
+        """Yield lists of full defect rows with id > after_id, in id order.
+        
+        Rows are (id, timestamp, product_id, defect_type, confidence,
+        edge_density, feature_vector, feature_schema_version, image_path).
+        """
+        with self.pool.connection() as conn:
+            cursor = conn.execute('''
+                SELECT id, timestamp, product_id, defect_type, confidence, edge_density,
+                       feature_vector, feature_schema_version, image_path
+                FROM defects
+                WHERE id > ?
+                ORDER BY id
+            ''', (after_id,))
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+    
+    def get_daily_rollups(self, start_date, end_date):
+        """(day, defect_type, defect_count, confidence_sum) rows for a date range in one query"""
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                SELECT day, defect_type, defect_count, confidence_sum
+                FROM defect_rollups_daily
+                WHERE day >= ? AND day <= ? AND defect_count > 0
+                ORDER BY day
+            ''', (start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')))
+            
+            rollups = cursor.fetchall()
+        
+        return rollups
     
     def get_defect_statistics(self, days=7):
-        """Get defect statistics for dashboard"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Total defects today
-        cursor.execute('''
-            SELECT COUNT(*) FROM defects 
-            WHERE DATE(timestamp) = DATE('now')
-        ''')
-        today_defects = cursor.fetchone()[0]
-        
-        # Defect breakdown
-        cursor.execute('''
-            SELECT defect_type, COUNT(*) 
-            FROM defects 
-            WHERE DATE(timestamp) = DATE('now')
-            GROUP BY defect_type
-        ''')
-        defect_breakdown = dict(cursor.fetchall())
-        
-        # Weekly trend
-        cursor.execute('''
-            SELECT DATE(timestamp), COUNT(*) 
-            FROM defects 
-            WHERE timestamp >= DATE('now', '-7 days')
-            GROUP BY DATE(timestamp)
-            ORDER BY DATE(timestamp)
-        ''')
-        weekly_trend = cursor.fetchall()
-        
-        conn.close()
+        """Get defect statistics for dashboard, read from the daily rollups"""
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            
+            # Defect breakdown for today
+            cursor.execute('''
+                SELECT defect_type, SUM(defect_count)
+                FROM defect_rollups_daily
+                WHERE day = DATE('now')
+                GROUP BY defect_type
+                HAVING SUM(defect_count) > 0
+            ''')
+            defect_breakdown = dict(cursor.fetchall())
+            
+            # Total defects today
+            today_defects = sum(defect_breakdown.values())
+            
+            # Daily trend
+            cursor.execute('''
+                SELECT day, SUM(defect_count)
+                FROM defect_rollups_daily
+                WHERE day >= DATE('now', ?)
+                GROUP BY day
+                HAVING SUM(defect_count) > 0
+                ORDER BY day
+            ''', (f'-{days} days',))
+            weekly_trend = cursor.fetchall()
         
         return {
             'today_defects': today_defects,
@@ -150,24 +822,47 @@ class DatabaseHandler:
     
     def get_critical_defects(self, hours=24):
         """Get critical defects from last specified hours"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT product_id, defect_type, confidence, timestamp
-            FROM defects 
-            WHERE defect_type IN ('MAJOR', 'CRITICAL')
-            AND timestamp >= DATETIME('now', ?)
-            ORDER BY timestamp DESC
-        ''', (f'-{hours} hours',))
-        
-        critical_defects = cursor.fetchall()
-        conn.close()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            
+            # Range scans on idx_defects_type_timestamp for each type
+            cursor.execute('''
+                SELECT product_id, defect_type, confidence, timestamp
+                FROM defects 
+                WHERE defect_type IN ('MAJOR', 'CRITICAL')
+                AND timestamp >= DATETIME('now', ?)
+                ORDER BY timestamp DESC
+            ''', (f'-{hours} hours',))
+            
+            critical_defects = cursor.fetchall()
         
         return critical_defects
     
+    def get_quality_reports(self, days=30):
+        """Per-day inspection totals and defect rates from the quality_reports view"""
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                SELECT report_date, total_inspected, defects_found, defect_rate,
+                       major_defects, critical_defects
+                FROM quality_reports
+                WHERE report_date >= DATE('now', ?)
+                ORDER BY report_date
+            ''', (f'-{days} days',))
+            
+            reports = cursor.fetchall()
+        
+        return reports
+    
     def log_system_event(self, log_level, module, message):
         """Log system event to database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
\ No newline at end of file
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                INSERT INTO system_logs (log_level, module, message)
+                VALUES (?, ?, ?)
+            ''', (log_level, module, message))
+        
+        return cursor.lastrowid
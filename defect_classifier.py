@@ -1,16 +1,289 @@
 # src/defect_classifier.py
-import pickle
+import time
 import numpy as np
 from sklearn.cluster import KMeans
+from sklearn.kernel_approximation import Nystroem
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from sklearn.svm import SVC
 from sklearn.preprocessing import StandardScaler
+from config import Config
+from src.frame_context import FrameContext
+
+BACKENDS = ('svc', 'nystroem', 'sgd')
+
+# Labels an incrementally trained model can predict; fixed up front for partial_fit
+SEVERITY_CLASSES = ['CRITICAL', 'GOOD', 'MAJOR', 'MINOR']
+
+def logistic_probabilities(scores):
+    """Class probabilities from LogisticRegression decision scores"""
+    if scores.shape[1] == 1:
+        positive = 1.0 / (1.0 + np.exp(-scores[:, 0]))
+        return np.column_stack([1.0 - positive, positive])
+    scores = scores - scores.max(axis=1, keepdims=True)
+    probabilities = np.exp(scores)
+    return probabilities / probabilities.sum(axis=1, keepdims=True)
+
+class NystroemModel:
+    """RBF kernel approximation on landmark samples followed by logistic regression.
+    
+    Training uses scikit-learn; prediction is plain NumPy whose cost depends
+    on n_components rather than on the number of training samples, unlike
+    an SVC whose support vector count grows with the training set.
+    """
+    
+    def __init__(self, n_components=100, gamma=None, C=1.0, random_state=42):
+        self.n_components = n_components
+        self.gamma = gamma
+        self.C = C
+        self.random_state = random_state
+    
+    def fit(self, features, labels):
+        features = np.asarray(features, dtype=np.float64)
+        gamma = self.gamma or 1.0 / features.shape[1]
+        nystroem = Nystroem(kernel='rbf', gamma=gamma, random_state=self.random_state,
+                            n_components=min(self.n_components, len(features)))
+        mapped = nystroem.fit_transform(features)
+        linear = LogisticRegression(C=self.C, max_iter=1000).fit(mapped, labels)
+        
+        self.gamma_ = gamma
+        self.components_ = nystroem.components_
+        self.normalization_ = nystroem.normalization_
+        self.coef_ = linear.coef_
+        self.intercept_ = linear.intercept_
+        self.classes_ = linear.classes_
+        return self
+    
+    def predict_proba(self, features):
+        features = np.asarray(features, dtype=np.float64)
+        distances = (np.einsum('ij,ij->i', features, features)[:, None]
+                     + np.einsum('ij,ij->i', self.components_, self.components_)[None, :]
+                     - 2.0 * features @ self.components_.T)
+        kernel = np.exp(-self.gamma_ * np.maximum(distances, 0.0))
+        return logistic_probabilities((kernel @ self.normalization_.T) @ self.coef_.T + self.intercept_)
+    
+    def predict(self, features):
+        return self.classes_[self.predict_proba(features).argmax(axis=1)]
+    
+    def get_arrays(self):
+        """Fitted parameters as arrays, for model artifacts"""
+        return {'gamma': np.array(self.gamma_), 'components': self.components_,
+                'normalization': self.normalization_, 'coef': self.coef_,
+                'intercept': self.intercept_, 'classes': self.classes_}
+    
+    @classmethod
+    def from_arrays(cls, arrays):
+        model = cls(n_components=len(arrays['components']))
+        model.gamma_ = float(arrays['gamma'])
+        model.components_ = arrays['components']
+        model.normalization_ = arrays['normalization']
+        model.coef_ = arrays['coef']
+        model.intercept_ = arrays['intercept']
+        model.classes_ = arrays['classes']
+        return model
+
+class SVCModel:
+    """Probability prediction for a fitted RBF SVC from its exported arrays.
+    
+    Reproduces libsvm: one-vs-one decision values, Platt sigmoids per class
+    pair, then pairwise coupling into class probabilities.
+    """
+    
+    MIN_PROBABILITY = 1e-7
+    
+    @classmethod
+    def from_estimator(cls, svc):
+        # gamma='scale' is only resolved on the fitted estimator
+        arrays = {'gamma': np.array(svc._gamma), 'support_vectors': svc.support_vectors_,
+                  'n_support': svc.n_support_, 'dual_coef': svc.dual_coef_,
+                  'intercept': svc.intercept_, 'prob_a': svc.probA_, 'prob_b': svc.probB_,
+                  'classes': svc.classes_}
+        if len(svc.classes_) == 2:
+            # scikit-learn flips the sign of binary models relative to libsvm
+            arrays['dual_coef'] = -svc.dual_coef_
+            arrays['intercept'] = -svc.intercept_
+        return cls.from_arrays(arrays)
+    
+    @classmethod
+    def from_arrays(cls, arrays):
+        model = cls()
+        model.arrays = arrays
+        model.gamma_ = float(arrays['gamma'])
+        model.classes_ = arrays['classes']
+        model.support_vectors_ = arrays['support_vectors']
+        starts = np.concatenate([[0], np.cumsum(arrays['n_support'])])
+        model.slices = [slice(starts[i], starts[i + 1]) for i in range(len(model.classes_))]
+        return model
+    
+    def get_arrays(self):
+        """Fitted parameters as arrays, for model artifacts"""
+        return self.arrays
+    
+    def decision_values(self, features):
+        """(N, pairs) one-vs-one decision values in libsvm pair order"""
+        sv = self.support_vectors_
+        distances = (np.einsum('ij,ij->i', features, features)[:, None]
+                     + np.einsum('ij,ij->i', sv, sv)[None, :] - 2.0 * features @ sv.T)
+        kernel = np.exp(-self.gamma_ * np.maximum(distances, 0.0))
+        
+        dual_coef = self.arrays['dual_coef']
+        n_classes = len(self.classes_)
+        values = np.empty((len(features), n_classes * (n_classes - 1) // 2))
+        pair = 0
+        for i in range(n_classes):
+            for j in range(i + 1, n_classes):
+                si, sj = self.slices[i], self.slices[j]
+                values[:, pair] = (kernel[:, si] @ dual_coef[j - 1, si] + kernel[:, sj] @ dual_coef[i, sj]
+                                   + self.arrays['intercept'][pair])
+                pair += 1
+        return values
+    
+    def predict_proba(self, features):
+        features = np.asarray(features, dtype=np.float64)
+        n_classes = len(self.classes_)
+        decision = self.decision_values(features)
+        pairwise = 1.0 / (1.0 + np.exp(decision * self.arrays['prob_a'] + self.arrays['prob_b']))
+        pairwise = np.clip(pairwise, self.MIN_PROBABILITY, 1.0 - self.MIN_PROBABILITY)
+        
+        # r[n, i, j] estimates P(class i | class i or j)
+        r = np.zeros((len(features), n_classes, n_classes))
+        rows, cols = np.triu_indices(n_classes, 1)
+        r[:, rows, cols] = pairwise
+        r[:, cols, rows] = 1.0 - pairwise
+        return self._couple(r)
+    
+    @staticmethod
+    def _couple(r):
+        """libsvm's multiclass_probability, run for every sample at once"""
+        n, k = r.shape[:2]
+        Q = -r.transpose(0, 2, 1) * r
+        diagonal = np.einsum('nji,nji->ni', r, r)
+        Q[:, np.arange(k), np.arange(k)] = diagonal
+        p = np.full((n, k), 1.0 / k)
+        Qp = np.einsum('nij,nj->ni', Q, p)
+        pQp = np.einsum('ni,ni->n', p, Qp)
+        
+        active = np.arange(n)
+        for _ in range(max(100, k)):
+            error = np.abs(Qp[active] - pQp[active, None]).max(axis=1)
+            active = active[error >= 0.005 / k]
+            if not len(active):
+                break
+            for t in range(k):
+                Qa = Q[active]
+                diff = (pQp[active] - Qp[active, t]) / Qa[:, t, t]
+                p[active, t] += diff
+                scale = 1.0 + diff
+                pQp[active] = (pQp[active] + diff * (diff * Qa[:, t, t] + 2.0 * Qp[active, t])) / scale ** 2
+                Qp[active] = (Qp[active] + diff[:, None] * Qa[:, t, :]) / scale[:, None]
+                p[active] /= scale[:, None]
+        return p
+    
+    def predict(self, features):
+        return self.classes_[self.predict_proba(features).argmax(axis=1)]
+
+class OnlineModel:
+    """Logistic regression trained by SGD, updatable one mini-batch at a time.
+    
+    Wraps scikit-learn's SGDClassifier for partial_fit; prediction is plain
+    NumPy over the linear weights.
+    """
+    
+    def __init__(self, classes=SEVERITY_CLASSES, alpha=1e-4, random_state=42):
+        self.classes = list(classes)
+        self.estimator = SGDClassifier(loss='log_loss', alpha=alpha, random_state=random_state)
+    
+    @property
+    def classes_(self):
+        return self.estimator.classes_
+    
+    def fit(self, features, labels):
+        self.estimator.fit(features, labels)
+        return self
+    
+    def partial_fit(self, features, labels):
+        self.estimator.partial_fit(features, labels, classes=self.classes)
+        return self
+    
+    def predict_proba(self, features):
+        scores = np.asarray(features, dtype=np.float64) @ self.estimator.coef_.T + self.estimator.intercept_
+        probabilities = 1.0 / (1.0 + np.exp(-scores))
+        if probabilities.shape[1] == 1:
+            return np.column_stack([1.0 - probabilities[:, 0], probabilities[:, 0]])
+        # One-vs-rest scores normalized as in SGDClassifier.predict_proba
+        return probabilities / probabilities.sum(axis=1, keepdims=True)
+    
+    def predict(self, features):
+        return self.classes_[self.predict_proba(features).argmax(axis=1)]
+    
+    def get_arrays(self):
+        """Fitted parameters as arrays, for model artifacts"""
+        return {'coef': self.estimator.coef_, 'intercept': self.estimator.intercept_,
+                'classes': self.estimator.classes_, 't': np.array(self.estimator.t_)}
+    
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Restore a model that partial_fit can continue training"""
+        model = cls(arrays['classes'].tolist())
+        estimator = model.estimator
+        # Copies, since memory-mapped artifact arrays are read-only
+        estimator.coef_ = np.array(arrays['coef'])
+        estimator.intercept_ = np.array(arrays['intercept'])
+        estimator.classes_ = np.array(arrays['classes'])
+        estimator.t_ = float(arrays['t'])
+        estimator.n_features_in_ = estimator.coef_.shape[1]
+        return model
+
+class EdgeModel:
+    """Logistic regression on the scaled edge density alone.
+    
+    The cascade's cheap stage, which classifies a frame before any texture
+    features exist. Prediction is plain NumPy.
+    """
+    
+    def __init__(self, C=1.0):
+        self.C = C
+    
+    def fit(self, features, labels):
+        linear = LogisticRegression(C=self.C, max_iter=1000).fit(features, labels)
+        self.coef_ = linear.coef_
+        self.intercept_ = linear.intercept_
+        self.classes_ = linear.classes_
+        return self
+    
+    def predict_proba(self, features):
+        return logistic_probabilities(np.asarray(features, dtype=np.float64) @ self.coef_.T + self.intercept_)
+    
+    def get_arrays(self):
+        """Fitted parameters as arrays, for model artifacts"""
+        return {'coef': self.coef_, 'intercept': self.intercept_, 'classes': self.classes_}
+    
+    @classmethod
+    def from_arrays(cls, arrays):
+        model = cls()
+        model.coef_ = arrays['coef']
+        model.intercept_ = arrays['intercept']
+        model.classes_ = arrays['classes']
+        return model
+
+def make_model(backend):
+    """Untrained severity model for a backend name"""
+    if backend == 'svc':
+        return SVC(probability=True, random_state=42)
+    if backend == 'nystroem':
+        return NystroemModel(Config.NYSTROEM_COMPONENTS)
+    if backend == 'sgd':
+        return OnlineModel(alpha=Config.SGD_ALPHA)
+    raise ValueError(f"Unknown classifier backend: {backend} (expected one of {', '.join(BACKENDS)})")
 
 class DefectClassifier:
-    def __init__(self):
+    def __init__(self, backend=None):
         self.kmeans = None
-        self.svm_classifier = None
+        self.model = None
+        self.edge_model = None  # Cascade stage on edge density alone
+        self.backend = backend or Config.CLASSIFIER_BACKEND
         self.scaler = StandardScaler()
         self.is_trained = False
+        self.manifest = None  # Set when loaded from a model artifact
     
     def train_kmeans(self, features, n_clusters=3):
         """Train K-Means clustering for defect categorization"""
@@ -19,27 +292,104 @@ class DefectClassifier:
         self.kmeans.fit(scaled_features)
         return self.kmeans.labels_
     
-    def train_svm_classifier(self, features, labels):
-        """Train SVM classifier for defect severity"""
+    def train_classifier(self, features, labels):
+        """Train the severity model for the selected backend"""
+        model = make_model(self.backend)
         scaled_features = self.scaler.fit_transform(features)
-        self.svm_classifier = SVC(probability=True, random_state=42)
-        self.svm_classifier.fit(scaled_features, labels)
+        model.fit(scaled_features, labels)
+        self.model = model
+        self.edge_model = EdgeModel().fit(scaled_features[:, :1], labels)
+        self.is_trained = True
+    
+    def partial_fit(self, features, labels):
+        """Update the model with one mini-batch of labelled feature vectors.
+        
+        The scaler keeps running statistics across batches. Only backends
+        whose model has partial_fit ('sgd') can be updated this way.
+        """
+        if self.model is None:
+            self.model = make_model(self.backend)
+        if not hasattr(self.model, 'partial_fit'):
+            raise ValueError(f"The {self.backend} backend cannot be trained incrementally")
+        if self.edge_model is None:
+            self.edge_model = OnlineModel(alpha=Config.SGD_ALPHA)
+        
+        features = np.asarray(features, dtype=np.float64)
+        self.scaler.partial_fit(features)
+        scaled_features = (features - self.scaler.mean_) / self.scaler.scale_
+        self.model.partial_fit(scaled_features, labels)
+        self.edge_model.partial_fit(scaled_features[:, :1], labels)
         self.is_trained = True
     
+    def train_svm_classifier(self, features, labels):
+        """Train SVM classifier for defect severity"""
+        self.backend = 'svc'
+        self.train_classifier(features, labels)
+    
+    # Upper bounds of the rule-based GOOD, MINOR and MAJOR combined scores
+    RULE_THRESHOLDS = [0.3, 0.6, 0.8]
+    RULE_LABELS = np.array(['GOOD', 'MINOR', 'MAJOR', 'CRITICAL'])
+    
     def classify_defect_severity(self, features):
         """Classify defect severity"""
-        if not self.is_trained or self.svm_classifier is None:
+        if not self.is_trained or self.model is None:
             # Fallback to rule-based classification
             return self.rule_based_classification(features)
         
+        labels, confidences = self.classify_batch([features])
+        return labels[0], float(confidences[0])
+    
+    def classify_batch(self, features):
+        """Classify an (N, D) feature matrix, returning (labels, confidences) arrays.
+        
+        Features are scaled once and predict_proba runs once for the whole
+        batch; each label is the most probable class, so it always agrees
+        with its confidence.
+        """
+        features = np.asarray(features, dtype=np.float64)
+        if not self.is_trained or self.model is None:
+            return self.rule_based_batch(features)
+        
         try:
-            scaled_features = self.scaler.transform([features])
-            prediction = self.svm_classifier.predict(scaled_features)
-            confidence = np.max(self.svm_classifier.predict_proba(scaled_features))
-            return prediction[0], confidence
+            # Same as scaler.transform, without scikit-learn's per-call validation
+            scaled_features = (features - self.scaler.mean_) / self.scaler.scale_
+            probabilities = self.model.predict_proba(scaled_features)
         except Exception as e:
             print(f"Classification error: {e}")
-            return self.rule_based_classification(features)
+            return self.rule_based_batch(features)
+        
+        best = probabilities.argmax(axis=1)
+        return self.model.classes_[best], probabilities[np.arange(len(best)), best]
+    
+    def warm_up(self, runs=3):
+        """Run a few inferences so the first real request pays no one-off costs.
+        
+        Returns the seconds taken by the first run.
+        """
+        if not self.is_trained:
+            return 0.0
+        features = np.asarray(self.scaler.mean_, dtype=np.float64)[None, :]
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            self.classify_batch(features)
+            timings.append(time.perf_counter() - start)
+        return timings[0]
+    
+    def classify_edge_density(self, edge_densities):
+        """Cheap-stage (labels, confidences) from edge density alone, or None.
+        
+        Uses the edge-only model trained alongside the main one. The rules
+        and artifacts saved without an edge model return None, so every
+        frame goes on to texture analysis.
+        """
+        if not self.is_trained or self.edge_model is None:
+            return None
+        edge_densities = np.asarray(edge_densities, dtype=np.float64)
+        scaled = (edge_densities - self.scaler.mean_[0]) / self.scaler.scale_[0]
+        probabilities = self.edge_model.predict_proba(scaled[:, None])
+        best = probabilities.argmax(axis=1)
+        return self.edge_model.classes_[best], probabilities[np.arange(len(best)), best]
     
     def rule_based_classification(self, features):
         """Rule-based defect classification as fallback"""
@@ -61,17 +411,31 @@ class DefectClassifier:
         else:
             return "UNKNOWN", 0.5
     
+    def rule_based_batch(self, features):
+        """Vectorized rule_based_classification over an (N, D) feature matrix"""
+        features = np.asarray(features, dtype=np.float64)
+        if features.shape[1] < 5:
+            return np.full(len(features), 'UNKNOWN'), np.full(len(features), 0.5)
+        
+        combined_score = (features[:, 0] + features[:, 4]) / 2
+        labels = self.RULE_LABELS[np.digitize(combined_score, self.RULE_THRESHOLDS)]
+        confidences = np.where(labels == 'GOOD', 1.0 - combined_score, combined_score)
+        return labels, confidences
+    
     def extract_comprehensive_features(self, image, edge_detector, texture_analyzer, color_analyzer):
         """Extract comprehensive features for classification"""
+        # Share colour conversions, edge maps and GLCMs across analyzers
+        frame = FrameContext.wrap(image)
+        
         # Edge features
-        edges = edge_detector.detect_cracks_canny(image)
+        edges = edge_detector.detect_cracks_canny(frame)
         edge_density = np.sum(edges) / (255 * edges.size)
         
         # Texture features
-        texture_result, texture_features = texture_analyzer.analyze_texture_defects(image)
+        texture_result, texture_features = texture_analyzer.analyze_texture_defects(frame)
         
         # Color features
-        color_variation, color_stds = color_analyzer.analyze_color_consistency(image)
+        color_variation, color_stds = color_analyzer.analyze_color_consistency(frame)
         
         # Combine all features
         combined_features = np.concatenate([
@@ -82,24 +446,3 @@ class DefectClassifier:
         ])
         
         return combined_features
-    
-    def save_model(self, model_path):
-        """Save trained model to file"""
-        if self.svm_classifier is not None:
-            with open(model_path, 'wb') as f:
-                pickle.dump({
-                    'svm_classifier': self.svm_classifier,
-                    'scaler': self.scaler,
-                    'is_trained': self.is_trained
-                }, f)
-    
-    def load_model(self, model_path):
-        """Load trained model from file"""
-        try:
-            with open(model_path, 'rb') as f:
-                model_data = pickle.load(f)
-                self.svm_classifier = model_data['svm_classifier']
-                self.scaler = model_data['scaler']
-                self.is_trained = model_data['is_trained']
-        except Exception as e:
-            print(f"Error loading model: {e}")
\ No newline at end of file
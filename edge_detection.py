@@ -2,6 +2,8 @@
 import cv2
 import numpy as np
 from scipy import ndimage
+from src.frame_context import FrameContext
+from src.utils.image_utils import extract_regions
 
 class EdgeDefectDetector:
     def __init__(self):
@@ -10,8 +12,12 @@ class EdgeDefectDetector:
     
     def detect_cracks_canny(self, image):
         """Detect cracks and edges using Canny edge detection"""
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        
+        frame = FrameContext.wrap(image)
+        key = ('canny', self.canny_threshold1, self.canny_threshold2)
+        return frame.get(key, lambda: self._canny_edges(frame.gray))
+    
+    def _canny_edges(self, gray):
+        """Canny edges followed by crack-enhancing morphology"""
         # Apply Canny edge detection
         edges = cv2.Canny(gray, self.canny_threshold1, self.canny_threshold2)
         
@@ -24,7 +30,7 @@ class EdgeDefectDetector:
     
     def detect_cracks_log(self, image):
         """Detect cracks using Laplacian of Gaussian"""
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        gray = FrameContext.wrap(image).gray
         
         # Apply Gaussian blur
         blurred = cv2.GaussianBlur(gray, (5, 5), 0)
@@ -40,13 +46,14 @@ class EdgeDefectDetector:
     
     def detect_line_defects(self, image):
         """Detect line-shaped defects using Hough Transform"""
-        edges = self.detect_cracks_canny(image)
+        frame = FrameContext.wrap(image)
+        edges = self.detect_cracks_canny(frame)
         
         # Detect lines using Hough Transform
         lines = cv2.HoughLinesP(edges, 1, np.pi/180, threshold=50, 
                                minLineLength=50, maxLineGap=10)
         
-        line_image = np.zeros_like(image)
+        line_image = np.zeros((frame.shape[0], frame.shape[1], 3), dtype=np.uint8)
         if lines is not None:
             for line in lines:
                 x1, y1, x2, y2 = line[0]
@@ -60,6 +67,14 @@ class EdgeDefectDetector:
         edge_pixels = np.count_nonzero(edges)
         return edge_pixels / total_pixels
     
+    def extract_defect_regions(self, image, min_area=20, max_regions=50):
+        """Connected edge regions with bounding boxes, area, elongation and fill score"""
+        edges = self.detect_cracks_canny(image)
+        regions = extract_regions(edges, min_area, max_regions)
+        for region in regions:
+            region['source'] = 'edges'
+        return regions
+    
     def highlight_defect_regions(self, image, edges):
         """Highlight defect regions on original image"""
         # Find contours in edge image
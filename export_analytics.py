@@ -0,0 +1,25 @@
+# scripts/export_analytics.py
+#!/usr/bin/env python3
+
+import argparse
+from src.analytics_export import AnalyticsExporter
+
+def export_analytics(export_dir=None, export_format=None):
+    """Append defects recorded since the last run to the columnar export"""
+    exporter = AnalyticsExporter(export_dir=export_dir, export_format=export_format)
+    print(f"Exporting defect history to {exporter.export_dir} ({exporter.export_format})...")
+
+    summary = exporter.export()
+    if summary['rows']:
+        print(f"Exported {summary['rows']} rows (ids {summary['first_id']}-{summary['last_id']}) "
+              f"into {summary['files']} partition files")
+    else:
+        print("No new defect records since the last export")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Incremental columnar export of inspection history')
+    parser.add_argument('--export-dir', help='output directory (default: Config.ANALYTICS_EXPORT_DIR)')
+    parser.add_argument('--format', choices=['npz', 'parquet', 'auto'], help='file format')
+    args = parser.parse_args()
+
+    export_analytics(args.export_dir, args.format)
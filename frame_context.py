@@ -0,0 +1,53 @@
+# src/frame_context.py
+import cv2
+from src.utils.image_utils import to_grayscale
+
+class FrameContext:
+    """Lazily computed, memoized representations of a single frame.
+
+    Analyzers accept either a plain image or a FrameContext. Passing the same
+    context to several analyzers means each colour-space conversion, edge map
+    or co-occurrence matrix is computed once per frame. Cached arrays are
+    shared, so callers must not modify them in place.
+    """
+
+    def __init__(self, image):
+        self.image = image
+        self.cache = {}
+
+    @classmethod
+    def wrap(cls, image):
+        """Return image unchanged if it is already a context, else wrap it"""
+        return image if isinstance(image, cls) else cls(image)
+
+    def get(self, key, compute):
+        """Return the cached value for key, computing it on first use"""
+        if key not in self.cache:
+            self.cache[key] = compute()
+        return self.cache[key]
+
+    @property
+    def shape(self):
+        return self.image.shape
+
+    @property
+    def gray(self):
+        return self.get('gray', lambda: to_grayscale(self.image))
+
+    @property
+    def bgr(self):
+        if self.image.ndim == 3:
+            return self.image
+        return self.get('bgr', lambda: cv2.cvtColor(self.image, cv2.COLOR_GRAY2BGR))
+
+    @property
+    def hsv(self):
+        return self.get('hsv', lambda: cv2.cvtColor(self.bgr, cv2.COLOR_BGR2HSV))
+
+    @property
+    def lab(self):
+        return self.get('lab', lambda: cv2.cvtColor(self.bgr, cv2.COLOR_BGR2LAB))
+
+    @property
+    def lab_planes(self):
+        return self.get('lab_planes', lambda: cv2.split(self.lab))
@@ -0,0 +1,291 @@
+# src/glcm.py
+from functools import lru_cache
+import cv2
+import numpy as np
+
+# Feature order matches mahotas.features.haralick
+HARALICK_FEATURES = [
+    'angular_second_moment',
+    'contrast',
+    'correlation',
+    'sum_of_squares_variance',
+    'inverse_difference_moment',
+    'sum_average',
+    'sum_variance',
+    'sum_entropy',
+    'entropy',
+    'difference_variance',
+    'difference_entropy',
+    'info_correlation_1',
+    'info_correlation_2'
+]
+
+# Features that grow with the gray-level step, and the power they grow with
+GRAY_LEVEL_POWERS = {
+    'contrast': 2,
+    'sum_of_squares_variance': 2,
+    'sum_average': 1,
+    'sum_variance': 2,
+    'difference_variance': 2
+}
+
+# (dy, dx) offsets: horizontal, diagonal nw-se, vertical, diagonal ne-sw
+DIRECTIONS = [(0, 1), (1, 1), (1, 0), (1, -1)]
+
+def quantize(gray, levels=256):
+    """Reduce a uint8 image to the given number of gray levels"""
+    if levels >= 256:
+        return gray
+    lut = (np.arange(256) * levels // 256).astype(np.uint8)
+    return cv2.LUT(gray, lut)
+
+def to_full_scale(features, names, levels):
+    """Put gray-level dependent features of a levels-quantized image on the 256-level scale, in place.
+
+    features has one value per name along its last axis. Only the features
+    in GRAY_LEVEL_POWERS, which scale with a power of the gray-level step,
+    are rescaled; even they match a 256-level GLCM only approximately. The
+    others, such as angular second moment and the entropies, depend
+    strongly on the number of levels and cannot be rescaled, so features
+    from different level counts are not comparable.
+    """
+    if levels >= 256:
+        return features
+    step = 256 / levels
+    for index, name in enumerate(names):
+        if name in GRAY_LEVEL_POWERS:
+            features[..., index] *= step ** GRAY_LEVEL_POWERS[name]
+    return features
+
+def direction_slices(shape, dy, dx, distance=1):
+    """Slices selecting reference pixels and their neighbours for one direction"""
+    h, w = shape
+    dy, dx = dy * distance, dx * distance
+    rows = slice(0, h - dy)
+    neighbour_rows = slice(dy, h)
+    if dx >= 0:
+        cols, neighbour_cols = slice(0, w - dx), slice(dx, w)
+    else:
+        cols, neighbour_cols = slice(-dx, w), slice(0, w + dx)
+    return (rows, cols), (neighbour_rows, neighbour_cols)
+
+def cooccurrence_matrices(gray, levels=None, distance=1):
+    """Symmetric co-occurrence counts for all four directions.
+
+    Returns an array of shape (4, levels, levels). levels defaults to
+    gray.max() + 1, like mahotas. Each direction is one 2-D histogram of
+    (pixel, neighbour) pairs, which OpenCV builds with per-level tables.
+    """
+    if levels is None:
+        levels = int(gray.max()) + 1
+
+    counts = np.empty((len(DIRECTIONS), levels, levels), dtype=np.float64)
+    for direction, (dy, dx) in enumerate(DIRECTIONS):
+        reference, neighbour = direction_slices(gray.shape, dy, dx, distance)
+        counts[direction] = cv2.calcHist(
+            [np.ascontiguousarray(gray[reference]), np.ascontiguousarray(gray[neighbour])],
+            [0, 1], None, [levels, levels], [0, levels, 0, levels])
+
+    return counts + counts.transpose(0, 2, 1)
+
+@lru_cache(maxsize=8)
+def _cell_index_map(shape, cell_size):
+    """Cell number of every pixel for a regular grid of square cells"""
+    h, w = shape
+    cols = w // cell_size
+    cell_rows = np.arange(h) // cell_size
+    cell_cols = np.arange(w) // cell_size
+    cells = cell_rows[:, None] * cols + cell_cols[None, :]
+    return cells.astype(np.uint8 if (h // cell_size) * cols <= 256 else np.int32)
+
+def cell_cooccurrence_matrices(gray, cell_size, levels, distance=1):
+    """Co-occurrence counts for every cell of a regular grid.
+
+    Each pixel pair is counted in the cell of its reference pixel, so the
+    cells partition the pairs of the whole (cropped) image. Returns an
+    array of shape (rows, cols, 4, levels, levels); matrices are not yet
+    symmetrized.
+    """
+    rows, cols = gray.shape[0] // cell_size, gray.shape[1] // cell_size
+    gray = gray[:rows * cell_size, :cols * cell_size]
+    h = gray.shape[0]
+
+    counts = np.empty((rows, cols, len(DIRECTIONS), levels, levels), dtype=np.float32)
+    if cols > 256:
+        cells = _cell_index_map(gray.shape, cell_size)
+        for direction, (dy, dx) in enumerate(DIRECTIONS):
+            reference, neighbour = direction_slices(gray.shape, dy, dx, distance)
+            codes = cells[reference].astype(np.int32) * (levels * levels)
+            codes += gray[reference].astype(np.int32) * levels
+            codes += gray[neighbour]
+            counts[:, :, direction] = np.bincount(
+                codes.ravel(), minlength=rows * cols * levels * levels).reshape(rows, cols, levels, levels)
+        return counts
+
+    # Bands of whole cell rows with at most 256 cells each, so every band is
+    # one 3-D (cell, pixel, neighbour) histogram with a uint8 cell index
+    band_rows = 256 // cols
+    for top in range(0, rows, band_rows):
+        bottom = min(top + band_rows, rows)
+        n_cells = (bottom - top) * cols
+        cells = _cell_index_map(((bottom - top) * cell_size, gray.shape[1]), cell_size)
+        band = counts[top:bottom].reshape(n_cells, len(DIRECTIONS), levels, levels)
+        for direction, (dy, dx) in enumerate(DIRECTIONS):
+            (_, ref_cols), (_, neighbour_cols) = direction_slices(gray.shape, dy, dx, distance)
+            dy *= distance
+            # Reference rows of this band that still have a neighbour row below
+            start, stop = top * cell_size, min(bottom * cell_size, h - dy)
+            band[:, direction] = cv2.calcHist(
+                [np.ascontiguousarray(cells[:stop - start, ref_cols]),
+                 np.ascontiguousarray(gray[start:stop, ref_cols]),
+                 np.ascontiguousarray(gray[start + dy:stop + dy, neighbour_cols])],
+                [0, 1, 2], None, [n_cells, levels, levels], [0, n_cells, 0, levels, 0, levels])
+
+    return counts
+
+def window_sums(cells, window):
+    """Sum every window x window block of cells using an integral histogram"""
+    rows, cols = cells.shape[:2]
+    flat = cells.reshape(rows, cols, -1)
+    integral = np.zeros((rows + 1, cols + 1, flat.shape[2]), dtype=flat.dtype)
+    for row in range(rows):
+        np.add(integral[row, 1:], flat[row], out=integral[row + 1, 1:])
+    for col in range(cols):
+        np.add(integral[:, col + 1], integral[:, col], out=integral[:, col + 1])
+
+    sums = (integral[window:, window:] - integral[:-window, window:]
+            - integral[window:, :-window] + integral[:-window, :-window])
+    return sums.reshape(sums.shape[:2] + cells.shape[2:])
+
+def tile_cooccurrence_matrices(gray, tile_size, stride, levels, distance=1):
+    """Symmetric co-occurrence matrices for sliding tiles.
+
+    Counts are gathered once per stride-sized cell and each tile is
+    assembled from its cells with an integral histogram, so overlapping
+    tiles never recount pixels. tile_size must be a multiple of stride.
+    Returns shape (tile_rows, tile_cols, 4, levels, levels).
+    """
+    if tile_size % stride:
+        raise ValueError('tile_size must be a multiple of stride')
+    cells = cell_cooccurrence_matrices(gray, stride, levels, distance)
+    tiles = window_sums(cells, tile_size // stride)
+    return tiles + np.swapaxes(tiles, -1, -2)
+
+def _entropy(p, axis):
+    """Base-2 entropy treating 0 * log(0) as 0"""
+    return -np.sum(p * np.log2(np.where(p > 0, p, 1)), axis=axis)
+
+def haralick_from_cooccurrence(cmats, features=None):
+    """Compute the selected Haralick features for a stack of co-occurrence matrices.
+
+    cmats has shape (..., L, L); the result has shape (..., n_features) with
+    features in the requested order. Only the intermediate sums the requested
+    features need are computed.
+    """
+    names = HARALICK_FEATURES if features is None else list(features)
+    unknown = set(names) - set(HARALICK_FEATURES)
+    if unknown:
+        raise ValueError(f"Unknown Haralick features: {sorted(unknown)}")
+    wanted = set(names)
+
+    cmats = np.asarray(cmats)
+    batch_shape = cmats.shape[:-2]
+    levels = cmats.shape[-1]
+    # Flattened (N, L*L) probabilities so weighted sums become matrix products
+    p = cmats.reshape(-1, levels * levels).astype(np.float64)
+    totals = p.sum(axis=1)
+    if np.any(totals == 0):
+        raise ValueError('Cannot compute Haralick features of an empty co-occurrence matrix')
+    p /= totals[:, None]
+
+    k = np.arange(levels, dtype=np.float64)
+    i, j = np.mgrid[:levels, :levels]
+    difference = np.abs(i - j).ravel()
+    results = {}
+
+    needs_marginals = wanted & {'correlation', 'sum_of_squares_variance',
+                                'info_correlation_1', 'info_correlation_2'}
+    if needs_marginals:
+        square = p.reshape(-1, levels, levels)
+        px = square.sum(axis=1)
+        py = square.sum(axis=2)
+        ux = px @ k
+        uy = py @ k
+        vx = px @ (k ** 2) - ux ** 2
+        vy = py @ (k ** 2) - uy ** 2
+
+    needs_minus = wanted & {'difference_variance', 'difference_entropy'}
+    if needs_minus:
+        # p_{x-y}(d) for every matrix in one weighted bincount
+        offsets = np.arange(p.shape[0])[:, None] * levels
+        index = (offsets + difference).ravel()
+        px_minus_y = np.bincount(index, weights=p.ravel(),
+                                 minlength=p.shape[0] * levels).reshape(-1, levels)
+
+    needs_plus = wanted & {'sum_average', 'sum_variance', 'sum_entropy'}
+    if needs_plus:
+        offsets = np.arange(p.shape[0])[:, None] * (2 * levels)
+        index = (offsets + (i + j).ravel()).ravel()
+        px_plus_y = np.bincount(index, weights=p.ravel(),
+                                minlength=p.shape[0] * 2 * levels).reshape(-1, 2 * levels)
+        tk = np.arange(2 * levels, dtype=np.float64)
+
+    needs_entropy = wanted & {'entropy', 'info_correlation_1', 'info_correlation_2'}
+    if needs_entropy:
+        hxy = _entropy(p, axis=1)
+
+    if 'angular_second_moment' in wanted:
+        results['angular_second_moment'] = np.einsum('ij,ij->i', p, p)
+    if 'contrast' in wanted:
+        results['contrast'] = p @ (difference ** 2).astype(np.float64)
+    if 'correlation' in wanted:
+        sxsy = np.sqrt(vx) * np.sqrt(vy)
+        cross = p @ (i * j).ravel().astype(np.float64) - ux * uy
+        with np.errstate(divide='ignore', invalid='ignore'):
+            results['correlation'] = np.where(sxsy == 0, 1.0, cross / sxsy)
+    if 'sum_of_squares_variance' in wanted:
+        results['sum_of_squares_variance'] = vx
+    if 'inverse_difference_moment' in wanted:
+        results['inverse_difference_moment'] = p @ (1.0 / (1.0 + difference ** 2))
+    if needs_plus:
+        sum_average = px_plus_y @ tk
+        if 'sum_average' in wanted:
+            results['sum_average'] = sum_average
+        if 'sum_variance' in wanted:
+            results['sum_variance'] = px_plus_y @ (tk ** 2) - sum_average ** 2
+        if 'sum_entropy' in wanted:
+            results['sum_entropy'] = _entropy(px_plus_y, axis=1)
+    if 'entropy' in wanted:
+        results['entropy'] = hxy
+    if 'difference_variance' in wanted:
+        results['difference_variance'] = px_minus_y.var(axis=1)
+    if 'difference_entropy' in wanted:
+        results['difference_entropy'] = _entropy(px_minus_y, axis=1)
+    if wanted & {'info_correlation_1', 'info_correlation_2'}:
+        hx = _entropy(px, axis=1)
+        hy = _entropy(py, axis=1)
+        # With normalized marginals both cross entropies reduce to sums of
+        # marginal terms, so the outer product is never materialized
+        log_px = np.log2(np.where(px > 0, px, 1))
+        log_py = np.log2(np.where(py > 0, py, 1))
+        hxy1 = -(np.sum(log_px * py, axis=1) + np.sum(log_py * px, axis=1))
+        hxy2 = hx + hy
+        if 'info_correlation_1' in wanted:
+            max_h = np.maximum(hx, hy)
+            results['info_correlation_1'] = (hxy - hxy1) / np.where(max_h == 0, 1, max_h)
+        if 'info_correlation_2' in wanted:
+            results['info_correlation_2'] = np.sqrt(np.maximum(0, 1 - np.exp(-2.0 * (hxy2 - hxy))))
+
+    stacked = np.stack([results[name] for name in names], axis=-1)
+    return stacked.reshape(batch_shape + (len(names),))
+
+def haralick(gray, levels=256, features=None, distance=1):
+    """Haralick features of a uint8 image for all four directions.
+
+    With levels=256 the result matches mahotas.features.haralick. Fewer
+    levels quantize the image first, which shrinks the co-occurrence
+    matrices; feature values are then in units of the quantized levels.
+    """
+    quantized = quantize(gray, levels)
+    cmats = cooccurrence_matrices(quantized, distance=distance)
+    return haralick_from_cooccurrence(cmats, features)
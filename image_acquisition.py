@@ -33,6 +33,17 @@ class ImageCapture:
         if self.camera:
             self.camera.release()
     
+    def decode_image(self, data):
+        """Decode an encoded image held in memory (e.g. an upload) without touching disk"""
+        try:
+            buffer = np.frombuffer(data, dtype=np.uint8)
+            if buffer.size == 0:
+                return None
+            return cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+        except Exception as e:
+            print(f"Error decoding image: {e}")
+            return None
+    
     def load_image(self, image_path):
         """Load image from file path"""
         try:
@@ -2,6 +2,12 @@
 import cv2
 import numpy as np
 
+def to_grayscale(image):
+    """Return a single-channel view of an image, converting only BGR input"""
+    if image.ndim == 2:
+        return image
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
 def resize_image(image, width=None, height=None):
     """Resize image while maintaining aspect ratio"""
     if width is None and height is None:
@@ -80,4 +86,42 @@ def create_image_montage(images, grid_shape=None):
     if montage_images:
         return np.concatenate(montage_images, axis=0)
     else:
-        return np.zeros((100, 100, 3), dtype=np.uint8)
\ No newline at end of file
+        return np.zeros((100, 100, 3), dtype=np.uint8)
+
+def extract_regions(mask, min_area=1, max_regions=None, score_map=None):
+    """Connected regions of a binary mask with their shape statistics.
+    
+    Returns one dict per 8-connected region of at least min_area pixels,
+    largest first: bounding box (x, y, width, height), pixel area,
+    elongation and score. Elongation is the ratio of the principal axes of
+    the region's pixels (1 for a blob, large for a scratch). The score is
+    the mean of score_map over the region, or the share of its bounding box
+    it fills.
+    """
+    _, labels, stats, _ = cv2.connectedComponentsWithStats((mask > 0).astype(np.uint8), connectivity=8)
+    
+    # Label 0 is the background
+    areas = stats[1:, cv2.CC_STAT_AREA]
+    keep = np.flatnonzero(areas >= min_area)
+    keep = keep[np.argsort(-areas[keep], kind='stable')][:max_regions] + 1
+    
+    regions = []
+    for label in keep:
+        x, y, width, height, area = (int(value) for value in stats[label])
+        region = (labels[y:y + height, x:x + width] == label).astype(np.uint8)
+        
+        # Principal axes from second moments; the 1/12 is a pixel's own
+        # extent, so single-pixel-wide regions keep a finite ratio
+        moments = cv2.moments(region, binaryImage=True)
+        mu20, mu02, mu11 = (moments[key] / area for key in ('mu20', 'mu02', 'mu11'))
+        spread = np.hypot((mu20 - mu02) / 2, mu11)
+        major = (mu20 + mu02) / 2 + spread + 1 / 12
+        minor = (mu20 + mu02) / 2 - spread + 1 / 12
+        
+        if score_map is not None:
+            score = cv2.mean(score_map[y:y + height, x:x + width], mask=region)[0]
+        else:
+            score = area / (width * height)
+        regions.append({'x': x, 'y': y, 'width': width, 'height': height, 'area': area,
+                        'elongation': float(np.sqrt(major / minor)), 'score': float(score)})
+    return regions
@@ -0,0 +1,273 @@
+# src/inspection_pipeline.py
+import random
+import threading
+import time
+from collections import deque
+import cv2
+import numpy as np
+from config import Config
+from src.preprocessing import ImagePreprocessor
+from src.edge_detection import EdgeDefectDetector
+from src.texture_analysis import TextureAnalyzer
+from src.defect_classifier import DefectClassifier
+from src.color_analysis import ColorAnalyzer
+from src.frame_context import FrameContext
+
+class StageExitStats:
+    """How many frames leave the pipeline at each stage, how long they took,
+    and how often audited early exits agreed with the full pipeline"""
+
+    LATENCY_WINDOW = 1000  # Frames kept per stage for latency percentiles
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.exits = {}
+        self.latencies = {}
+        self.audits = 0
+        self.agreements = 0
+
+    def record(self, stage, seconds):
+        with self.lock:
+            self.exits[stage] = self.exits.get(stage, 0) + 1
+            self.latencies.setdefault(stage, deque(maxlen=self.LATENCY_WINDOW)).append(seconds)
+
+    def record_audit(self, agreed):
+        with self.lock:
+            self.audits += 1
+            self.agreements += int(agreed)
+
+    def get_stats(self):
+        """Exit count, exit rate and latency mean/p99 (ms) per stage, and early exit agreement"""
+        with self.lock:
+            exits = dict(self.exits)
+            latencies = {stage: np.array(values) for stage, values in self.latencies.items()}
+            audits, agreements = self.audits, self.agreements
+        frames = sum(exits.values())
+        stages = {}
+        for stage, count in exits.items():
+            stages[stage] = {
+                'exits': count,
+                'exit_rate': count / frames,
+                'latency_mean_ms': 1000 * float(latencies[stage].mean()),
+                'latency_p99_ms': 1000 * float(np.percentile(latencies[stage], 99))
+            }
+        return {'frames': frames, 'stages': stages, 'early_exit_audits': audits,
+                'early_exit_agreement': agreements / audits if audits else None}
+
+class InspectionPipeline:
+    def __init__(self, preprocessor=None, edge_detector=None, texture_analyzer=None,
+                 defect_classifier=None, texture_mode=None, pyramid=None, cascade=None,
+                 defect_regions=None, reference_profiles=None):
+        self.preprocessor = preprocessor or ImagePreprocessor(grayscale=Config.GRAYSCALE_PREPROCESSING)
+        self.edge_detector = edge_detector or EdgeDefectDetector()
+        self.texture_analyzer = texture_analyzer or TextureAnalyzer(
+            Config.GLCM_BACKEND, Config.GLCM_LEVELS, Config.TEXTURE_TILE_SIZE,
+            Config.TEXTURE_TILE_STRIDE, Config.TEXTURE_TILE_LEVELS)
+        self.defect_classifier = defect_classifier or DefectClassifier()
+        self.texture_mode = texture_mode or Config.TEXTURE_MODE
+        
+        # Coarse-to-fine screening settings
+        self.pyramid = Config.PYRAMID_INSPECTION if pyramid is None else pyramid
+        self.pyramid_levels = Config.PYRAMID_LEVELS
+        self.region_size = Config.PYRAMID_REGION_SIZE
+        self.edge_threshold = Config.PYRAMID_EDGE_THRESHOLD
+        self.texture_threshold = Config.PYRAMID_TEXTURE_THRESHOLD
+        # Scores texture on coarse tiles that each cover one screening region
+        coarse_region = max(self.region_size >> self.pyramid_levels, 1)
+        self.coarse_texture_analyzer = TextureAnalyzer(
+            tile_size=coarse_region, tile_stride=coarse_region, tile_levels=Config.TEXTURE_TILE_LEVELS)
+        
+        # Cheap-first cascade: a confident edge-only verdict ends inspection early
+        self.cascade = Config.CASCADE_INSPECTION if cascade is None else cascade
+        self.cascade_confidence = Config.CASCADE_CONFIDENCE
+        self.cascade_audit_fraction = Config.CASCADE_AUDIT_FRACTION
+        self.stage_stats = StageExitStats()
+        
+        # Per-region localization of edge defects
+        self.defect_regions = Config.DEFECT_REGIONS if defect_regions is None else defect_regions
+        self.region_min_area = Config.REGION_MIN_AREA
+        self.region_max_per_frame = Config.REGION_MAX_PER_FRAME
+        
+        # Product-specific discoloration against stored reference colors
+        self.reference_profiles = reference_profiles
+        self.color_analyzer = ColorAnalyzer(reference_profiles)
+
+    def analyze(self, image, product_id=None):
+        """Run the defect detection pipeline without persisting the result"""
+        results = self.extract_features(image, product_id)
+        self.classify([results])
+        return results
+
+    def reference_profile(self, product_id):
+        """Stored LAB reference color of a product, or None"""
+        if product_id is None or self.reference_profiles is None:
+            return None
+        return self.reference_profiles.get(product_id)
+
+    def extract_features(self, image, product_id=None, reference_lab=None):
+        """Run every detection stage except classification.
+
+        The combined vector is returned as results['feature_vector'], so
+        many results can be classified together with classify(). In
+        pyramid mode a frame screened as GOOD is returned already
+        classified, without a feature vector, and so is a frame whose
+        edge-only verdict is confident enough to leave the cascade early.
+        results['exit_stage'] names the last stage that ran.
+
+        Frames of a product with a reference profile also get
+        results['discoloration'], the share of pixels far from the product's
+        reference color. reference_lab stands in for the profile lookup in
+        processes without a database connection.
+        """
+        start = time.perf_counter()
+        if self.pyramid:
+            results = self.extract_features_pyramid(image)
+        else:
+            results = self.full_resolution_features(self.preprocessor.preprocess(image))
+        if product_id is not None:
+            results['product_id'] = product_id
+            if reference_lab is None:
+                reference_lab = self.reference_profile(product_id)
+            if reference_lab is not None:
+                _, results['discoloration'] = self.color_analyzer.detect_discoloration(
+                    image, reference_lab=reference_lab)
+        self.stage_stats.record(results['exit_stage'], time.perf_counter() - start)
+        return results
+
+    def full_resolution_features(self, processed_image):
+        """Edge and texture features of a preprocessed frame"""
+        results = {}
+        frame = FrameContext(processed_image)
+
+        # Edge-based defect detection
+        edge_defects = self.edge_detector.detect_cracks_canny(frame)
+        edge_density = np.sum(edge_defects) / (255 * edge_defects.size)
+        results['edge_density'] = edge_density
+        if self.defect_regions:
+            results['defect_regions'] = self.edge_detector.extract_defect_regions(
+                frame, self.region_min_area, self.region_max_per_frame)
+
+        if self.cascade:
+            verdict = self.edge_exit(edge_density)
+            if verdict is not None:
+                results['defect_type'], results['confidence'] = verdict
+                results['exit_stage'] = 'edges'
+                if random.random() < self.cascade_audit_fraction:
+                    self.audit_edge_exit(frame, results)
+                return results
+
+        return self.add_texture_features(frame, results)
+
+    def add_texture_features(self, frame, results):
+        """Texture stage: adds the texture results and the combined feature vector"""
+        edge_density = results['edge_density']
+        texture_result, texture_features = self.texture_analyzer.analyze_texture_defects(frame)
+        if self.texture_mode == 'tiled':
+            # Local scores keep small defects from being averaged away. They are
+            # reported next to the feature vector, which is the same in both modes
+            tile_result, heat_map = self.texture_analyzer.analyze_texture_tiles(frame)
+            results['texture_heat_map'] = heat_map.tolist()
+            results['texture_heat_max'] = float(heat_map.max()) if heat_map.size else 0.0
+            if tile_result == "DEFECT":
+                texture_result = "DEFECT"
+        results['texture_analysis'] = texture_result
+        results['texture_features'] = texture_features.tolist()
+
+        # Combine features for classification
+        combined_features = np.concatenate([
+            [edge_density],
+            texture_features
+        ])
+        results['feature_vector'] = combined_features.tolist()
+        results['exit_stage'] = 'texture'
+
+        return results
+
+    def edge_exit(self, edge_density):
+        """(defect type, confidence) when the edge-only verdict is confident enough, else None"""
+        verdict = self.defect_classifier.classify_edge_density([edge_density])
+        if verdict is None:
+            return None
+        defect_types, confidences = verdict
+        if confidences[0] < self.cascade_confidence:
+            return None
+        return str(defect_types[0]), float(confidences[0])
+
+    def audit_edge_exit(self, frame, results):
+        """Run the texture stage for an early-exited frame and record whether the verdicts agree.
+
+        The outcome is also kept as results['early_exit_agreed'], so batch
+        workers can report it to the parent's stats.
+        """
+        full = self.add_texture_features(frame, {'edge_density': results['edge_density']})
+        self.classify([full])
+        results['early_exit_agreed'] = full['defect_type'] == results['defect_type']
+        self.stage_stats.record_audit(results['early_exit_agreed'])
+
+    def extract_features_pyramid(self, image):
+        """Screen the coarsest pyramid level and escalate only suspicious frames.
+
+        Edge density and texture defect probability are scored for each
+        region of region_size full-resolution pixels. With no region over a
+        threshold the frame is GOOD and the full-resolution stages are
+        skipped. Otherwise they run on the whole frame, as the classifier's
+        features describe the whole frame, and the regions that triggered
+        escalation are reported as [x, y, width, height] boxes.
+        """
+        pyramid = self.preprocessor.gray_pyramid(image, self.pyramid_levels)
+        coarse = self.preprocessor.enhance_contrast_gray(pyramid[-1])
+        edges = self.edge_detector.detect_cracks_canny(coarse)
+        region_edges, region_texture = self.coarse_region_scores(coarse, edges)
+        escalated = (region_edges > self.edge_threshold) | (region_texture > self.texture_threshold)
+
+        if escalated.any():
+            if self.preprocessor.grayscale:
+                processed_image = self.preprocessor.clean_gray(pyramid[0])
+            else:
+                processed_image = self.preprocessor.preprocess(image)
+            results = self.full_resolution_features(processed_image)
+            results['inspection_scale'] = 'full'
+        else:
+            # How far below the thresholds the worst region stayed
+            margin = max(region_edges.max(initial=0) / self.edge_threshold,
+                         region_texture.max(initial=0) / self.texture_threshold)
+            results = {
+                'edge_density': np.count_nonzero(edges) / edges.size,
+                'texture_analysis': 'GOOD',
+                'defect_type': 'GOOD',
+                'confidence': 1.0 - 0.5 * margin,
+                'inspection_scale': 'coarse',
+                'exit_stage': 'coarse'
+            }
+
+        results['escalated_regions'] = [
+            [int(col) * self.region_size, int(row) * self.region_size, self.region_size, self.region_size]
+            for row, col in np.argwhere(escalated)]
+        return results
+
+    def coarse_region_scores(self, coarse, edges):
+        """(edge density, texture defect probability) grids over the screening regions"""
+        cell = max(self.region_size >> self.pyramid_levels, 1)
+        rows, cols = coarse.shape[0] // cell, coarse.shape[1] // cell
+        # Area interpolation averages each cell, giving its share of edge pixels
+        region_edges = cv2.resize(edges[:rows * cell, :cols * cell], (cols, rows),
+                                  interpolation=cv2.INTER_AREA) / 255.0
+        _, region_texture = self.coarse_texture_analyzer.analyze_texture_tiles(coarse)
+        return region_edges, region_texture[:rows, :cols]
+
+    def classify(self, results):
+        """Classify a list of extract_features results in one batch, in place.
+
+        Results without a feature vector, such as frames screened GOOD in
+        pyramid mode, keep the verdict they already have.
+        """
+        results_to_classify = [result for result in results if 'feature_vector' in result]
+        if not results_to_classify:
+            return results
+        features = np.array([result['feature_vector'] for result in results_to_classify])
+        defect_types, confidences = self.defect_classifier.classify_batch(features)
+        for result, defect_type, confidence in zip(results_to_classify, defect_types.tolist(),
+                                                   confidences.tolist()):
+            result['defect_type'] = defect_type
+            result['confidence'] = confidence
+        return results
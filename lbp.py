@@ -0,0 +1,125 @@
+# src/lbp.py
+from functools import lru_cache
+import cv2
+import numpy as np
+
+# Offsets closer than this to an integer are treated as exact, so the
+# sin/cos rounding noise of axis-aligned points does not add extra taps
+_SNAP = 1e-9
+
+# Bilinear weights are rounded to float32, so a flat neighbourhood can
+# interpolate a hair above its centre; gray levels differ by at least 1
+_TOLERANCE = 1e-3
+
+def _snap(value):
+    nearest = np.round(value)
+    return nearest if abs(value - nearest) < _SNAP else value
+
+@lru_cache(maxsize=32)
+def sampling_taps(radius, points, sampling='bilinear'):
+    """Precomputed neighbour sampling for every point on the circle.
+
+    Returns a tuple with one entry per point, each a tuple of
+    (dy, dx, weight) taps relative to the centre pixel. 'bilinear' samples
+    the true circle position (y - r*sin, x - r*cos) from its four nearest
+    pixels. 'mahotas' reproduces mahotas.features.lbp_transform, whose
+    order-1 shift reads the single pixel at floor(1 - offset) instead.
+    """
+    if sampling not in ('bilinear', 'mahotas'):
+        raise ValueError(f"Unknown LBP sampling: {sampling}")
+
+    angles = np.linspace(0, 2 * np.pi, points + 1)[:-1]
+    taps = []
+    for sy, sx in zip(np.sin(angles), np.cos(angles)):
+        sy, sx = _snap(radius * sy), _snap(radius * sx)
+        if sampling == 'mahotas':
+            taps.append(((int(np.floor(1 - sy)), int(np.floor(1 - sx)), 1.0),))
+            continue
+
+        y, x = -sy, -sx
+        y0, x0 = int(np.floor(y)), int(np.floor(x))
+        fy, fx = y - y0, x - x0
+        point_taps = []
+        for dy, wy in ((y0, 1 - fy), (y0 + 1, fy)):
+            for dx, wx in ((x0, 1 - fx), (x0 + 1, fx)):
+                if wy * wx > 0:
+                    point_taps.append((dy, dx, wy * wx))
+        taps.append(tuple(point_taps))
+    return tuple(taps)
+
+@lru_cache(maxsize=32)
+def riu2_table(points):
+    """Rotation-invariant uniform label for every (transitions, ones) pair.
+
+    Patterns with at most two 0/1 transitions around the circle are labelled
+    by their number of ones (0..points); all others share label points + 1.
+    """
+    transitions, ones = np.mgrid[:points + 1, :points + 1]
+    return np.where(transitions <= 2, ones, points + 1).astype(np.uint8)
+
+def riu2_transform(gray, radius, points, sampling='bilinear'):
+    """Rotation-invariant uniform LBP label of every pixel.
+
+    The bit pattern is never materialized: its number of ones and circular
+    transitions are accumulated point by point and mapped through
+    riu2_table. Pixels outside the image read as zero, like mahotas.
+    """
+    taps = sampling_taps(radius, points, sampling)
+    pad = int(np.ceil(radius)) + 1
+    h, w = gray.shape
+    padded = cv2.copyMakeBorder(gray.astype(np.float32), pad, pad, pad, pad,
+                                cv2.BORDER_CONSTANT, value=0)
+    threshold = padded[pad:pad + h, pad:pad + w] + np.float32(_TOLERANCE)
+
+    sample = np.empty((h, w), dtype=np.float32)
+    bit = np.empty((h, w), dtype=bool)
+    previous = np.empty((h, w), dtype=bool)
+    first = np.empty((h, w), dtype=bool)
+    change = np.empty((h, w), dtype=bool)
+    ones = np.zeros((h, w), dtype=np.uint8)
+    transitions = np.zeros((h, w), dtype=np.uint8)
+
+    for index, point_taps in enumerate(taps):
+        for tap, (dy, dx, weight) in enumerate(point_taps):
+            shifted = padded[pad + dy:pad + dy + h, pad + dx:pad + dx + w]
+            if tap:
+                cv2.scaleAdd(shifted, weight, sample, dst=sample)
+            elif weight == 1.0:
+                np.copyto(sample, shifted)
+            else:
+                np.multiply(shifted, np.float32(weight), out=sample)
+        np.greater(sample, threshold, out=bit)
+        ones += bit
+        if index == 0:
+            np.copyto(first, bit)
+        else:
+            np.not_equal(bit, previous, out=change)
+            transitions += change
+        bit, previous = previous, bit
+
+    # Close the circle between the last and the first point
+    np.not_equal(previous, first, out=change)
+    transitions += change
+    return riu2_table(points)[transitions, ones]
+
+def lbp_histogram(gray, radius=3, points=24, sampling='bilinear', normalize=True):
+    """Concatenated riu2 LBP histograms for one or more (radius, points) scales.
+
+    radius and points may be scalars or equal-length sequences; each scale
+    contributes points + 2 bins.
+    """
+    radii = np.atleast_1d(radius).tolist()
+    counts = np.atleast_1d(points).tolist()
+    if len(counts) == 1:
+        counts = counts * len(radii)
+    if len(radii) != len(counts):
+        raise ValueError('radius and points must have the same length')
+
+    histograms = []
+    for r, p in zip(radii, counts):
+        labels = riu2_transform(gray, r, int(p), sampling)
+        hist = np.bincount(labels.ravel(), minlength=int(p) + 2).astype(np.float64)
+        if normalize:
+            hist /= (hist.sum() + 1e-7)
+        histograms.append(hist)
+    return np.concatenate(histograms)
@@ -0,0 +1,31 @@
+# scripts/learn_from_labels.py
+#!/usr/bin/env python3
+
+import argparse
+from config import Config
+from src.database_handler import DatabaseHandler
+from src.online_learning import OnlineTrainer
+
+def learn_from_labels(model_dir=Config.MODEL_PATH, min_labels=Config.ONLINE_MIN_LABELS):
+    """Apply every operator label recorded since the last online checkpoint and save a new one"""
+    db_handler = DatabaseHandler(write_behind=False)
+    trainer = OnlineTrainer(db_handler, model_dir, batch_size=Config.ONLINE_BATCH_SIZE,
+                            min_labels=min_labels, keep_checkpoints=Config.ONLINE_KEEP_CHECKPOINTS)
+    print(f"Resuming after label {trainer.last_label_id} ({trainer.labels_seen} labels learned so far)")
+
+    learned = trainer.update()
+    print(f"Learned from {learned} new labels in {trainer.last_update_seconds:.3f}s")
+    path = trainer.checkpoint() if learned else None
+    if path is None:
+        print(f"No checkpoint saved ({trainer.labels_seen} labels, {min_labels} required)")
+    db_handler.close()
+    return path
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Update the online severity model from operator labels')
+    parser.add_argument('--model-dir', default=Config.MODEL_PATH, help='directory of model artifacts')
+    parser.add_argument('--min-labels', type=int, default=Config.ONLINE_MIN_LABELS,
+                        help='labels required before the first checkpoint')
+    args = parser.parse_args()
+
+    learn_from_labels(args.model_dir, args.min_labels)
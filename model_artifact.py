@@ -0,0 +1,182 @@
+# src/model_artifact.py
+import json
+import os
+import shutil
+from datetime import datetime
+import numpy as np
+from src.defect_classifier import DefectClassifier, EdgeModel, NystroemModel, OnlineModel, SVCModel
+from src.utils.constants import FEATURE_SCHEMAS, FEATURE_SCHEMA_VERSION
+
+ARTIFACT_FORMAT_VERSION = 1
+ARTIFACT_PREFIX = 'severity-v'
+MANIFEST_FILE = 'manifest.json'
+EDGE_PREFIX = 'edge_'  # Arrays of the cascade's edge-only model
+
+# Array-backed model classes, by classifier backend
+MODEL_TYPES = {'svc': SVCModel, 'nystroem': NystroemModel, 'sgd': OnlineModel}
+
+class ModelArtifactError(ValueError):
+    """A model artifact is malformed or does not match the live feature layout"""
+
+def artifact_versions(model_dir, complete=True):
+    """(version, path) of every complete artifact under model_dir, oldest first.
+
+    An artifact is complete once its manifest exists; with complete=False
+    versions still being written are listed too.
+    """
+    if not os.path.isdir(model_dir):
+        return []
+    versions = []
+    for name in os.listdir(model_dir):
+        suffix = name[len(ARTIFACT_PREFIX):]
+        path = os.path.join(model_dir, name)
+        if not (name.startswith(ARTIFACT_PREFIX) and suffix.isdigit()):
+            continue
+        if complete and not os.path.isfile(os.path.join(path, MANIFEST_FILE)):
+            continue
+        versions.append((int(suffix), path))
+    return sorted(versions)
+
+def _reserve_version(model_dir):
+    """Create the directory of the next free version; returns (version, path).
+
+    os.mkdir fails if the directory exists, so concurrent writers (online
+    checkpoints and train_model.py) never get the same version.
+    """
+    os.makedirs(model_dir, exist_ok=True)
+    versions = artifact_versions(model_dir, complete=False)
+    version = versions[-1][0] + 1 if versions else 1
+    while True:
+        path = os.path.join(model_dir, f"{ARTIFACT_PREFIX}{version:04d}")
+        try:
+            os.mkdir(path)
+            return version, path
+        except FileExistsError:
+            version += 1
+
+def latest_artifact(model_dir):
+    """Path of the newest artifact under model_dir, or None"""
+    versions = artifact_versions(model_dir)
+    return versions[-1][1] if versions else None
+
+def read_manifest(path):
+    """Manifest of an artifact directory"""
+    try:
+        with open(os.path.join(path, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        raise ModelArtifactError(f"Unreadable manifest in {path}: {e}")
+
+def save_model_artifact(classifier, model_dir, metadata=None):
+    """Write a trained classifier as the next artifact version under model_dir.
+
+    Each parameter is a separate .npy file, so loading can memory-map it;
+    manifest.json records the backend, classes, feature schema and the
+    shape and dtype of every array. It is renamed into place last, so the
+    artifact only counts as complete once fully written. Returns its path.
+    """
+    if not classifier.is_trained:
+        raise ValueError('Only a trained classifier can be saved')
+    model = classifier.model
+    if classifier.backend == 'svc' and not isinstance(model, SVCModel):
+        model = SVCModel.from_estimator(model)
+
+    arrays = dict(model.get_arrays())
+    arrays['scaler_mean'] = classifier.scaler.mean_
+    arrays['scaler_scale'] = classifier.scaler.scale_
+    # Running statistics, so an incrementally trained scaler can resume
+    arrays['scaler_var'] = classifier.scaler.var_
+    arrays['scaler_samples'] = np.array(classifier.scaler.n_samples_seen_)
+    if classifier.edge_model is not None:
+        for name, values in classifier.edge_model.get_arrays().items():
+            arrays[f"{EDGE_PREFIX}{name}"] = values
+
+    version, path = _reserve_version(model_dir)
+    try:
+        entries = {}
+        for name, values in arrays.items():
+            values = np.asarray(values)
+            if values.dtype == object:
+                values = values.astype(str)
+            np.save(os.path.join(path, f"{name}.npy"), values, allow_pickle=False)
+            entries[name] = {'file': f"{name}.npy", 'dtype': values.dtype.str, 'shape': list(values.shape)}
+
+        manifest = {
+            'format_version': ARTIFACT_FORMAT_VERSION,
+            'model_version': version,
+            'backend': classifier.backend,
+            'classes': [str(label) for label in model.classes_],
+            'feature_schema_version': FEATURE_SCHEMA_VERSION,
+            'feature_names': FEATURE_SCHEMAS[FEATURE_SCHEMA_VERSION],
+            'arrays': entries,
+            'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'metadata': metadata or {}
+        }
+        manifest_path = os.path.join(path, MANIFEST_FILE)
+        with open(f"{manifest_path}.tmp", 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(f"{manifest_path}.tmp", manifest_path)
+    except BaseException:
+        # Release the reserved version rather than leave a partial artifact
+        shutil.rmtree(path, ignore_errors=True)
+        raise
+    return path
+
+def load_model_artifact(path):
+    """Load an artifact as a trained DefectClassifier, validating it first.
+
+    Arrays are memory-mapped rather than read. Raises ModelArtifactError
+    when the format, feature layout or array shapes do not match.
+    """
+    manifest = read_manifest(path)
+    if manifest.get('format_version') != ARTIFACT_FORMAT_VERSION:
+        raise ModelArtifactError(f"Unsupported artifact format {manifest.get('format_version')}")
+    if manifest.get('backend') not in MODEL_TYPES:
+        raise ModelArtifactError(f"Unknown classifier backend {manifest.get('backend')}")
+    live_features = FEATURE_SCHEMAS[FEATURE_SCHEMA_VERSION]
+    if manifest.get('feature_names') != live_features:
+        raise ModelArtifactError(f"Model expects features {manifest.get('feature_names')}, "
+                                 f"pipeline produces {live_features}")
+
+    arrays = {}
+    for name, entry in manifest['arrays'].items():
+        try:
+            values = np.load(os.path.join(path, entry['file']), mmap_mode='r', allow_pickle=False)
+        except (OSError, ValueError) as e:
+            raise ModelArtifactError(f"Unreadable array {name} in {path}: {e}")
+        if list(values.shape) != entry['shape'] or values.dtype.str != entry['dtype']:
+            raise ModelArtifactError(f"Array {name} is {values.dtype.str}{list(values.shape)}, "
+                                     f"manifest says {entry['dtype']}{entry['shape']}")
+        arrays[name] = values
+
+    for name in ('scaler_mean', 'scaler_scale'):
+        if arrays.get(name) is None or arrays[name].shape != (len(live_features),):
+            raise ModelArtifactError(f"{name} does not have one value per feature")
+    arrays['classes'] = np.array(arrays['classes'])
+    if arrays['classes'].tolist() != manifest['classes']:
+        raise ModelArtifactError('Class labels do not match the manifest')
+
+    classifier = DefectClassifier(manifest['backend'])
+    classifier.scaler.mean_ = arrays.pop('scaler_mean')
+    classifier.scaler.scale_ = arrays.pop('scaler_scale')
+    if 'scaler_var' in arrays:
+        classifier.scaler.var_ = arrays.pop('scaler_var')
+        classifier.scaler.n_samples_seen_ = np.int64(arrays.pop('scaler_samples'))
+        classifier.scaler.n_features_in_ = len(live_features)
+    edge_arrays = {name[len(EDGE_PREFIX):]: arrays.pop(name)
+                   for name in list(arrays) if name.startswith(EDGE_PREFIX)}
+    if edge_arrays:
+        # Incrementally trained edge models carry their step count
+        edge_type = OnlineModel if 't' in edge_arrays else EdgeModel
+        try:
+            edge_arrays['classes'] = np.array(edge_arrays['classes'])
+            classifier.edge_model = edge_type.from_arrays(edge_arrays)
+        except KeyError as e:
+            raise ModelArtifactError(f"Missing array {EDGE_PREFIX}{e.args[0]} for the edge model")
+    try:
+        classifier.model = MODEL_TYPES[manifest['backend']].from_arrays(arrays)
+    except KeyError as e:
+        raise ModelArtifactError(f"Missing array {e} for the {manifest['backend']} backend")
+    classifier.is_trained = True
+    classifier.manifest = manifest
+    return classifier
@@ -0,0 +1,179 @@
+# src/model_registry.py
+import random
+import threading
+import time
+from collections import deque
+import numpy as np
+from src.defect_classifier import DefectClassifier
+from src.model_artifact import ModelArtifactError, artifact_versions, load_model_artifact
+
+class ModelRegistry:
+    """Live severity model that follows new artifacts in model_dir without a restart.
+
+    A watcher thread polls model_dir, then loads, validates and warms up
+    each new version off the request path. With shadow_fraction 0 a new
+    version replaces the live model at once. Otherwise it becomes a
+    candidate that also scores that fraction of batches, recording
+    agreement and added latency, until promote() or reject() is called.
+    Each classify_batch call reads the live model once, so a swap never
+    splits a batch.
+    """
+
+    LATENCY_WINDOW = 1000  # Shadow batches kept for latency percentiles
+
+    def __init__(self, model_dir, poll_interval=5.0, shadow_fraction=0.0):
+        self.model_dir = model_dir
+        self.poll_interval = poll_interval
+        self.shadow_fraction = shadow_fraction
+        self.live = DefectClassifier()
+        self.candidate = None
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.skipped_versions = set()
+        self.swaps = 0
+        self.last_error = None
+        self._reset_shadow_stats()
+
+    def _reset_shadow_stats(self):
+        self.shadow_batches = 0
+        self.shadow_samples = 0
+        self.agreements = 0
+        self.live_latencies = deque(maxlen=self.LATENCY_WINDOW)
+        self.candidate_latencies = deque(maxlen=self.LATENCY_WINDOW)
+
+    @staticmethod
+    def version_of(classifier):
+        """Artifact version of a classifier, or None for the rule-based fallback"""
+        if classifier is None or classifier.manifest is None:
+            return None
+        return classifier.manifest['model_version']
+
+    def start(self):
+        """Start watching model_dir in a background thread"""
+        if self.thread is None:
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, name='model-registry', daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        if self.thread is not None:
+            self.stop_event.set()
+            self.thread.join()
+            self.thread = None
+
+    def _run(self):
+        while not self.stop_event.wait(self.poll_interval):
+            self.check()
+
+    def check(self):
+        """Load the newest artifact if it is newer than the live and candidate models.
+
+        Returns True when a model was swapped in or became the candidate.
+        Versions that fail validation or were rejected are not retried.
+        """
+        versions = artifact_versions(self.model_dir)
+        if not versions:
+            return False
+        version, path = versions[-1]
+        known = max(self.version_of(self.live) or 0, self.version_of(self.candidate) or 0)
+        if version <= known or version in self.skipped_versions:
+            return False
+
+        try:
+            classifier = load_model_artifact(path)
+        except ModelArtifactError as e:
+            print(f"Error loading model {path}: {e}")
+            self.skipped_versions.add(version)
+            self.last_error = str(e)
+            return False
+        warm_up_time = classifier.warm_up()
+
+        if self.shadow_fraction > 0 and self.live.is_trained:
+            with self.lock:
+                self.candidate = classifier
+                self._reset_shadow_stats()
+            print(f"Shadow scoring {classifier.backend} model v{version} on "
+                  f"{self.shadow_fraction:.0%} of batches (warm-up {1000 * warm_up_time:.1f} ms)")
+        else:
+            self._swap(classifier)
+            print(f"Loaded {classifier.backend} model v{version} from {path} "
+                  f"(warm-up {1000 * warm_up_time:.1f} ms)")
+        return True
+
+    def _swap(self, classifier):
+        with self.lock:
+            self.live = classifier
+            self.swaps += 1
+            if self.candidate is classifier:
+                self.candidate = None
+
+    def promote(self):
+        """Make the candidate the live model; returns False if there is none"""
+        candidate = self.candidate
+        if candidate is None:
+            return False
+        self._swap(candidate)
+        return True
+
+    def reject(self):
+        """Drop the candidate and never reload its version; returns False if there is none"""
+        with self.lock:
+            candidate, self.candidate = self.candidate, None
+        if candidate is None:
+            return False
+        self.skipped_versions.add(self.version_of(candidate))
+        return True
+
+    def classify_batch(self, features):
+        """Classify with the live model, shadow scoring the candidate on sampled batches"""
+        live, candidate = self.live, self.candidate
+        if candidate is None or random.random() >= self.shadow_fraction:
+            return live.classify_batch(features)
+
+        start = time.perf_counter()
+        defect_types, confidences = live.classify_batch(features)
+        live_latency = time.perf_counter() - start
+        start = time.perf_counter()
+        candidate_types, _ = candidate.classify_batch(features)
+        candidate_latency = time.perf_counter() - start
+
+        with self.lock:
+            if self.candidate is candidate:
+                self.shadow_batches += 1
+                self.shadow_samples += len(defect_types)
+                self.agreements += int(np.sum(np.asarray(defect_types) == np.asarray(candidate_types)))
+                self.live_latencies.append(live_latency)
+                self.candidate_latencies.append(candidate_latency)
+        return defect_types, confidences
+
+    def classify_edge_density(self, edge_densities):
+        return self.live.classify_edge_density(edge_densities)
+
+    def classify_defect_severity(self, features):
+        defect_types, confidences = self.classify_batch([features])
+        return defect_types[0], float(confidences[0])
+
+    def get_stats(self):
+        """Live and candidate versions, swap count and shadow agreement and latency"""
+        with self.lock:
+            live, candidate = self.live, self.candidate
+            live_latencies = np.array(self.live_latencies)
+            candidate_latencies = np.array(self.candidate_latencies)
+            stats = {
+                'live_version': self.version_of(live),
+                'live_backend': live.backend if live.is_trained else 'rules',
+                'candidate_version': self.version_of(candidate),
+                'swaps': self.swaps,
+                'shadow_fraction': self.shadow_fraction,
+                'shadow_batches': self.shadow_batches,
+                'shadow_samples': self.shadow_samples,
+                'agreement_rate': self.agreements / self.shadow_samples if self.shadow_samples else None,
+                'last_error': self.last_error
+            }
+
+        if len(candidate_latencies):
+            stats['live_latency_mean'] = float(live_latencies.mean())
+            stats['candidate_latency_mean'] = float(candidate_latencies.mean())
+            stats['candidate_latency_p99'] = float(np.percentile(candidate_latencies, 99))
+        return stats
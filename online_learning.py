@@ -0,0 +1,142 @@
+# src/online_learning.py
+import shutil
+import threading
+import time
+import numpy as np
+from src.defect_classifier import DefectClassifier, SEVERITY_CLASSES
+from src.model_artifact import (ModelArtifactError, artifact_versions, load_model_artifact,
+                                read_manifest, save_model_artifact)
+
+CHECKPOINT_SOURCE = 'online'
+
+class OnlineTrainer:
+    """Update an sgd severity model from operator-confirmed labels.
+
+    Each update() reads the labels recorded since the previous one, in
+    mini-batches, and applies partial_fit. The cost depends on the new
+    labels, not the full history. Checkpoints are ordinary model
+    artifacts in model_dir, so the ModelRegistry swaps them in like any
+    other version. Each records the last label consumed, so a restarted
+    trainer resumes where it stopped.
+    """
+
+    def __init__(self, db_handler, model_dir, batch_size=256, checkpoint_interval=300.0,
+                 min_labels=200, keep_checkpoints=5, poll_interval=10.0):
+        if keep_checkpoints < 1:
+            # The newest checkpoint is the one the registry loads and resuming starts from
+            raise ValueError('keep_checkpoints must be at least 1')
+        self.db_handler = db_handler
+        self.model_dir = model_dir
+        self.batch_size = batch_size
+        self.checkpoint_interval = checkpoint_interval
+        self.min_labels = min_labels
+        self.keep_checkpoints = keep_checkpoints
+        self.poll_interval = poll_interval
+
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.pending = 0
+        self.checkpoints = 0
+        self.last_checkpoint = time.monotonic()
+        self.last_checkpoint_path = None
+        self.last_update_seconds = 0.0
+        self.classifier, self.last_label_id, self.labels_seen = self._resume()
+
+    def _online_checkpoints(self):
+        """(version, path, manifest) of checkpoints written by online learning, oldest first"""
+        checkpoints = []
+        for version, path in artifact_versions(self.model_dir):
+            try:
+                manifest = read_manifest(path)
+            except ModelArtifactError:
+                continue
+            if manifest.get('metadata', {}).get('source') == CHECKPOINT_SOURCE:
+                checkpoints.append((version, path, manifest))
+        return checkpoints
+
+    def _resume(self):
+        """Classifier and label watermark from the newest loadable checkpoint"""
+        for version, path, manifest in reversed(self._online_checkpoints()):
+            try:
+                classifier = load_model_artifact(path)
+            except ModelArtifactError as e:
+                print(f"Skipping online checkpoint {path}: {e}")
+                continue
+            metadata = manifest['metadata']
+            return classifier, metadata['last_label_id'], metadata['labels_seen']
+        return DefectClassifier('sgd'), 0, 0
+
+    def update(self):
+        """Learn from every label recorded since the last update; returns how many were used"""
+        with self.lock:
+            start = time.perf_counter()
+            learned = 0
+            for label_ids, labels, features in self.db_handler.iter_labeled_features(
+                    self.last_label_id, self.batch_size):
+                known = np.isin(labels, SEVERITY_CLASSES)
+                if known.any():
+                    self.classifier.partial_fit(features[known], labels[known])
+                    learned += int(known.sum())
+                self.last_label_id = int(label_ids[-1])
+
+            self.labels_seen += learned
+            self.pending += learned
+            self.last_update_seconds = time.perf_counter() - start
+            if self.pending and time.monotonic() - self.last_checkpoint >= self.checkpoint_interval:
+                self._checkpoint()
+            return learned
+
+    def checkpoint(self):
+        """Save the current model now; returns the artifact path or None"""
+        with self.lock:
+            return self._checkpoint()
+
+    def _checkpoint(self):
+        # Too few labels would replace a well-trained live model with a poor one
+        if not self.classifier.is_trained or self.labels_seen < self.min_labels:
+            return None
+        path = save_model_artifact(self.classifier, self.model_dir, {
+            'source': CHECKPOINT_SOURCE,
+            'last_label_id': self.last_label_id,
+            'labels_seen': self.labels_seen
+        })
+        self.pending = 0
+        self.checkpoints += 1
+        self.last_checkpoint = time.monotonic()
+        self.last_checkpoint_path = path
+        print(f"Saved online model checkpoint {path} ({self.labels_seen} labels)")
+
+        for version, old_path, manifest in self._online_checkpoints()[:-self.keep_checkpoints]:
+            shutil.rmtree(old_path, ignore_errors=True)
+        return path
+
+    def start(self):
+        """Poll for new labels in a background thread"""
+        if self.thread is None:
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, name='online-trainer', daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        if self.thread is not None:
+            self.stop_event.set()
+            self.thread.join()
+            self.thread = None
+
+    def _run(self):
+        while not self.stop_event.wait(self.poll_interval):
+            try:
+                self.update()
+            except Exception as e:
+                print(f"Error in online learning update: {e}")
+
+    def get_stats(self):
+        return {
+            'labels_seen': self.labels_seen,
+            'last_label_id': self.last_label_id,
+            'pending_labels': self.pending,
+            'checkpoints': self.checkpoints,
+            'last_checkpoint': self.last_checkpoint_path,
+            'last_update_seconds': self.last_update_seconds
+        }
@@ -0,0 +1,65 @@
+# scripts/replay_classification.py
+#!/usr/bin/env python3
+
+import argparse
+import time
+from collections import Counter
+from datetime import datetime
+from config import Config
+from src.database_handler import DatabaseHandler
+from src.defect_classifier import DefectClassifier
+from src.model_artifact import ModelArtifactError, latest_artifact, load_model_artifact
+
+def replay_classification(start_date=None, end_date=None, model_path=None, batch_size=10000):
+    """Re-classify stored feature vectors and compare with the recorded defect types.
+
+    model_path is a model artifact directory; by default the newest one in
+    Config.MODEL_PATH is used, and rule-based classification without one.
+    """
+    model_path = model_path or latest_artifact(Config.MODEL_PATH)
+    classifier = DefectClassifier()
+    if model_path:
+        try:
+            classifier = load_model_artifact(model_path)
+        except ModelArtifactError as e:
+            print(f"Error loading model: {e}")
+            return None
+        print(f"Loaded model artifact {model_path}")
+    print(f"Replaying stored features through the {'trained' if classifier.is_trained else 'rule-based'} classifier...")
+
+    db_handler = DatabaseHandler(write_behind=False)
+    changes = Counter()
+    total = 0
+    classify_time = 0.0
+    for ids, stored_types, features in db_handler.iter_feature_batches(start_date, end_date, batch_size):
+        start = time.perf_counter()
+        defect_types, _ = classifier.classify_batch(features)
+        classify_time += time.perf_counter() - start
+        total += len(ids)
+        changes.update((old, new) for old, new in zip(stored_types.tolist(), defect_types.tolist())
+                       if old != new)
+    db_handler.close()
+
+    if not total:
+        print("No stored feature vectors match")
+        return changes
+
+    changed = sum(changes.values())
+    print(f"Replayed {total} defects in {classify_time:.3f}s "
+          f"({1e6 * classify_time / total:.1f} us per defect)")
+    print(f"Changed: {changed} ({100.0 * changed / total:.1f}%)")
+    for (old, new), count in changes.most_common():
+        print(f"  {old:>8s} -> {new:<8s} {count}")
+    return changes
+
+def parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay stored defect features through a classifier')
+    parser.add_argument('--start-date', type=parse_date, help='first day, YYYY-MM-DD')
+    parser.add_argument('--end-date', type=parse_date, help='last day, YYYY-MM-DD')
+    parser.add_argument('--model', help=f'model artifact directory (default: newest in {Config.MODEL_PATH})')
+    args = parser.parse_args()
+
+    replay_classification(args.start_date, args.end_date, args.model)
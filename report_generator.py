@@ -1,128 +1,278 @@
 # src/report_generator.py
 import csv
+import hashlib
+import io
 import json
+import os
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
-import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 import numpy as np
+from config import Config
 from src.database_handler import DatabaseHandler
 
+CSV_HEADER = ['Product ID', 'Defect Type', 'Confidence', 'Timestamp', 'Edge Density']
+
+CHART_COLORS = ['green', 'yellow', 'orange', 'red']
+
+class ChartCache:
+    """Rendered charts on disk, keyed by a hash of the data they show.
+
+    Identical data reuses the existing file; beyond max_entries the least
+    recently used chart is deleted. File modification times record use,
+    so the order survives a restart.
+    """
+
+    def __init__(self, directory, max_entries=64):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if os.path.isdir(directory):
+            paths = [os.path.join(directory, name) for name in os.listdir(directory)
+                     if name.endswith('.png') and '.tmp.' not in name]
+            for path in sorted(paths, key=os.path.getmtime):
+                self.entries[os.path.basename(path)[:-4]] = path
+
+    @staticmethod
+    def key(data):
+        """Stable hash of JSON-serializable chart data"""
+        encoded = json.dumps(data, sort_keys=True, default=str).encode()
+        return hashlib.sha1(encoded).hexdigest()[:20]
+
+    def get(self, data, render):
+        """Path of the chart for data, calling render(path) to draw it on a miss"""
+        key = self.key(data)
+        with self.lock:
+            path = self.entries.get(key)
+            if path is not None and os.path.exists(path):
+                self.entries.move_to_end(key)
+                os.utime(path)
+                self.hits += 1
+                return path
+
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, f"{key}.png")
+            temp_path = os.path.join(self.directory, f"{key}.tmp.png")
+            render(temp_path)
+            os.replace(temp_path, path)
+            self.entries[key] = path
+            self.entries.move_to_end(key)
+            self.misses += 1
+
+            while len(self.entries) > self.max_entries:
+                _, old_path = self.entries.popitem(last=False)
+                try:
+                    os.remove(old_path)
+                except FileNotFoundError:
+                    pass
+            return path
+
 class ReportGenerator:
-    def __init__(self):
-        self.db_handler = DatabaseHandler()
+    def __init__(self, db_handler=None, chart_cache=None):
+        self.db_handler = db_handler or DatabaseHandler()
+        self.chart_cache = chart_cache or ChartCache(Config.CHART_CACHE_DIR, Config.CHART_CACHE_SIZE)
+        self.chart_lock = threading.Lock()
+        self.figure = None
     
-    def generate_daily_report(self, date=None):
+    def generate_daily_report(self, date=None, include_details=False):
         """Generate daily defect report"""
         if date is None:
             date = datetime.now().date()
         
-        defects = self.db_handler.get_defects_by_date(date)
+        return self.generate_trend_report(start_date=date, end_date=date,
+                                          include_details=include_details)[0]
+    
+    def generate_trend_report(self, days=7, start_date=None, end_date=None, include_details=False):
+        """Generate per-day reports for a date range from one grouped rollup query.
+        
+        The range defaults to the last `days` days. Individual defect rows are
+        only loaded when include_details is set.
+        """
+        if end_date is None:
+            end_date = datetime.now().date()
+        if start_date is None:
+            start_date = end_date - timedelta(days=days-1)
         
-        report_data = {
+        reports = {}
+        current_date = start_date
+        while current_date <= end_date:
+            reports[current_date.strftime('%Y-%m-%d')] = self._empty_report(current_date)
+            current_date += timedelta(days=1)
+        
+        confidence_sums = dict.fromkeys(reports, 0.0)
+        for day, defect_type, count, confidence_sum in self.db_handler.get_daily_rollups(start_date, end_date):
+            report_data = reports[day]
+            report_data['defect_breakdown'][defect_type] = \
+                report_data['defect_breakdown'].get(defect_type, 0) + count
+            report_data['total_inspections'] += count
+            if defect_type != 'GOOD':
+                report_data['defects_found'] += count
+            confidence_sums[day] += confidence_sum
+        
+        for day, report_data in reports.items():
+            # Calculate defect rate
+            if report_data['total_inspections'] > 0:
+                report_data['defect_rate'] = report_data['defects_found'] / report_data['total_inspections']
+                report_data['average_confidence'] = confidence_sums[day] / report_data['total_inspections']
+        
+        if include_details:
+            for defect in self.db_handler.iter_defects(start_date, end_date):
+                reports[defect[3][:10]]['defects'].append(defect)
+        
+        return list(reports.values())
+    
+    def _empty_report(self, date):
+        """Report for a day with no inspections"""
+        return {
             'date': date.strftime('%Y-%m-%d'),
-            'total_inspections': len(defects),
-            'defects_found': len([d for d in defects if d[3] != 'GOOD']),
+            'total_inspections': 0,
+            'defects_found': 0,
             'defect_rate': 0,
+            'average_confidence': 0,
             'defect_breakdown': {
                 'GOOD': 0,
                 'MINOR': 0,
                 'MAJOR': 0,
                 'CRITICAL': 0
             },
-            'defects': defects
+            'defects': []
         }
-        
-        # Calculate defect breakdown
-        for defect in defects:
-            defect_type = defect[3]
-            report_data['defect_breakdown'][defect_type] += 1
-        
-        # Calculate defect rate
-        if report_data['total_inspections'] > 0:
-            report_data['defect_rate'] = report_data['defects_found'] / report_data['total_inspections']
-        
-        return report_data
-    
-    def generate_trend_report(self, days=7):
-        """Generate trend report for specified number of days"""
-        end_date = datetime.now().date()
-        start_date = end_date - timedelta(days=days-1)
-        
-        trend_data = []
-        current_date = start_date
-        
-        while current_date <= end_date:
-            daily_report = self.generate_daily_report(current_date)
-            trend_data.append(daily_report)
-            current_date += timedelta(days=1)
-        
-        return trend_data
     
     def export_to_csv(self, report_data, filename=None):
-        """Export report data to CSV"""
+        """Export report data to CSV.
+        
+        Reports generated without details are exported by streaming their
+        rows from the database instead of holding them in memory.
+        """
         if filename is None:
             filename = f"defect_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
         
+        reports = report_data if isinstance(report_data, list) else [report_data]
+        
         with open(filename, 'w', newline='') as csvfile:
             writer = csv.writer(csvfile)
             
             # Write header
-            writer.writerow(['Date', 'Product ID', 'Defect Type', 'Confidence', 'Timestamp'])
+            writer.writerow(CSV_HEADER)
             
             # Write data
-            for defect in report_data['defects']:
-                writer.writerow(defect)
+            for report in reports:
+                if report['defects'] or not report['total_inspections']:
+                    writer.writerows(report['defects'])
+                else:
+                    date = datetime.strptime(report['date'], '%Y-%m-%d').date()
+                    writer.writerows(self.db_handler.iter_defects(date, date))
         
         return filename
     
-    def create_defect_chart(self, report_data, save_path=None):
-        """Create visualization chart for defects"""
-        if save_path is None:
-            save_path = f"defect_chart_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
+    def stream_csv(self, start_date=None, end_date=None, product_id=None, defect_types=None,
+                   batch_size=5000):
+        """Yield a CSV export as text chunks, one per database batch.
         
-        defect_types = list(report_data['defect_breakdown'].keys())
-        defect_counts = list(report_data['defect_breakdown'].values())
+        Only one batch of rows is held at a time, so memory use does not
+        depend on how many rows match.
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(CSV_HEADER)
+        yield buffer.getvalue()
         
-        plt.figure(figsize=(10, 6))
-        bars = plt.bar(defect_types, defect_counts, color=['green', 'yellow', 'orange', 'red'])
+        for rows in self.db_handler.iter_defect_batches(start_date, end_date, batch_size,
+                                                        product_id=product_id,
+                                                        defect_types=defect_types):
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(rows)
+            yield buffer.getvalue()
+    
+    def create_defect_chart(self, report_data, save_path=None):
+        """Create visualization chart for defects.
         
-        # Add value labels on bars
-        for bar, count in zip(bars, defect_counts):
-            plt.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.1,
-                    str(count), ha='center', va='bottom')
+        Without a save_path the chart comes from the chart cache, so
+        identical data is only rendered once.
+        """
+        if save_path is not None:
+            self._render_chart(report_data, save_path)
+            return save_path
         
-        plt.title(f'Defect Distribution - {report_data["date"]}')
-        plt.xlabel('Defect Type')
-        plt.ylabel('Number of Defects')
-        plt.grid(axis='y', alpha=0.3)
+        chart_data = {'date': report_data['date'], 'defect_breakdown': report_data['defect_breakdown'],
+                      'dpi': Config.CHART_DPI}
+        return self.chart_cache.get(chart_data, lambda path: self._render_chart(report_data, path))
+    
+    def _render_chart(self, report_data, path):
+        """Draw the defect bar chart on the reused Agg figure and save it"""
+        defect_types = list(report_data['defect_breakdown'].keys())
+        defect_counts = list(report_data['defect_breakdown'].values())
         
-        plt.savefig(save_path, dpi=300, bbox_inches='tight')
-        plt.close()
+        with self.chart_lock:
+            if self.figure is None:
+                # A bare Figure on the Agg canvas skips pyplot's global figure manager
+                self.figure = Figure(figsize=(10, 6), tight_layout=True)
+                FigureCanvasAgg(self.figure)
+                self.figure.add_subplot()
+            axes = self.figure.axes[0]
+            axes.clear()
+            
+            bars = axes.bar(defect_types, defect_counts, color=CHART_COLORS[:len(defect_types)])
+            
+            # Add value labels on bars
+            for bar, count in zip(bars, defect_counts):
+                axes.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.1,
+                          str(count), ha='center', va='bottom')
+            
+            axes.set_title(f'Defect Distribution - {report_data["date"]}')
+            axes.set_xlabel('Defect Type')
+            axes.set_ylabel('Number of Defects')
+            axes.grid(axis='y', alpha=0.3)
+            
+            self.figure.savefig(path, dpi=Config.CHART_DPI, format='png')
+    
+    def get_chart_series(self, days=7):
+        """Per-day counts by defect type, for charts drawn in the browser"""
+        trend_data = self.generate_trend_report(days)
+        defect_types = list(trend_data[0]['defect_breakdown'])
+        for report in trend_data:
+            defect_types.extend(t for t in report['defect_breakdown'] if t not in defect_types)
         
-        return save_path
+        series = {defect_type: [report['defect_breakdown'].get(defect_type, 0) for report in trend_data]
+                  for defect_type in defect_types}
+        return {
+            'labels': [report['date'] for report in trend_data],
+            'series': series,
+            'totals': {defect_type: sum(counts) for defect_type, counts in series.items()},
+            'defect_rate': [report['defect_rate'] for report in trend_data]
+        }
     
-    def generate_comprehensive_report(self, days=1):
+    def generate_comprehensive_report(self, days=1, start_date=None, end_date=None,
+                                      include_details=False):
         """Generate comprehensive report with multiple sections"""
-        if days == 1:
-            report_data = self.generate_daily_report()
-        else:
-            report_data = self.generate_trend_report(days)
+        trend_data = self.generate_trend_report(days, start_date, end_date, include_details)
+        report_data = trend_data[0] if len(trend_data) == 1 else trend_data
         
         # Generate chart
-        chart_path = self.create_defect_chart(
-            report_data if days == 1 else report_data[-1]
-        )
+        chart_path = self.create_defect_chart(trend_data[-1])
         
+        total_inspections = sum(item['total_inspections'] for item in trend_data)
+        total_defects = sum(item['defects_found'] for item in trend_data)
         comprehensive_report = {
             'summary': {
-                'report_period': days,
-                'total_defects': sum(item['defects_found'] for item in 
-                                   (report_data if days > 1 else [report_data])),
-                'average_defect_rate': np.mean([item['defect_rate'] for item in 
-                                              (report_data if days > 1 else [report_data])])
+                'report_period': len(trend_data),
+                'start_date': trend_data[0]['date'],
+                'end_date': trend_data[-1]['date'],
+                'total_inspections': total_inspections,
+                'total_defects': total_defects,
+                'average_defect_rate': np.mean([item['defect_rate'] for item in trend_data]),
+                'overall_defect_rate': total_defects / total_inspections if total_inspections else 0
             },
             'detailed_data': report_data,
             'chart_path': chart_path,
             'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         }
         
-        return comprehensive_report
\ No newline at end of file
+        return comprehensive_report
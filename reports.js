@@ -21,18 +21,20 @@ document.addEventListener('DOMContentLoaded', function() {
     generateWeeklyReportBtn.addEventListener('click', generateWeeklyReport);
     viewTrendsBtn.addEventListener('click', viewTrends);
 
-    function initializeDefectChart() {
+    async function initializeDefectChart() {
         if (!defectChartCanvas) return;
 
         const ctx = defectChartCanvas.getContext('2d');
         
-        // Get defect counts from the table
-        const defectCounts = {
-            'GOOD': document.querySelectorAll('tr:has(.bg-success)').length,
-            'MINOR': document.querySelectorAll('tr:has(.bg-warning)').length,
-            'MAJOR': document.querySelectorAll('tr:has(.bg-warning)').length, // Same as MINOR for now
-            'CRITICAL': document.querySelectorAll('tr:has(.bg-danger)').length
-        };
+        // Counts for the whole week, not just the recent rows shown in the table
+        let totals = {};
+        try {
+            const response = await fetch('/api/charts/defects?days=7');
+            if (!response.ok) throw new Error(await response.text());
+            totals = (await response.json()).totals;
+        } catch (error) {
+            console.error('Chart data error:', error);
+        }
 
         defectChart = new Chart(ctx, {
             type: 'doughnut',
@@ -40,10 +42,10 @@ document.addEventListener('DOMContentLoaded', function() {
                 labels: ['Good', 'Minor Defects', 'Major Defects', 'Critical Defects'],
                 datasets: [{
                     data: [
-                        defectCounts.GOOD,
-                        defectCounts.MINOR,
-                        defectCounts.MAJOR,
-                        defectCounts.CRITICAL
+                        totals.GOOD || 0,
+                        totals.MINOR || 0,
+                        totals.MAJOR || 0,
+                        totals.CRITICAL || 0
                     ],
                     backgroundColor: [
                         '#28a745',
@@ -63,34 +65,23 @@ document.addEventListener('DOMContentLoaded', function() {
                     },
                     title: {
                         display: true,
-                        text: 'Defect Distribution'
+                        text: 'Defect Distribution (last 7 days)'
                     }
                 }
             }
         });
     }
 
-    async function exportToCsv() {
-        try {
-            const response = await fetch('/export/csv');
-            if (response.ok) {
-                const blob = await response.blob();
-                const url = window.URL.createObjectURL(blob);
-                const a = document.createElement('a');
-                a.href = url;
-                a.download = `defect_report_${new Date().toISOString().split('T')[0]}.csv`;
-                document.body.appendChild(a);
-                a.click();
-                window.URL.revokeObjectURL(url);
-                document.body.removeChild(a);
-                showNotification('CSV export started', 'success');
-            } else {
-                throw new Error('Export failed');
-            }
-        } catch (error) {
-            console.error('Export error:', error);
-            showNotification('Error exporting CSV: ' + error.message, 'danger');
-        }
+    function exportToCsv() {
+        // Let the browser download the streamed response directly instead of
+        // buffering the whole export in a blob first
+        const a = document.createElement('a');
+        a.href = '/export/csv';
+        a.download = `defect_report_${new Date().toISOString().split('T')[0]}.csv`;
+        document.body.appendChild(a);
+        a.click();
+        document.body.removeChild(a);
+        showNotification('CSV export started', 'success');
     }
 
     function refreshData() {
@@ -5,7 +5,9 @@ CREATE TABLE IF NOT EXISTS products (
     product_id TEXT UNIQUE NOT NULL,
     product_type TEXT,
     specification TEXT,
-    created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    reference_lab BLOB,  -- float32 (L, a, b) reference color for discoloration checks
+    reference_updated TIMESTAMP
 );
 
 -- Defects table
@@ -16,11 +18,38 @@ CREATE TABLE IF NOT EXISTS defects (
     confidence REAL NOT NULL,
     timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     edge_density REAL,
-    texture_features TEXT,
+    texture_features TEXT,          -- legacy str(list) features, see feature_vector
     image_path TEXT,
+    feature_vector BLOB,
+    feature_schema_version INTEGER,
     FOREIGN KEY (product_id) REFERENCES products(product_id)
 );
 
+-- Operator-confirmed defect types, consumed by online learning
+CREATE TABLE IF NOT EXISTS defect_labels (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    defect_id INTEGER NOT NULL,
+    label TEXT NOT NULL,
+    operator TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (defect_id) REFERENCES defects(id)
+);
+
+-- Connected defect regions of each inspected image
+CREATE TABLE IF NOT EXISTS defect_regions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    defect_id INTEGER NOT NULL,
+    source TEXT NOT NULL,  -- 'edges' or a color defect type
+    x INTEGER NOT NULL,
+    y INTEGER NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    area INTEGER NOT NULL,  -- pixels
+    elongation REAL,  -- principal axis ratio, 1 for a blob
+    score REAL,
+    FOREIGN KEY (defect_id) REFERENCES defects(id)
+);
+
 -- System logs table
 CREATE TABLE IF NOT EXISTS system_logs (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -30,19 +59,69 @@ CREATE TABLE IF NOT EXISTS system_logs (
     message TEXT
 );
 
--- Quality reports table
-CREATE TABLE IF NOT EXISTS quality_reports (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    report_date DATE NOT NULL,
-    total_inspected INTEGER,
-    defects_found INTEGER,
-    defect_rate REAL,
-    major_defects INTEGER,
-    critical_defects INTEGER
-);
+-- BEGIN rollups: also applied to existing databases by DatabaseHandler.init_database
+-- Hourly and daily rollups, maintained by the triggers below
+CREATE TABLE IF NOT EXISTS defect_rollups_hourly (
+    hour TEXT NOT NULL,
+    defect_type TEXT NOT NULL,
+    defect_count INTEGER NOT NULL DEFAULT 0,
+    confidence_sum REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (hour, defect_type)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS defect_rollups_daily (
+    day TEXT NOT NULL,
+    defect_type TEXT NOT NULL,
+    defect_count INTEGER NOT NULL DEFAULT 0,
+    confidence_sum REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, defect_type)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS defects_rollup_insert AFTER INSERT ON defects
+BEGIN
+    INSERT INTO defect_rollups_hourly (hour, defect_type, defect_count, confidence_sum)
+    VALUES (strftime('%Y-%m-%d %H:00:00', NEW.timestamp), NEW.defect_type, 1, NEW.confidence)
+    ON CONFLICT (hour, defect_type) DO UPDATE SET
+        defect_count = defect_count + 1,
+        confidence_sum = confidence_sum + excluded.confidence_sum;
+    INSERT INTO defect_rollups_daily (day, defect_type, defect_count, confidence_sum)
+    VALUES (DATE(NEW.timestamp), NEW.defect_type, 1, NEW.confidence)
+    ON CONFLICT (day, defect_type) DO UPDATE SET
+        defect_count = defect_count + 1,
+        confidence_sum = confidence_sum + excluded.confidence_sum;
+END;
+
+CREATE TRIGGER IF NOT EXISTS defects_rollup_delete AFTER DELETE ON defects
+BEGIN
+    UPDATE defect_rollups_hourly
+    SET defect_count = defect_count - 1, confidence_sum = confidence_sum - OLD.confidence
+    WHERE hour = strftime('%Y-%m-%d %H:00:00', OLD.timestamp) AND defect_type = OLD.defect_type;
+    UPDATE defect_rollups_daily
+    SET defect_count = defect_count - 1, confidence_sum = confidence_sum - OLD.confidence
+    WHERE day = DATE(OLD.timestamp) AND defect_type = OLD.defect_type;
+END;
+
+-- Quality reports, derived from the daily rollups
+CREATE VIEW IF NOT EXISTS quality_reports AS
+SELECT day AS report_date,
+       SUM(defect_count) AS total_inspected,
+       SUM(CASE WHEN defect_type != 'GOOD' THEN defect_count ELSE 0 END) AS defects_found,
+       CAST(SUM(CASE WHEN defect_type != 'GOOD' THEN defect_count ELSE 0 END) AS REAL)
+           / SUM(defect_count) AS defect_rate,
+       SUM(CASE WHEN defect_type = 'MAJOR' THEN defect_count ELSE 0 END) AS major_defects,
+       SUM(CASE WHEN defect_type = 'CRITICAL' THEN defect_count ELSE 0 END) AS critical_defects
+FROM defect_rollups_daily
+GROUP BY day
+HAVING SUM(defect_count) > 0;
+
+CREATE INDEX IF NOT EXISTS idx_defects_type_timestamp ON defects(defect_type, timestamp);
+-- END rollups
 
 -- Indexes for performance
 CREATE INDEX IF NOT EXISTS idx_defects_timestamp ON defects(timestamp);
 CREATE INDEX IF NOT EXISTS idx_defects_type ON defects(defect_type);
 CREATE INDEX IF NOT EXISTS idx_defects_product ON defects(product_id);
+CREATE INDEX IF NOT EXISTS idx_labels_defect ON defect_labels(defect_id);
+CREATE INDEX IF NOT EXISTS idx_regions_defect ON defect_regions(defect_id);
+CREATE INDEX IF NOT EXISTS idx_regions_area ON defect_regions(area);
 CREATE INDEX IF NOT EXISTS idx_logs_timestamp ON system_logs(timestamp);
\ No newline at end of file
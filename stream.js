@@ -0,0 +1,87 @@
+// static/js/stream.js
+// Live camera inspection streamed from the server over server-sent events
+
+document.addEventListener('DOMContentLoaded', function() {
+    const startStreamBtn = document.getElementById('startStream');
+    const stopStreamBtn = document.getElementById('stopStream');
+    const streamSource = document.getElementById('streamSource');
+    const streamDefectType = document.getElementById('streamDefectType');
+    const streamFps = document.getElementById('streamFps');
+    const streamQueue = document.getElementById('streamQueue');
+    const streamDropped = document.getElementById('streamDropped');
+
+    if (!startStreamBtn) return;
+
+    let events = null;
+
+    startStreamBtn.addEventListener('click', startStream);
+    stopStreamBtn.addEventListener('click', stopStream);
+
+    // Attach to a stream that is already running
+    API.get('/stream/stats').then(stats => {
+        if (stats.running) {
+            connectEvents();
+            setRunning(true);
+        }
+    }).catch(error => console.error('Error loading stream stats:', error));
+
+    async function startStream() {
+        try {
+            await API.post('/stream/start', { source: streamSource.value });
+            connectEvents();
+            setRunning(true);
+            showNotification('Live inspection started', 'success');
+        } catch (error) {
+            console.error('Error starting stream:', error);
+            showNotification('Could not open the camera or video source', 'danger');
+        }
+    }
+
+    async function stopStream() {
+        try {
+            const stats = await API.post('/stream/stop', {});
+            updateStats(stats);
+        } catch (error) {
+            console.error('Error stopping stream:', error);
+        }
+        disconnectEvents();
+        setRunning(false);
+    }
+
+    function connectEvents() {
+        disconnectEvents();
+        events = new EventSource('/stream/events');
+
+        events.addEventListener('result', function(e) {
+            const result = JSON.parse(e.data);
+            streamDefectType.textContent = `${result.defect_type} (${formatPercent(result.confidence)})`;
+        });
+
+        events.addEventListener('stats', function(e) {
+            const stats = JSON.parse(e.data);
+            updateStats(stats);
+            if (!stats.running) {
+                disconnectEvents();
+                setRunning(false);
+            }
+        });
+    }
+
+    function disconnectEvents() {
+        if (events) {
+            events.close();
+            events = null;
+        }
+    }
+
+    function updateStats(stats) {
+        streamFps.textContent = stats.processing_fps.toFixed(1);
+        streamQueue.textContent = `${stats.queue_depth}/${stats.queue_capacity}`;
+        streamDropped.textContent = stats.dropped_frames;
+    }
+
+    function setRunning(running) {
+        startStreamBtn.disabled = running;
+        stopStreamBtn.disabled = !running;
+    }
+});
@@ -0,0 +1,271 @@
+# src/stream_inspector.py
+import queue
+import threading
+import time
+from collections import deque
+import cv2
+from src.image_acquisition import ImageCapture
+from src.inspection_pipeline import InspectionPipeline
+
+class FrameRingBuffer:
+    """Bounded frame queue that drops the oldest frame when full.
+
+    Analysis always works on the most recent frames, so a slow pipeline
+    falls behind by at most `capacity` frames instead of growing a backlog.
+    """
+
+    def __init__(self, capacity):
+        self.frames = deque(maxlen=capacity)
+        self.condition = threading.Condition()
+        self.dropped = 0
+        self.closed = False
+
+    def __len__(self):
+        with self.condition:
+            return len(self.frames)
+
+    def put(self, item):
+        """Add a frame, returning True if an older frame was dropped for it"""
+        with self.condition:
+            dropped = len(self.frames) == self.frames.maxlen
+            if dropped:
+                self.dropped += 1
+            self.frames.append(item)
+            self.condition.notify()
+            return dropped
+
+    def get(self, timeout=None):
+        """Oldest buffered frame, or None once closed and drained or on timeout"""
+        with self.condition:
+            if not self.frames and not self.closed:
+                self.condition.wait(timeout)
+            if self.frames:
+                return self.frames.popleft()
+            return None
+
+    def close(self, discard=False):
+        """Stop accepting frames and wake every waiting consumer"""
+        with self.condition:
+            self.closed = True
+            if discard:
+                self.frames.clear()
+            self.condition.notify_all()
+
+class StreamInspector:
+    """Inspect a live camera or video file with a capture thread and worker threads.
+
+    The capture thread reads frames as fast as the source delivers them
+    (video files can be paced to their native frame rate) and keeps every
+    frame_step-th one in a FrameRingBuffer. Workers run the inspection
+    pipeline on buffered frames and publish each result to subscribers and
+    the optional on_result callback.
+    """
+
+    def __init__(self, pipeline=None, capture=None, buffer_size=4, workers=1, frame_step=1,
+                 on_result=None, subscriber_queue_size=32):
+        self.pipeline = pipeline or InspectionPipeline()
+        self.capture = capture or ImageCapture()
+        self.buffer_size = buffer_size
+        self.workers = workers
+        self.frame_step = max(1, frame_step)
+        self.on_result = on_result
+        self.subscriber_queue_size = subscriber_queue_size
+
+        self.subscribers = []
+        self.lock = threading.Lock()
+        # Serializes start and stop, so concurrent calls cannot start two captures
+        self.control_lock = threading.Lock()
+        self.threads = []
+        self.running = False
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.buffer = FrameRingBuffer(self.buffer_size)
+        self.captured = 0
+        self.skipped = 0
+        self.processed = 0
+        self.failed = 0
+        self.total_latency = 0.0
+        self.started_at = None
+        self.finished_at = None
+        self.source_finished = False
+
+    def start(self, source=0, realtime=False):
+        """Open a camera index or video file path and start inspecting it.
+
+        With realtime=True a video file is read at its recorded frame rate,
+        so it stands in for a camera that cannot be slowed down.
+        """
+        with self.control_lock:
+            return self._start(source, realtime)
+
+    def _start(self, source, realtime):
+        if self.is_running():
+            return False
+        # Release a previous source that finished on its own
+        self.capture.release_camera()
+        if not self.capture.initialize_camera(source):
+            self.capture.release_camera()
+            return False
+
+        self._reset_stats()
+        self.running = True
+        self.started_at = time.perf_counter()
+        is_file = isinstance(source, str) and not source.isdigit()
+        frame_interval = 0.0
+        if realtime:
+            fps = self.capture.camera.get(cv2.CAP_PROP_FPS)
+            frame_interval = 1.0 / fps if fps > 0 else 0.0
+
+        self.threads = [threading.Thread(target=self._capture_loop, args=(is_file, frame_interval),
+                                         name='stream-capture', daemon=True)]
+        for i in range(self.workers):
+            self.threads.append(threading.Thread(target=self._worker_loop,
+                                                 name=f"stream-worker-{i}", daemon=True))
+        for thread in self.threads:
+            thread.start()
+        return True
+
+    def is_running(self):
+        """True while the capture thread or a worker is still active"""
+        return self.running and any(thread.is_alive() for thread in self.threads)
+
+    def stop(self):
+        """Stop capturing, discard buffered frames and release the source"""
+        with self.control_lock:
+            self.running = False
+            self.buffer.close(discard=True)
+            self._join()
+            self.capture.release_camera()
+
+    def wait(self, timeout=None):
+        """Block until a finite source has been read and every kept frame inspected"""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        for thread in self.threads:
+            remaining = None if deadline is None else max(0.0, deadline - time.perf_counter())
+            thread.join(remaining)
+        finished = not any(thread.is_alive() for thread in self.threads)
+        if finished:
+            self.running = False
+            self.capture.release_camera()
+        return finished
+
+    def _join(self):
+        current = threading.current_thread()
+        for thread in self.threads:
+            if thread is not current:
+                thread.join()
+
+    def _capture_loop(self, is_file, frame_interval):
+        next_frame_at = time.perf_counter()
+        while self.running:
+            frame = self.capture.capture_frame()
+            if frame is None:
+                if is_file:
+                    break
+                # Cameras occasionally return an empty read; retry shortly
+                time.sleep(0.01)
+                continue
+
+            self.captured += 1
+            if (self.captured - 1) % self.frame_step:
+                self.skipped += 1
+            else:
+                self.buffer.put((self.captured, time.perf_counter(), frame))
+
+            if frame_interval:
+                next_frame_at += frame_interval
+                delay = next_frame_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+        self.source_finished = True
+        self.buffer.close()
+
+    def _worker_loop(self):
+        while True:
+            item = self.buffer.get(timeout=0.5)
+            if item is None:
+                if self.buffer.closed:
+                    break
+                continue
+
+            frame_number, captured_at, frame = item
+            try:
+                results = self.pipeline.analyze(frame)
+            except Exception as e:
+                print(f"Error inspecting frame {frame_number}: {e}")
+                with self.lock:
+                    self.failed += 1
+                continue
+
+            latency = time.perf_counter() - captured_at
+            results['frame_number'] = frame_number
+            results['latency'] = latency
+            with self.lock:
+                self.processed += 1
+                self.total_latency += latency
+                self.finished_at = time.perf_counter()
+
+            if self.on_result:
+                try:
+                    self.on_result(frame, results)
+                except Exception as e:
+                    print(f"Error handling stream result: {e}")
+            self.publish('result', results)
+
+    def subscribe(self):
+        """Queue receiving (event, data) tuples for every result"""
+        subscriber = queue.Queue(maxsize=self.subscriber_queue_size)
+        with self.lock:
+            self.subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            if subscriber in self.subscribers:
+                self.subscribers.remove(subscriber)
+
+    def publish(self, event, data):
+        """Send an event to every subscriber, dropping its oldest event if it lags"""
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            while True:
+                try:
+                    subscriber.put_nowait((event, data))
+                    break
+                except queue.Full:
+                    try:
+                        subscriber.get_nowait()
+                    except queue.Empty:
+                        pass
+
+    def get_stats(self):
+        """Throughput, queue depth and frame accounting since start()"""
+        if self.started_at is None:
+            elapsed = 0.0
+        elif self.is_running() or self.finished_at is None:
+            elapsed = time.perf_counter() - self.started_at
+        else:
+            elapsed = self.finished_at - self.started_at
+
+        with self.lock:
+            processed = self.processed
+            total_latency = self.total_latency
+            failed = self.failed
+
+        return {
+            'running': self.is_running(),
+            'source_finished': self.source_finished,
+            'captured_frames': self.captured,
+            'skipped_frames': self.skipped,
+            'dropped_frames': self.buffer.dropped,
+            'processed_frames': processed,
+            'failed_frames': failed,
+            'queue_depth': len(self.buffer),
+            'queue_capacity': self.buffer_size,
+            'capture_fps': self.captured / elapsed if elapsed else 0.0,
+            'processing_fps': processed / elapsed if elapsed else 0.0,
+            'mean_latency': total_latency / processed if processed else 0.0
+        }
@@ -0,0 +1,57 @@
+# tests/test_analytics_export.py
+import unittest
+import os
+import shutil
+import tempfile
+from datetime import date
+import numpy as np
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database_handler import DatabaseHandler, encode_features
+from src.analytics_export import AnalyticsExporter
+
+class TestAnalyticsExport(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_handler = DatabaseHandler(os.path.join(self.temp_dir, 'defects.db'), write_behind=False)
+        self.exporter = AnalyticsExporter(self.db_handler, os.path.join(self.temp_dir, 'export'), 'npz')
+
+    def tearDown(self):
+        self.db_handler.close()
+        shutil.rmtree(self.temp_dir)
+
+    def insert(self, rows):
+        with self.db_handler.pool.connection() as conn:
+            conn.executemany('INSERT INTO defects (product_id, defect_type, confidence, timestamp, '
+                             'feature_vector, feature_schema_version) VALUES (?, ?, ?, ?, ?, ?)',
+                             [row[:4] + ((encode_features(row[4]), 1) if row[4] else (None, None))
+                              for row in rows])
+
+    def test_partitioned_incremental_export(self):
+        self.insert([('PROD001', 'GOOD', 0.9, '2024-03-01 08:00:00', [0.1, 0.2, 0.3]),
+                     ('PROD002', 'MINOR', 0.4, '2024-03-01 09:00:00', [1.0, 2.0, 3.0]),
+                     ('PROD001', 'MAJOR', 0.7, '2024-03-02 10:00:00', None)])
+        summary = self.exporter.export()
+        self.assertEqual((summary['rows'], summary['files'], summary['last_id']), (3, 3, 3))
+        self.assertEqual(self.exporter.export()['rows'], 0)
+        
+        self.insert([('PROD001', 'CRITICAL', 0.95, '2024-03-02 11:00:00', [4.0, 5.0, 6.0])])
+        summary = self.exporter.export()
+        self.assertEqual((summary['rows'], summary['first_id'], summary['last_id']), (1, 4, 4))
+        
+        history = self.exporter.load()
+        np.testing.assert_array_equal(history['id'], [1, 2, 3, 4])
+        self.assertEqual(history['features'].dtype, np.float32)
+        np.testing.assert_allclose(history['features'][1], [1.0, 2.0, 3.0])
+        self.assertTrue(np.all(np.isnan(history['features'][2])))
+        np.testing.assert_array_equal(history['feature_schema_version'], [1, 1, 0, 1])
+        self.assertEqual(list(history['defect_type']), ['GOOD', 'MINOR', 'MAJOR', 'CRITICAL'])
+        self.assertEqual(history['timestamp'][3], np.datetime64('2024-03-02T11:00:00'))
+        
+        product_day = self.exporter.load(start_date=date(2024, 3, 2), product_id='PROD001')
+        np.testing.assert_array_equal(product_day['id'], [3, 4])
+        self.assertEqual(len(self.exporter.partition_files(end_date=date(2024, 3, 1))), 2)
+
+if __name__ == '__main__':
+    unittest.main()
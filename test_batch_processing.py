@@ -0,0 +1,112 @@
+# tests/test_batch_processing.py
+import unittest
+import io
+import zipfile
+import cv2
+import numpy as np
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.batch_processor import BatchInspector, read_zip_images
+from src.inspection_pipeline import InspectionPipeline
+from src.color_analysis import ColorAnalyzer
+from src.defect_classifier import DefectClassifier
+
+class TestBatchProcessing(unittest.TestCase):
+    def setUp(self):
+        self.test_image = np.random.randint(0, 255, (120, 160, 3), dtype=np.uint8)
+        self.test_image[60:62, :] = 0  # Dark line
+        self.encoded = cv2.imencode('.png', self.test_image)[1].tobytes()
+
+    def test_read_zip_images(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            archive.writestr('part_1.png', self.encoded)
+            archive.writestr('parts/part_2.png', self.encoded)
+            archive.writestr('notes.txt', 'not an image')
+
+        images = read_zip_images(buffer.getvalue(), {'png', 'jpg'})
+        self.assertEqual([name for name, _ in images], ['part_1.png', 'parts/part_2.png'])
+
+    def test_read_zip_images_limits(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr('part_1.png', self.encoded)
+            archive.writestr('bomb.png', bytes(10 * 1024 * 1024))
+            archive.writestr('notes.txt', bytes(10 * 1024 * 1024))
+        data = buffer.getvalue()
+        self.assertLess(len(data), 100 * 1024)
+
+        with self.assertRaisesRegex(ValueError, 'Too many images'):
+            read_zip_images(data, {'png'}, max_images=1)
+        with self.assertRaisesRegex(ValueError, 'too large'):
+            read_zip_images(data, {'png'}, max_bytes=1024 * 1024)
+        # Only image entries count towards the limits
+        images = read_zip_images(data, {'png'}, max_images=2, max_bytes=11 * 1024 * 1024)
+        self.assertEqual([name for name, _ in images], ['part_1.png', 'bomb.png'])
+
+    def test_batch_inspection(self):
+        inspector = BatchInspector(max_workers=2)
+        try:
+            results, timing = inspector.inspect([
+                ('a.png', self.encoded),
+                ('b.png', self.encoded),
+                ('broken.png', b'not an image')
+            ])
+        finally:
+            inspector.shutdown()
+
+        self.assertEqual([r['filename'] for r in results], ['a.png', 'b.png', 'broken.png'])
+        self.assertEqual(results[0]['defect_type'], results[1]['defect_type'])
+        self.assertIn('error', results[2])
+        self.assertEqual(timing['image_count'], 3)
+        self.assertGreater(timing['total_time'], 0)
+
+    def test_batch_workers_use_parent_model(self):
+        # Plain frames are GOOD and lined frames MAJOR, so edge density alone is decisive
+        rng = np.random.RandomState(0)
+        frames, labels = [], []
+        for index in range(8):
+            image = cv2.GaussianBlur(rng.randint(90, 160, (120, 160, 3), dtype=np.uint8), (7, 7), 0)
+            if index % 2:
+                for y in range(0, 120, 6):
+                    cv2.line(image, (0, y), (159, y + 4), (20, 20, 20), 1)
+            frames.append(image)
+            labels.append('MAJOR' if index % 2 else 'GOOD')
+        classifier = DefectClassifier('nystroem')
+        full = InspectionPipeline(defect_classifier=classifier, pyramid=False, cascade=False)
+        classifier.train_classifier([full.extract_features(image)['feature_vector'] for image in frames],
+                                    labels)
+
+        cascade = InspectionPipeline(defect_classifier=classifier, pyramid=False, cascade=True)
+        cascade.cascade_confidence = 0.8
+        expected = [cascade.analyze(image) for image in frames]
+        self.assertIn('edges', [r['exit_stage'] for r in expected])
+
+        inspector = BatchInspector(max_workers=1, pipeline=cascade)
+        try:
+            results, _ = inspector.inspect([(f'{index}.png', cv2.imencode('.png', image)[1].tobytes())
+                                            for index, image in enumerate(frames)])
+        finally:
+            inspector.shutdown()
+        self.assertEqual([(r['exit_stage'], r['defect_type']) for r in results],
+                         [(r['exit_stage'], r['defect_type']) for r in expected])
+
+    def test_batch_checks_product_profile_in_workers(self):
+        # Any mapping of product id to LAB reference works as the profile store
+        profiles = {'PROD001': ColorAnalyzer().reference_color([self.test_image])}
+        inspector = BatchInspector(max_workers=1, pipeline=InspectionPipeline(reference_profiles=profiles))
+        try:
+            results, _ = inspector.inspect([('a.png', self.encoded)], product_id='PROD001')
+            unknown, _ = inspector.inspect([('a.png', self.encoded)], product_id='PROD002')
+        finally:
+            inspector.shutdown()
+
+        expected = ColorAnalyzer().detect_discoloration(self.test_image, reference_lab=profiles['PROD001'])[1]
+        self.assertAlmostEqual(results[0]['discoloration'], expected)
+        self.assertEqual((results[0]['product_id'], unknown[0]['product_id']), ('PROD001', 'PROD002'))
+        self.assertNotIn('discoloration', unknown[0])
+
+if __name__ == '__main__':
+    unittest.main()
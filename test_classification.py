@@ -5,7 +5,10 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.defect_classifier import DefectClassifier
+from sklearn.kernel_approximation import Nystroem
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+from src.defect_classifier import DefectClassifier, NystroemModel
 
 class TestDefectClassification(unittest.TestCase):
     def setUp(self):
@@ -25,6 +28,44 @@ class TestDefectClassification(unittest.TestCase):
         self.assertIn(defect_type, ['GOOD', 'MINOR', 'MAJOR', 'CRITICAL', 'UNKNOWN'])
         self.assertIsInstance(confidence, float)
     
+    def test_batch_rules_match_single_rules(self):
+        features = np.random.RandomState(0).rand(200, 6)
+        features[0, [0, 4]] = 0.3  # On a threshold
+        defect_types, confidences = self.classifier.rule_based_batch(features)
+        for row, defect_type, confidence in zip(features, defect_types, confidences):
+            self.assertEqual((defect_type, confidence), self.classifier.rule_based_classification(row))
+        self.assertEqual(self.classifier.rule_based_batch(np.zeros((3, 2)))[0].tolist(), ['UNKNOWN'] * 3)
+    
+    def test_trained_batch_uses_most_probable_class(self):
+        rng = np.random.RandomState(0)
+        features = np.vstack([rng.normal(0.2, 0.05, (40, 6)), rng.normal(0.8, 0.05, (40, 6))])
+        labels = ['GOOD'] * 40 + ['CRITICAL'] * 40
+        self.classifier.train_svm_classifier(features, labels)
+        
+        defect_types, confidences = self.classifier.classify_batch(features)
+        probabilities = self.classifier.model.predict_proba(self.classifier.scaler.transform(features))
+        np.testing.assert_array_equal(defect_types,
+                                      self.classifier.model.classes_[probabilities.argmax(axis=1)])
+        np.testing.assert_allclose(confidences, probabilities.max(axis=1))
+        self.assertEqual(self.classifier.classify_defect_severity(features[0]),
+                         (defect_types[0], confidences[0]))
+    
+    def test_nystroem_backend_matches_scikit_learn(self):
+        rng = np.random.RandomState(1)
+        features = rng.rand(300, 6)
+        labels = np.array(['GOOD', 'MINOR', 'MAJOR', 'CRITICAL'])[np.digitize(features[:, 0], [0.3, 0.6, 0.8])]
+        
+        model = NystroemModel(n_components=50, random_state=0).fit(features, labels)
+        reference = make_pipeline(Nystroem(gamma=1.0 / 6, n_components=50, random_state=0),
+                                  LogisticRegression(max_iter=1000)).fit(features, labels)
+        np.testing.assert_allclose(model.predict_proba(features), reference.predict_proba(features), atol=1e-6)
+        
+        classifier = DefectClassifier(backend='nystroem')
+        classifier.train_classifier(features, labels)
+        defect_types, confidences = classifier.classify_batch(features)
+        self.assertGreater(np.mean(defect_types == labels), 0.8)
+        self.assertTrue(np.all((confidences > 0) & (confidences <= 1)))
+    
     def test_feature_extraction_integration(self):
         # This test would require actual image processing components
         # For now, just test that the method exists and returns expected format
@@ -0,0 +1,104 @@
+# tests/test_color_analysis.py
+import unittest
+import os
+import shutil
+import tempfile
+import time
+import cv2
+import numpy as np
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.color_analysis import ColorAnalyzer, ReferenceProfiles
+from src.database_handler import DatabaseHandler
+from src.frame_context import FrameContext
+
+class TestColorAnalysis(unittest.TestCase):
+    def setUp(self):
+        self.analyzer = ColorAnalyzer()
+        self.test_image = np.random.RandomState(0).randint(0, 255, (120, 160, 3), dtype=np.uint8)
+
+    def test_lookup_matches_per_range_masks(self):
+        defects, total_percentage = self.analyzer.detect_color_defects(self.test_image)
+        hsv = FrameContext(self.test_image).hsv
+
+        any_defect = np.zeros(hsv.shape[:2], dtype=bool)
+        for defect_type, (lower, upper) in self.analyzer.defect_color_ranges.items():
+            expected = cv2.inRange(hsv, np.array(lower, dtype=np.uint8), np.array(upper, dtype=np.uint8))
+            np.testing.assert_array_equal(defects.mask(defect_type), expected)
+            self.assertEqual(defects.pixel_counts[defect_type], np.count_nonzero(expected))
+            any_defect |= expected > 0
+        # Overlapping ranges count each pixel once
+        self.assertAlmostEqual(total_percentage, any_defect.mean())
+
+    def test_masks_are_built_on_request(self):
+        defects, _ = self.analyzer.detect_color_defects(self.test_image)
+        self.assertEqual(defects.masks, {})
+        self.assertIs(defects.mask('rust'), defects.mask('rust'))
+        self.assertEqual(list(defects.masks), ['rust'])
+
+    def test_many_color_classes(self):
+        ranges = {f"hue_{hue}": ([hue, 0, 0], [hue + 9, 255, 255]) for hue in range(0, 120, 10)}
+        self.analyzer.set_defect_color_ranges(ranges)
+        defects, total_percentage = self.analyzer.detect_color_defects(self.test_image)
+        self.assertEqual(defects.label_map.dtype, np.uint16)
+        hue = FrameContext(self.test_image).hsv[..., 0]
+        for start in range(0, 120, 10):
+            self.assertEqual(defects.pixel_counts[f"hue_{start}"],
+                             np.count_nonzero((hue >= start) & (hue <= start + 9)))
+        self.assertAlmostEqual(total_percentage, np.mean(hue < 120))
+
+    def test_discoloration_against_product_profile(self):
+        temp_dir = tempfile.mkdtemp()
+        handler = DatabaseHandler(os.path.join(temp_dir, 'defects.db'), write_behind=False)
+        try:
+            good = np.full((60, 80, 3), 120, dtype=np.uint8)
+            profiles = ReferenceProfiles(handler)
+            profiles.save('PROD001', self.analyzer.reference_color([good]))
+            analyzer = ColorAnalyzer(ReferenceProfiles(handler))
+            self.assertIsNone(analyzer.reference_profiles.get('PROD002'))
+            np.testing.assert_allclose(analyzer.reference_profiles.get('PROD001'),
+                                       profiles.get('PROD001'))
+
+            # A frame that is mostly stained: against its own mean color the
+            # clean area stands out too, against the product profile only the stain
+            frame = good.copy()
+            frame[:, :60] = (40, 60, 180)
+            mask, percentage = analyzer.detect_discoloration(frame, product_id='PROD001')
+            self.assertAlmostEqual(percentage, 0.75)
+            self.assertEqual(mask.dtype, np.uint8)
+            self.assertNotAlmostEqual(analyzer.detect_discoloration(frame)[1], 0.75)
+            _, bgr_percentage = analyzer.detect_discoloration(frame, reference_color=(120, 120, 120))
+            self.assertAlmostEqual(bgr_percentage, 0.75)
+        finally:
+            handler.close()
+            shutil.rmtree(temp_dir)
+
+    def test_reference_profile_from_samples(self):
+        temp_dir = tempfile.mkdtemp()
+        handler = DatabaseHandler(os.path.join(temp_dir, 'defects.db'), write_behind=False)
+        try:
+            samples = [np.full((60, 80, 3), value, dtype=np.uint8) for value in (110, 130)]
+            profiles = ReferenceProfiles(handler, miss_ttl=0.2)
+            self.assertIsNone(profiles.get('PROD001'))
+            with self.assertRaises(ValueError):
+                profiles.save_samples('PROD001', [])
+
+            # Saved by another process: the remembered miss hides it until it expires
+            reference_lab = ReferenceProfiles(handler).save_samples('PROD001', samples)
+            np.testing.assert_allclose(reference_lab, self.analyzer.reference_color(samples))
+            self.assertIsNone(profiles.get('PROD001'))
+            time.sleep(0.25)
+            np.testing.assert_allclose(profiles.get('PROD001'), reference_lab)
+
+            # The stored profile drives the discoloration check
+            frame = samples[0].copy()
+            frame[:, :20] = (40, 60, 180)
+            _, percentage = ColorAnalyzer(profiles).detect_discoloration(frame, product_id='PROD001')
+            self.assertAlmostEqual(percentage, 0.25)
+        finally:
+            handler.close()
+            shutil.rmtree(temp_dir)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,234 @@
+# tests/test_database_handler.py
+import unittest
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from datetime import datetime, timezone
+import numpy as np
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database_handler import DatabaseHandler, SCHEMA_PATH
+
+class TestDatabaseHandler(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, 'defects.db')
+        self.results = {'product_id': 'PROD001', 'edge_density': 0.12,
+                        'texture_features': [1.0, 2.0, 3.0, 4.0, 5.0], 'image_path': ''}
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def count_defects(self):
+        conn = sqlite3.connect(self.db_path)
+        count = conn.execute('SELECT COUNT(*) FROM defects').fetchone()[0]
+        conn.close()
+        return count
+
+    def test_write_behind_group_commits(self):
+        handler = DatabaseHandler(self.db_path, write_behind=True)
+        
+        def record(count):
+            for _ in range(count):
+                handler.record_defect('MINOR', 0.4, self.results)
+        
+        threads = [threading.Thread(target=record, args=(100,)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        handler.flush()
+        
+        self.assertEqual(self.count_defects(), 400)
+        stats = handler.get_write_stats()
+        self.assertEqual(stats['written_rows'], 400)
+        self.assertEqual(stats['queued_rows'], 0)
+        self.assertLess(stats['batches'], 400)
+        self.assertGreater(stats['inserts_per_second'], 0)
+        self.assertEqual(handler.get_recent_defects(limit=5)[0][:2], ('PROD001', 'MINOR'))
+        handler.close()
+
+    def test_close_flushes_pending_rows(self):
+        handler = DatabaseHandler(self.db_path, write_behind=True)
+        for _ in range(10):
+            handler.record_defect('CRITICAL', 0.9, self.results)
+        handler.close()
+        self.assertEqual(self.count_defects(), 10)
+
+    def test_writer_survives_a_failed_batch(self):
+        handler = DatabaseHandler(self.db_path, write_behind=True)
+        row, _ = handler._defect_row('MINOR', 0.4, self.results)
+        # A malformed region row fails outside sqlite3
+        handler.writer.put(row, [None])
+        flushed = threading.Thread(target=handler.flush, daemon=True)
+        flushed.start()
+        flushed.join(5)
+        self.assertFalse(flushed.is_alive())
+        self.assertEqual(handler.get_write_stats()['failed_rows'], 1)
+
+        handler.record_defect('MAJOR', 0.7, self.results)
+        handler.close()
+        self.assertEqual(self.count_defects(), 1)
+
+    def test_pool_opens_overflow_connection_after_timeout(self):
+        handler = DatabaseHandler(self.db_path, write_behind=False)
+        handler.pool.size, handler.pool.timeout = 1, 0.05
+        with handler.pool.connection():
+            # The only pooled connection is held, as by a streaming export
+            self.assertIsNotNone(handler.record_defect('MAJOR', 0.7, self.results))
+        self.assertEqual(handler.get_write_stats()['overflow_connections'], 1)
+        self.assertEqual(handler.pool.idle.qsize(), 1)
+        handler.close()
+
+    def test_waited_writes_return_ids_under_write_behind(self):
+        handler = DatabaseHandler(self.db_path, write_behind=True)
+        self.assertIsNone(handler.record_defect('MINOR', 0.4, self.results))
+        defect_id = handler.record_defect('MAJOR', 0.7, self.results, wait=True)
+        self.assertIsNotNone(defect_id)
+        ids = handler.record_defects([('GOOD', 0.9, self.results), ('CRITICAL', 0.95, self.results)])
+        self.assertEqual(len(set(ids + [defect_id])), 3)
+        handler.flush()
+
+        recent = {row[-1]: row[1] for row in handler.get_recent_defects()}
+        self.assertEqual(recent[defect_id], 'MAJOR')
+        self.assertEqual([recent[i] for i in ids], ['GOOD', 'CRITICAL'])
+        self.assertIsNotNone(handler.record_label(defect_id, 'MAJOR'))
+        handler.close()
+
+    def test_synchronous_writes_and_wal(self):
+        handler = DatabaseHandler(self.db_path, write_behind=False)
+        row_id = handler.record_defect('MAJOR', 0.7, self.results)
+        self.assertEqual(row_id, 1)
+        self.assertEqual(len(handler.get_critical_defects()), 1)
+        self.assertIsNotNone(handler.log_system_event('INFO', 'tests', 'logged'))
+        with handler.pool.connection() as conn:
+            self.assertEqual(conn.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+        handler.close()
+
+    def test_rollups_serve_dashboard_statistics(self):
+        handler = DatabaseHandler(self.db_path, write_behind=False)
+        for defect_type, confidence in [('GOOD', 0.9), ('MINOR', 0.4), ('MINOR', 0.5), ('CRITICAL', 0.95)]:
+            handler.record_defect(defect_type, confidence, self.results)
+        
+        stats = handler.get_defect_statistics()
+        self.assertEqual(stats['today_defects'], 4)
+        self.assertEqual(stats['defect_breakdown'], {'GOOD': 1, 'MINOR': 2, 'CRITICAL': 1})
+        self.assertEqual(stats['weekly_trend'][-1][1], 4)
+        self.assertEqual(len(handler.get_critical_defects()), 1)
+        
+        report_date, total, defects_found, defect_rate, major, critical = handler.get_quality_reports()[-1]
+        self.assertEqual((total, defects_found, major, critical), (4, 3, 0, 1))
+        self.assertAlmostEqual(defect_rate, 0.75)
+        handler.close()
+
+    def test_rollups_backfilled_for_existing_database(self):
+        # A database from before the rollups, with the old quality_reports table
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('''CREATE TABLE defects (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, product_id TEXT, defect_type TEXT NOT NULL,
+            confidence REAL NOT NULL, timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            edge_density REAL, texture_features TEXT, image_path TEXT)''')
+        conn.execute('CREATE TABLE quality_reports (id INTEGER PRIMARY KEY, report_date DATE)')
+        conn.executemany("INSERT INTO defects (defect_type, confidence, timestamp) VALUES (?, ?, ?)",
+                         [('MAJOR', 0.7, '2024-01-01 10:15:00'), ('MAJOR', 0.6, '2024-01-01 10:45:00'),
+                          ('GOOD', 0.9, '2024-01-02 08:00:00')])
+        conn.commit()
+        conn.close()
+        
+        handler = DatabaseHandler(self.db_path, write_behind=False)
+        with handler.pool.connection() as conn:
+            hourly = conn.execute('SELECT * FROM defect_rollups_hourly ORDER BY hour').fetchall()
+        self.assertEqual(hourly[0][:3], ('2024-01-01 10:00:00', 'MAJOR', 2))
+        self.assertAlmostEqual(hourly[0][3], 1.3)
+        self.assertEqual(len(handler.get_quality_reports(days=100000)), 2)
+        handler.close()
+
+    def test_rollups_match_schema_file(self):
+        def rollup_objects(conn):
+            return conn.execute("""SELECT type, name, sql FROM sqlite_master
+                                   WHERE name LIKE '%rollup%' OR name IN ('quality_reports',
+                                   'idx_defects_type_timestamp') ORDER BY name""").fetchall()
+
+        handler = DatabaseHandler(self.db_path, write_behind=False)
+        with handler.pool.connection() as conn:
+            created = rollup_objects(conn)
+        handler.close()
+
+        # A database set up from schema.sql, as setup_database.py does
+        conn = sqlite3.connect(os.path.join(self.temp_dir, 'setup.db'))
+        with open(SCHEMA_PATH) as f:
+            # Skipping the file's path header comment, which is not SQL
+            conn.executescript(''.join(line for line in f if not line.startswith('#')))
+        self.assertEqual(rollup_objects(conn), created)
+        self.assertEqual(len(created), 6)
+        conn.close()
+
+    def test_feature_vectors_stored_as_blobs(self):
+        handler = DatabaseHandler(self.db_path, write_behind=False)
+        handler.record_defect('MINOR', 0.4, self.results)
+        handler.record_defect('MAJOR', 0.7, dict(self.results, product_id='PROD002',
+                                                 feature_vector=[0.5, 6, 7, 8, 9, 10]))
+        handler.record_defect('GOOD', 0.9, {'product_id': 'PROD001'})
+        with self.assertRaises(ValueError):
+            handler.record_defect('GOOD', 0.9, {'feature_vector': [1.0, 2.0]})
+        
+        matrix = handler.get_feature_matrix()
+        self.assertEqual((matrix.shape, matrix.dtype), ((2, 6), np.float32))
+        np.testing.assert_allclose(matrix[0], [0.12, 1, 2, 3, 4, 5])
+        today = datetime.now(timezone.utc).date()
+        np.testing.assert_allclose(handler.get_feature_matrix(today, today, product_id='PROD002'),
+                                   [[0.5, 6, 7, 8, 9, 10]])
+        self.assertEqual(handler.get_feature_matrix(defect_types=['CRITICAL']).shape, (0, 6))
+        with handler.pool.connection() as conn:
+            blob, text = conn.execute('SELECT feature_vector, texture_features FROM defects').fetchone()
+        self.assertEqual((len(blob), text), (24, None))
+        handler.close()
+
+    def test_legacy_feature_text_migrated(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('''CREATE TABLE defects (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, product_id TEXT, defect_type TEXT NOT NULL,
+            confidence REAL NOT NULL, timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            edge_density REAL, texture_features TEXT, image_path TEXT)''')
+        conn.executemany('INSERT INTO defects (defect_type, confidence, edge_density, texture_features) '
+                         'VALUES (?, ?, ?, ?)',
+                         [('GOOD', 0.9, 0.1, '[1.0, 2.0, 3.0, 4.0, 5.0]'),
+                          ('MINOR', 0.4, 0.2, '[0.5, 0.25]'),
+                          ('MAJOR', 0.7, 0.3, '[6.0, 7.0, 8.0, 9.0, 10.0]')])
+        conn.commit()
+        conn.close()
+        
+        handler = DatabaseHandler(self.db_path, write_behind=False)
+        np.testing.assert_allclose(handler.get_feature_matrix(),
+                                   [[0.1, 1, 2, 3, 4, 5], [0.3, 6, 7, 8, 9, 10]], rtol=1e-6)
+        with handler.pool.connection() as conn:
+            legacy = conn.execute('SELECT texture_features FROM defects WHERE feature_vector IS NULL').fetchall()
+        self.assertEqual(legacy, [('[0.5, 0.25]',)])
+        handler.close()
+
+    def test_defect_regions_stored_with_their_defect(self):
+        regions = [{'source': 'edges', 'x': 10, 'y': 20, 'width': 30, 'height': 5, 'area': 120,
+                    'elongation': 8.0, 'score': 0.8},
+                   {'source': 'rust', 'x': 50, 'y': 60, 'width': 4, 'height': 4, 'area': 12,
+                    'elongation': 1.0, 'score': 0.75}]
+        results = dict(self.results, defect_regions=regions)
+        for write_behind in (False, True):
+            handler = DatabaseHandler(self.db_path, write_behind=write_behind)
+            handler.record_defect('MINOR', 0.4, results)
+            handler.record_defect('GOOD', 0.9, self.results)
+            handler.close()
+        
+        handler = DatabaseHandler(self.db_path, write_behind=False)
+        large = handler.get_defect_regions(min_area=100)
+        self.assertEqual(len(large), 2)
+        self.assertEqual((large[0]['source'], large[0]['defect_type'], large[0]['width']), ('edges', 'MINOR', 30))
+        self.assertNotEqual(large[0]['defect_id'], large[1]['defect_id'])
+        self.assertEqual(len(handler.get_defect_regions(max_area=50, source='rust')), 2)
+        self.assertEqual(len(handler.get_defect_regions(limit=3)), 3)
+        handler.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -36,5 +36,20 @@ class TestEdgeDetection(unittest.TestCase):
         line_image = self.detector.detect_line_defects(self.test_image)
         self.assertIsInstance(line_image, np.ndarray)
 
+    def test_defect_region_extraction(self):
+        image = np.full((200, 300, 3), 255, dtype=np.uint8)
+        cv2.line(image, (20, 30), (220, 60), (0, 0, 0), 2)
+        cv2.circle(image, (250, 150), 15, (0, 0, 0), -1)
+        
+        regions = self.detector.extract_defect_regions(image, min_area=20)
+        self.assertEqual(len(regions), 2)
+        scratch, spot = sorted(regions, key=lambda region: region['elongation'], reverse=True)
+        self.assertEqual(scratch['source'], 'edges')
+        self.assertGreater(scratch['elongation'], 10)
+        self.assertLess(spot['elongation'], 1.5)
+        self.assertTrue(230 <= spot['x'] and spot['x'] + spot['width'] <= 270)
+        self.assertGreaterEqual(regions[0]['area'], regions[1]['area'])
+        self.assertEqual(len(self.detector.extract_defect_regions(image, max_regions=1)), 1)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,68 @@
+# tests/test_frame_context.py
+import unittest
+from collections import Counter
+import numpy as np
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.frame_context import FrameContext
+from src.edge_detection import EdgeDefectDetector
+from src.texture_analysis import TextureAnalyzer
+from src.color_analysis import ColorAnalyzer
+from src.defect_classifier import DefectClassifier
+
+class CountingFrameContext(FrameContext):
+    """Frame context that records how often each representation is computed"""
+    def __init__(self, image):
+        super().__init__(image)
+        self.computed = Counter()
+
+    def get(self, key, compute):
+        def counted():
+            self.computed[key] += 1
+            return compute()
+        return super().get(key, counted)
+
+class TestFrameContext(unittest.TestCase):
+    def setUp(self):
+        self.test_image = np.random.randint(0, 255, (120, 160, 3), dtype=np.uint8)
+        self.test_image[60:62, :] = 0  # Dark line
+        self.edge_detector = EdgeDefectDetector()
+        self.texture_analyzer = TextureAnalyzer()
+        self.color_analyzer = ColorAnalyzer()
+
+    def test_wrap_reuses_context(self):
+        frame = FrameContext(self.test_image)
+        self.assertIs(FrameContext.wrap(frame), frame)
+        self.assertIs(FrameContext.wrap(self.test_image).image, self.test_image)
+
+    def test_grayscale_input(self):
+        gray = self.test_image[:, :, 0].copy()
+        frame = FrameContext(gray)
+        self.assertIs(frame.gray, gray)
+        self.assertEqual(frame.bgr.shape, (120, 160, 3))
+
+    def test_comprehensive_features_compute_each_representation_once(self):
+        frame = CountingFrameContext(self.test_image)
+        classifier = DefectClassifier()
+
+        features = classifier.extract_comprehensive_features(
+            frame, self.edge_detector, self.texture_analyzer, self.color_analyzer)
+        self.edge_detector.detect_line_defects(frame)
+        self.texture_analyzer.detect_texture_anomalies(frame)
+
+        self.assertIsInstance(features, np.ndarray)
+        self.assertTrue(frame.computed)
+        self.assertTrue(all(count == 1 for count in frame.computed.values()))
+
+    def test_context_results_match_plain_images(self):
+        frame = FrameContext(self.test_image)
+        np.testing.assert_array_equal(self.edge_detector.detect_cracks_canny(frame),
+                                      self.edge_detector.detect_cracks_canny(self.test_image))
+        _, frame_features = self.texture_analyzer.analyze_texture_defects(frame)
+        _, image_features = self.texture_analyzer.analyze_texture_defects(self.test_image)
+        np.testing.assert_allclose(frame_features, image_features)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+# tests/test_inspection_pipeline.py
+import unittest
+import shutil
+import tempfile
+import cv2
+import numpy as np
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.inspection_pipeline import InspectionPipeline
+from src.defect_classifier import DefectClassifier
+from src.color_analysis import ColorAnalyzer, ReferenceProfiles
+from src.database_handler import DatabaseHandler
+
+class TestPyramidInspection(unittest.TestCase):
+    def setUp(self):
+        self.full = InspectionPipeline(pyramid=False)
+        self.pyramid = InspectionPipeline(pyramid=True)
+        rng = np.random.RandomState(0)
+        self.good_image = cv2.GaussianBlur(rng.randint(90, 160, (600, 800, 3), dtype=np.uint8), (7, 7), 0)
+        self.scratched_image = self.good_image.copy()
+        cv2.line(self.scratched_image, (420, 310), (620, 330), (20, 20, 20), 2)
+
+    def test_good_frame_is_screened_at_coarse_level(self):
+        results = self.pyramid.analyze(self.good_image)
+        self.assertEqual(results['inspection_scale'], 'coarse')
+        self.assertEqual(results['defect_type'], 'GOOD')
+        self.assertEqual(results['escalated_regions'], [])
+        self.assertNotIn('feature_vector', results)
+        self.assertGreaterEqual(results['confidence'], 0.5)
+
+    def test_suspicious_frame_matches_full_resolution(self):
+        results = self.pyramid.analyze(self.scratched_image)
+        expected = self.full.analyze(self.scratched_image)
+        self.assertEqual(results['inspection_scale'], 'full')
+        self.assertEqual(results['feature_vector'], expected['feature_vector'])
+        self.assertEqual((results['defect_type'], results['confidence']),
+                         (expected['defect_type'], expected['confidence']))
+        # The scratch runs through the regions starting at x=400..600, y=300
+        self.assertIn([500, 300, 100, 100], results['escalated_regions'])
+        self.assertTrue(all(x >= 400 and y == 300 for x, y, _, _ in results['escalated_regions']))
+
+class TestTiledTexture(unittest.TestCase):
+    def test_tiled_mode_keeps_the_feature_vector(self):
+        rng = np.random.RandomState(0)
+        image = cv2.GaussianBlur(rng.randint(90, 160, (600, 800, 3), dtype=np.uint8), (7, 7), 0)
+        cv2.circle(image, (420, 310), 12, (20, 20, 20), -1)
+        tiled = InspectionPipeline(texture_mode='tiled', pyramid=False, cascade=False).analyze(image)
+        expected = InspectionPipeline(texture_mode='global', pyramid=False, cascade=False).analyze(image)
+        self.assertEqual(tiled['feature_vector'], expected['feature_vector'])
+        self.assertEqual(tiled['defect_type'], expected['defect_type'])
+        self.assertEqual(tiled['texture_heat_max'], max(map(max, tiled['texture_heat_map'])))
+        self.assertNotIn('texture_heat_max', expected)
+
+class TestProductDiscoloration(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.handler = DatabaseHandler(os.path.join(self.temp_dir, 'defects.db'), write_behind=False)
+        self.good = np.full((600, 800, 3), 120, dtype=np.uint8)
+        ReferenceProfiles(self.handler).save('PROD001', ColorAnalyzer().reference_color([self.good]))
+        self.pipeline = InspectionPipeline(pyramid=False, cascade=False,
+                                           reference_profiles=ReferenceProfiles(self.handler))
+
+    def tearDown(self):
+        self.handler.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_frames_checked_against_their_product_profile(self):
+        frame = self.good.copy()
+        frame[:, :600] = (40, 60, 180)
+        results = self.pipeline.analyze(frame, product_id='PROD001')
+        self.assertEqual(results['product_id'], 'PROD001')
+        self.assertAlmostEqual(results['discoloration'], 0.75)
+        # The check only changes what is reported, not the verdict
+        expected = self.pipeline.analyze(frame)
+        self.assertEqual(results['feature_vector'], expected['feature_vector'])
+        self.assertNotIn('discoloration', expected)
+
+        # Products without a profile skip the check
+        results = self.pipeline.analyze(frame, product_id='PROD002')
+        self.assertEqual(results['product_id'], 'PROD002')
+        self.assertNotIn('discoloration', results)
+
+class TestCascadeInspection(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Good frames of blurred noise, and frames crossed by dark lines
+        rng = np.random.RandomState(0)
+        cls.frames, labels = [], []
+        for index in range(16):
+            image = cv2.GaussianBlur(rng.randint(90, 160, (200, 240, 3), dtype=np.uint8), (7, 7), 0)
+            if index % 2:
+                for y in range(0, 200, 6 + index):
+                    cv2.line(image, (0, y), (239, y + 4), (20, 20, 20), 1)
+            cls.frames.append(image)
+            labels.append('MAJOR' if index % 2 else 'GOOD')
+        cls.classifier = DefectClassifier('nystroem')
+        full = InspectionPipeline(defect_classifier=cls.classifier, pyramid=False, cascade=False)
+        cls.classifier.train_classifier([full.extract_features(image)['feature_vector']
+                                         for image in cls.frames], labels)
+
+    def pipelines(self, confidence, audit_fraction=0.0, classifier=None):
+        classifier = classifier or self.classifier
+        cascade = InspectionPipeline(defect_classifier=classifier, pyramid=False, cascade=True)
+        cascade.cascade_confidence, cascade.cascade_audit_fraction = confidence, audit_fraction
+        return cascade, InspectionPipeline(defect_classifier=classifier, pyramid=False, cascade=False)
+
+    def test_confident_edge_verdicts_exit_early(self):
+        cascade, full = self.pipelines(0.9)
+        for image in self.frames:
+            results = cascade.analyze(image)
+            expected = full.analyze(image)
+            edge_types, edge_confidences = self.classifier.classify_edge_density([expected['edge_density']])
+            if edge_confidences[0] >= 0.9:
+                self.assertEqual(results['exit_stage'], 'edges')
+                self.assertNotIn('feature_vector', results)
+                self.assertEqual((results['defect_type'], results['confidence']),
+                                 (edge_types[0], edge_confidences[0]))
+            else:
+                self.assertEqual(results['exit_stage'], 'texture')
+                self.assertEqual(results['feature_vector'], expected['feature_vector'])
+                self.assertEqual(results['defect_type'], expected['defect_type'])
+
+    def test_audits_report_agreement_with_full_pipeline(self):
+        # Every frame exits early and is audited
+        cascade, full = self.pipelines(0.0, audit_fraction=1.0)
+        verdicts = [cascade.analyze(image)['defect_type'] for image in self.frames]
+        expected = [full.analyze(image)['defect_type'] for image in self.frames]
+
+        stats = cascade.stage_stats.get_stats()
+        self.assertEqual(stats['stages']['edges']['exit_rate'], 1.0)
+        self.assertEqual(stats['early_exit_audits'], len(self.frames))
+        self.assertAlmostEqual(stats['early_exit_agreement'], np.mean(np.array(verdicts) == expected))
+        self.assertIsNone(full.stage_stats.get_stats()['early_exit_agreement'])
+
+    def test_rules_never_exit_early(self):
+        # Without a trained model there is no typical texture to assume
+        cascade, full = self.pipelines(0.0, classifier=DefectClassifier())
+        results = cascade.analyze(self.frames[1])
+        expected = full.analyze(self.frames[1])
+        self.assertEqual(results['exit_stage'], 'texture')
+        self.assertEqual(results['feature_vector'], expected['feature_vector'])
+        self.assertEqual(results['defect_type'], expected['defect_type'])
+
+        stats = cascade.stage_stats.get_stats()
+        self.assertEqual(stats['frames'], 1)
+        self.assertEqual(stats['stages']['texture']['exit_rate'], 1.0)
+        self.assertGreater(stats['stages']['texture']['latency_p99_ms'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
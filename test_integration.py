@@ -58,6 +58,25 @@ class TestIntegration(unittest.TestCase):
         
         # Check that image is not empty
         self.assertGreater(np.mean(processed_image), 0)
+    
+    def test_grayscale_preprocessing_parity(self):
+        # The single-plane pipeline must match the gray view of the colour pipeline
+        expected = cv2.cvtColor(self.preprocessor.preprocess(self.test_image), cv2.COLOR_BGR2GRAY)
+        gray_plane = ImagePreprocessor(grayscale=True).preprocess(self.test_image)
+        
+        self.assertEqual(gray_plane.ndim, 2)
+        self.assertEqual(gray_plane.dtype, np.uint8)
+        np.testing.assert_array_equal(gray_plane, expected)
+    
+    def test_detectors_accept_grayscale_plane(self):
+        color_image = self.preprocessor.preprocess(self.test_image)
+        gray_plane = ImagePreprocessor(grayscale=True).preprocess(self.test_image)
+        
+        np.testing.assert_array_equal(self.edge_detector.detect_cracks_canny(gray_plane),
+                                      self.edge_detector.detect_cracks_canny(color_image))
+        _, gray_features = self.texture_analyzer.analyze_texture_defects(gray_plane)
+        _, color_features = self.texture_analyzer.analyze_texture_defects(color_image)
+        np.testing.assert_allclose(gray_features, color_features)
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
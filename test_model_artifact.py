@@ -0,0 +1,100 @@
+# tests/test_model_artifact.py
+import unittest
+import json
+import os
+import shutil
+import tempfile
+import threading
+import numpy as np
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.defect_classifier import DefectClassifier
+from src.model_artifact import (ModelArtifactError, artifact_versions, latest_artifact,
+                                load_model_artifact, save_model_artifact)
+
+class TestModelArtifact(unittest.TestCase):
+    def setUp(self):
+        self.model_dir = tempfile.mkdtemp()
+        rng = np.random.RandomState(0)
+        self.features = rng.rand(200, 6)
+        labels = np.array(['GOOD', 'MINOR', 'MAJOR', 'CRITICAL'])
+        self.labels = labels[np.digitize(self.features[:, [0, 5]].mean(axis=1), [0.3, 0.6, 0.8])]
+
+    def tearDown(self):
+        shutil.rmtree(self.model_dir)
+
+    def train(self, backend):
+        classifier = DefectClassifier(backend)
+        classifier.train_classifier(self.features, self.labels)
+        return classifier
+
+    def test_round_trip_matches_trained_model(self):
+        for backend in ('svc', 'nystroem'):
+            classifier = self.train(backend)
+            path = save_model_artifact(classifier, self.model_dir, {'source': 'tests'})
+
+            loaded = load_model_artifact(path)
+            self.assertEqual(loaded.backend, backend)
+            self.assertIsInstance(loaded.scaler.mean_, np.memmap)
+            expected_types, expected_confidences = classifier.classify_batch(self.features)
+            defect_types, confidences = loaded.classify_batch(self.features)
+            np.testing.assert_array_equal(defect_types, expected_types)
+            np.testing.assert_allclose(confidences, expected_confidences, atol=1e-9)
+            self.assertGreaterEqual(loaded.warm_up(), 0.0)
+            # The cascade's edge-only model travels with the artifact
+            edge_types, edge_confidences = loaded.classify_edge_density(self.features[:, 0])
+            expected_types, expected_confidences = classifier.classify_edge_density(self.features[:, 0])
+            np.testing.assert_array_equal(edge_types, expected_types)
+            np.testing.assert_allclose(edge_confidences, expected_confidences, atol=1e-9)
+
+        self.assertTrue(latest_artifact(self.model_dir).endswith('severity-v0002'))
+        self.assertEqual(load_model_artifact(latest_artifact(self.model_dir)).manifest['model_version'], 2)
+
+    def test_concurrent_saves_get_distinct_versions(self):
+        classifier = self.train('nystroem')
+        # A version reserved by a writer that has not finished yet
+        os.mkdir(os.path.join(self.model_dir, 'severity-v0001'))
+        self.assertEqual(artifact_versions(self.model_dir), [])
+
+        barrier = threading.Barrier(4)
+        paths = []
+
+        def save():
+            barrier.wait()
+            paths.append(save_model_artifact(classifier, self.model_dir))
+
+        threads = [threading.Thread(target=save) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        versions = artifact_versions(self.model_dir)
+        self.assertEqual([version for version, _ in versions], [2, 3, 4, 5])
+        self.assertEqual(sorted(paths), [path for _, path in versions])
+        for version, path in versions:
+            self.assertEqual(load_model_artifact(path).manifest['model_version'], version)
+
+    def test_rejects_mismatched_artifacts(self):
+        path = save_model_artifact(self.train('nystroem'), self.model_dir)
+        manifest_path = os.path.join(path, 'manifest.json')
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+        feature_names = manifest['feature_names']
+        manifest['feature_names'] = feature_names[:-1]
+        with open(manifest_path, 'w') as f:
+            json.dump(manifest, f)
+        with self.assertRaisesRegex(ModelArtifactError, 'expects features'):
+            load_model_artifact(path)
+
+        manifest['feature_names'] = feature_names
+        with open(manifest_path, 'w') as f:
+            json.dump(manifest, f)
+        np.save(os.path.join(path, 'coef.npy'), np.zeros((4, 3)))
+        with self.assertRaisesRegex(ModelArtifactError, 'manifest says'):
+            load_model_artifact(path)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+# tests/test_model_registry.py
+import unittest
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.defect_classifier import DefectClassifier
+from src.model_artifact import save_model_artifact
+from src.model_registry import ModelRegistry
+
+class TestModelRegistry(unittest.TestCase):
+    def setUp(self):
+        self.model_dir = tempfile.mkdtemp()
+        rng = np.random.RandomState(0)
+        self.features = rng.rand(200, 6)
+        self.labels = np.where(self.features[:, 0] > 0.5, 'MAJOR', 'GOOD')
+
+    def tearDown(self):
+        shutil.rmtree(self.model_dir)
+
+    def save(self, backend='nystroem'):
+        classifier = DefectClassifier(backend)
+        classifier.train_classifier(self.features, self.labels)
+        return save_model_artifact(classifier, self.model_dir)
+
+    def test_new_versions_swap_in(self):
+        registry = ModelRegistry(self.model_dir)
+        self.assertFalse(registry.check())
+        self.assertEqual(registry.get_stats()['live_backend'], 'rules')
+
+        self.save()
+        self.assertTrue(registry.check())
+        self.assertFalse(registry.check())
+        self.save('svc')
+        registry.poll_interval = 0.05
+        registry.start()
+        deadline = time.time() + 5
+        while registry.get_stats()['live_version'] != 2 and time.time() < deadline:
+            time.sleep(0.05)
+        registry.stop()
+
+        stats = registry.get_stats()
+        self.assertEqual((stats['live_version'], stats['live_backend'], stats['swaps']), (2, 'svc', 2))
+        defect_types, confidences = registry.classify_batch(self.features[:5])
+        self.assertEqual(len(defect_types), 5)
+
+    def test_shadow_candidate_until_promoted(self):
+        registry = ModelRegistry(self.model_dir, shadow_fraction=1.0)
+        self.save()
+        registry.check()
+        self.save('svc')
+        registry.check()
+        self.assertEqual(registry.get_stats()['candidate_version'], 2)
+
+        live_types, _ = registry.live.classify_batch(self.features)
+        defect_types, _ = registry.classify_batch(self.features)
+        np.testing.assert_array_equal(defect_types, live_types)
+        stats = registry.get_stats()
+        self.assertEqual((stats['live_version'], stats['shadow_samples']), (1, 200))
+        self.assertGreater(stats['agreement_rate'], 0.8)
+        self.assertGreater(stats['candidate_latency_p99'], 0)
+
+        self.assertTrue(registry.promote())
+        self.assertEqual(registry.get_stats()['live_version'], 2)
+        self.assertIsNone(registry.get_stats()['candidate_version'])
+
+        self.save()
+        registry.check()
+        self.assertTrue(registry.reject())
+        self.assertFalse(registry.check())
+        self.assertEqual(registry.get_stats()['live_version'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+# tests/test_online_learning.py
+import unittest
+import os
+import shutil
+import tempfile
+import numpy as np
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database_handler import DatabaseHandler
+from src.model_artifact import artifact_versions, load_model_artifact
+from src.online_learning import OnlineTrainer
+
+class TestOnlineLearning(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.model_dir = os.path.join(self.temp_dir, 'models')
+        self.handler = DatabaseHandler(os.path.join(self.temp_dir, 'defects.db'), write_behind=False)
+        self.rng = np.random.RandomState(0)
+
+    def tearDown(self):
+        self.handler.close()
+        shutil.rmtree(self.temp_dir)
+
+    def label_defects(self, count):
+        """Store defects whose true type depends on the first feature and label them"""
+        for features in self.rng.rand(count, 6):
+            defect_id = self.handler.record_defect('GOOD', 0.5, {'feature_vector': features})
+            self.handler.record_label(defect_id, 'MAJOR' if features[0] > 0.5 else 'GOOD', 'op1')
+
+    def test_record_label_requires_defect(self):
+        with self.assertRaises(ValueError):
+            self.handler.record_label(12345, 'MAJOR')
+        self.label_defects(3)
+        batches = list(self.handler.iter_labeled_features(batch_size=2))
+        self.assertEqual([len(label_ids) for label_ids, _, _ in batches], [2, 1])
+        self.assertEqual(batches[0][2].shape, (2, 6))
+
+    def test_keep_checkpoints_must_keep_one(self):
+        with self.assertRaisesRegex(ValueError, 'keep_checkpoints'):
+            OnlineTrainer(self.handler, self.model_dir, keep_checkpoints=0)
+
+        trainer = OnlineTrainer(self.handler, self.model_dir, batch_size=64, checkpoint_interval=0,
+                                min_labels=100, keep_checkpoints=1)
+        for _ in range(3):
+            self.label_defects(100)
+            trainer.update()
+        self.assertEqual(artifact_versions(self.model_dir), [(3, trainer.get_stats()['last_checkpoint'])])
+
+    def test_updates_checkpoint_and_resume(self):
+        trainer = OnlineTrainer(self.handler, self.model_dir, batch_size=64, checkpoint_interval=0,
+                                min_labels=100, keep_checkpoints=2)
+        self.label_defects(60)
+        self.assertEqual(trainer.update(), 60)
+        self.assertEqual(artifact_versions(self.model_dir), [])
+        self.assertEqual(trainer.update(), 0)
+
+        for _ in range(3):
+            self.label_defects(200)
+            trainer.update()
+        stats = trainer.get_stats()
+        self.assertEqual((stats['labels_seen'], stats['last_label_id'], stats['checkpoints']), (660, 660, 3))
+        self.assertEqual([version for version, _ in artifact_versions(self.model_dir)], [2, 3])
+
+        features = self.rng.rand(500, 6)
+        checkpoint = load_model_artifact(stats['last_checkpoint'])
+        defect_types, _ = checkpoint.classify_batch(features)
+        accuracy = np.mean(defect_types == np.where(features[:, 0] > 0.5, 'MAJOR', 'GOOD'))
+        self.assertGreater(accuracy, 0.9)
+        # The labels depend on edge density only, so the cascade's edge model learns them too
+        edge_types, _ = checkpoint.classify_edge_density(features[:, 0])
+        self.assertGreater(np.mean(edge_types == np.where(features[:, 0] > 0.5, 'MAJOR', 'GOOD')), 0.9)
+
+        resumed = OnlineTrainer(self.handler, self.model_dir, min_labels=100)
+        self.assertEqual((resumed.last_label_id, resumed.labels_seen), (660, 660))
+        self.label_defects(10)
+        self.assertEqual(resumed.update(), 10)
+        self.assertEqual(resumed.classifier.scaler.n_samples_seen_, 670)
+
+if __name__ == '__main__':
+    unittest.main()
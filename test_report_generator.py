@@ -0,0 +1,82 @@
+# tests/test_report_generator.py
+import unittest
+import csv
+import os
+import shutil
+import tempfile
+from datetime import date
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database_handler import DatabaseHandler
+from src.report_generator import ChartCache, ReportGenerator
+
+class TestReportGenerator(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_handler = DatabaseHandler(os.path.join(self.temp_dir, 'defects.db'), write_behind=False)
+        rows = [('PROD001', 'GOOD', 0.9, '2024-03-01 08:00:00'),
+                ('PROD001', 'MINOR', 0.4, '2024-03-01 09:30:00'),
+                ('PROD002', 'CRITICAL', 0.8, '2024-03-03 23:59:59')]
+        with self.db_handler.pool.connection() as conn:
+            conn.executemany('INSERT INTO defects (product_id, defect_type, confidence, timestamp) '
+                             'VALUES (?, ?, ?, ?)', rows)
+        self.chart_cache = ChartCache(os.path.join(self.temp_dir, 'charts'), max_entries=2)
+        self.generator = ReportGenerator(self.db_handler, self.chart_cache)
+
+    def tearDown(self):
+        self.db_handler.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_trend_report_from_rollups(self):
+        trend = self.generator.generate_trend_report(start_date=date(2024, 3, 1), end_date=date(2024, 3, 3))
+        
+        self.assertEqual([day['date'] for day in trend], ['2024-03-01', '2024-03-02', '2024-03-03'])
+        self.assertEqual(trend[0]['total_inspections'], 2)
+        self.assertEqual(trend[0]['defect_breakdown']['MINOR'], 1)
+        self.assertAlmostEqual(trend[0]['defect_rate'], 0.5)
+        self.assertAlmostEqual(trend[0]['average_confidence'], 0.65)
+        self.assertEqual(trend[1]['total_inspections'], 0)
+        self.assertEqual(trend[2]['defect_breakdown']['CRITICAL'], 1)
+        self.assertEqual(trend[0]['defects'], [])
+
+    def test_details_only_when_requested(self):
+        report = self.generator.generate_daily_report(date(2024, 3, 1), include_details=True)
+        self.assertEqual([defect[1] for defect in report['defects']], ['GOOD', 'MINOR'])
+
+    def test_csv_export_streams_rows(self):
+        trend = self.generator.generate_trend_report(start_date=date(2024, 3, 1), end_date=date(2024, 3, 3))
+        filename = self.generator.export_to_csv(trend, os.path.join(self.temp_dir, 'report.csv'))
+        
+        with open(filename, newline='') as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0][:2], ['Product ID', 'Defect Type'])
+        self.assertEqual([row[1] for row in rows[1:]], ['GOOD', 'MINOR', 'CRITICAL'])
+
+    def test_stream_csv_filters(self):
+        chunks = list(self.generator.stream_csv(product_id='PROD001', defect_types=['MINOR', 'CRITICAL'],
+                                                batch_size=1))
+        rows = list(csv.reader(''.join(chunks).splitlines()))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][:2], ['PROD001', 'MINOR'])
+        
+        chunks = list(self.generator.stream_csv(start_date=date(2024, 3, 2), batch_size=1))
+        self.assertEqual(len(chunks), 2)  # header and one row
+        self.assertIn('CRITICAL', chunks[1])
+
+    def test_charts_cached_by_data(self):
+        first = self.generator.generate_daily_report(date(2024, 3, 1))
+        path = self.generator.create_defect_chart(first)
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(self.generator.create_defect_chart(dict(first)), path)
+        self.assertEqual((self.chart_cache.hits, self.chart_cache.misses), (1, 1))
+        
+        # Two more distinct charts evict the least recently used one
+        for day in (2, 3):
+            self.generator.create_defect_chart(self.generator.generate_daily_report(date(2024, 3, day)))
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(len(os.listdir(os.path.join(self.temp_dir, 'charts'))), 2)
+        self.assertEqual(len(ChartCache(os.path.join(self.temp_dir, 'charts')).entries), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+# tests/test_stream_inspector.py
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+import time
+import cv2
+import numpy as np
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.stream_inspector import FrameRingBuffer, StreamInspector
+
+class SlowPipeline:
+    """Stand-in pipeline that is slower than the video source"""
+    def __init__(self, delay):
+        self.delay = delay
+
+    def analyze(self, image):
+        time.sleep(self.delay)
+        return {'defect_type': 'GOOD', 'confidence': 1.0}
+
+class TestStreamInspector(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp()
+        cls.video_path = os.path.join(cls.temp_dir, 'line.avi')
+        writer = cv2.VideoWriter(cls.video_path, cv2.VideoWriter_fourcc(*'MJPG'), 30, (160, 120))
+        for i in range(30):
+            frame = np.full((120, 160, 3), 128, dtype=np.uint8)
+            cv2.line(frame, (i * 5, 0), (i * 5, 119), (20, 20, 20), 2)
+            writer.write(frame)
+        writer.release()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir)
+
+    def test_ring_buffer_drops_oldest(self):
+        buffer = FrameRingBuffer(2)
+        self.assertFalse(buffer.put(1))
+        self.assertFalse(buffer.put(2))
+        self.assertTrue(buffer.put(3))
+        self.assertEqual(buffer.dropped, 1)
+        self.assertEqual(buffer.get(timeout=0), 2)
+        buffer.close()
+        self.assertEqual(buffer.get(timeout=0), 3)
+        self.assertIsNone(buffer.get(timeout=0))
+
+    def test_video_file_source_inspects_every_frame(self):
+        results = []
+        inspector = StreamInspector(buffer_size=64, on_result=lambda frame, result: results.append(result))
+        subscriber = inspector.subscribe()
+
+        self.assertTrue(inspector.start(self.video_path))
+        self.assertTrue(inspector.wait(timeout=60))
+
+        stats = inspector.get_stats()
+        self.assertEqual(stats['captured_frames'], 30)
+        self.assertEqual(stats['processed_frames'], 30)
+        self.assertEqual(stats['dropped_frames'], 0)
+        self.assertFalse(stats['running'])
+        self.assertEqual(sorted(result['frame_number'] for result in results), list(range(1, 31)))
+        event, data = subscriber.get(timeout=1)
+        self.assertEqual(event, 'result')
+        self.assertIn('defect_type', data)
+
+    def test_slow_pipeline_drops_oldest_frames(self):
+        inspector = StreamInspector(pipeline=SlowPipeline(0.15), buffer_size=2, frame_step=2)
+        self.assertTrue(inspector.start(self.video_path, realtime=True))
+        self.assertTrue(inspector.wait(timeout=60))
+
+        stats = inspector.get_stats()
+        self.assertEqual(stats['captured_frames'], 30)
+        self.assertEqual(stats['skipped_frames'], 15)
+        self.assertGreater(stats['dropped_frames'], 0)
+        self.assertEqual(stats['processed_frames'] + stats['dropped_frames'], 15)
+        self.assertEqual(stats['queue_depth'], 0)
+
+    def test_concurrent_starts_open_one_source(self):
+        inspector = StreamInspector(pipeline=SlowPipeline(0.05), buffer_size=2)
+        barrier = threading.Barrier(4)
+        started = []
+
+        def start():
+            barrier.wait()
+            started.append(inspector.start(self.video_path, realtime=True))
+
+        threads = [threading.Thread(target=start) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(started), [False, False, False, True])
+        self.assertEqual(sum(thread.name == 'stream-capture' for thread in threading.enumerate()), 1)
+        inspector.stop()
+        self.assertFalse(inspector.is_running())
+
+    def test_missing_source(self):
+        inspector = StreamInspector(pipeline=SlowPipeline(0))
+        self.assertFalse(inspector.start(os.path.join(self.temp_dir, 'missing.avi')))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,11 +2,13 @@
 import unittest
 import cv2
 import numpy as np
+from mahotas.features.lbp import lbp_transform
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.texture_analysis import TextureAnalyzer
+from src import glcm, lbp
 
 class TestTextureAnalysis(unittest.TestCase):
     def setUp(self):
@@ -27,6 +29,98 @@ class TestTextureAnalysis(unittest.TestCase):
     def test_lbp_features(self):
         features = self.analyzer.compute_lbp_features(self.test_image)
         self.assertIsInstance(features, np.ndarray)
+        self.assertEqual(len(features), 26)  # 24 points + 2 riu2 bins
+        self.assertAlmostEqual(features.sum(), 1.0, places=5)
+        
+        multi_scale = self.analyzer.compute_lbp_features(self.test_image, [1, 2, 3], [8, 16, 24])
+        self.assertEqual(len(multi_scale), 10 + 18 + 26)
+        np.testing.assert_allclose(multi_scale[-26:], features)
+    
+    def test_lbp_matches_mahotas(self):
+        gray = cv2.cvtColor(self.test_image, cv2.COLOR_BGR2GRAY)
+        for radius, points in [(1, 8), (2, 16), (3, 24)]:
+            codes = lbp_transform(gray, radius, points).astype(np.int64)
+            # riu2 label of mahotas' rotation-minimum codes
+            bits = (codes[..., None] >> np.arange(points)) & 1
+            transitions = np.sum(bits != np.roll(bits, 1, axis=-1), axis=-1)
+            expected = np.where(transitions <= 2, bits.sum(axis=-1), points + 1)
+            
+            labels = lbp.riu2_transform(gray, radius, points, sampling='mahotas')
+            # mahotas tests bounds and reads pixels at different offsets, so borders differ
+            margin = radius + 2
+            np.testing.assert_array_equal(labels[margin:-margin, margin:-margin],
+                                          expected[margin:-margin, margin:-margin])
+    
+    def test_lbp_matches_per_pixel_reference(self):
+        # The default sampling, checked against a direct float64 bilinear
+        # evaluation of every circle point
+        gray = cv2.cvtColor(self.test_image, cv2.COLOR_BGR2GRAY)[:32, :32]
+        for radius, points in [(1, 8), (2, 16), (3, 24), (2.5, 12)]:
+            labels = lbp.riu2_transform(gray, radius, points)
+            angles = 2 * np.pi * np.arange(points) / points
+            margin = int(np.ceil(radius)) + 1
+            for y in range(margin, gray.shape[0] - margin):
+                for x in range(margin, gray.shape[1] - margin):
+                    bits = []
+                    for angle in angles:
+                        py, px = y - radius * np.sin(angle), x - radius * np.cos(angle)
+                        y0, x0 = int(np.floor(py)), int(np.floor(px))
+                        fy, fx = py - y0, px - x0
+                        patch = gray[y0:y0 + 2, x0:x0 + 2].astype(np.float64)
+                        sample = np.array([1 - fy, fy]) @ patch @ np.array([1 - fx, fx])
+                        bits.append(sample > gray[y, x] + 1e-6)
+                    transitions = sum(bits[i] != bits[i - 1] for i in range(points))
+                    expected = sum(bits) if transitions <= 2 else points + 1
+                    self.assertEqual(labels[y, x], expected, (radius, points, y, x))
+    
+    def test_numpy_glcm_matches_mahotas(self):
+        numpy_analyzer = TextureAnalyzer(glcm_backend='numpy')
+        mahotas_analyzer = TextureAnalyzer(glcm_backend='mahotas')
+        
+        np.testing.assert_allclose(numpy_analyzer.extract_haralick_features(self.test_image),
+                                   mahotas_analyzer.extract_haralick_features(self.test_image),
+                                   rtol=1e-9)
+        _, numpy_features = numpy_analyzer.analyze_texture_defects(self.test_image)
+        _, mahotas_features = mahotas_analyzer.analyze_texture_defects(self.test_image)
+        np.testing.assert_allclose(numpy_features, mahotas_features, rtol=1e-9)
+    
+    def test_quantized_glcm_features(self):
+        analyzer = TextureAnalyzer(glcm_levels=32)
+        features = analyzer.compute_haralick(self.test_image, ['contrast', 'angular_second_moment'])
+        self.assertEqual(features.shape, (4, 2))
+        self.assertTrue(np.all(np.isfinite(features)))
+
+    def test_quantized_features_on_full_scale(self):
+        image = cv2.GaussianBlur(self.test_image, (5, 5), 0)
+        names = ['contrast', 'correlation', 'sum_of_squares_variance']
+        quantized = TextureAnalyzer(glcm_levels=64).compute_haralick(image, names).mean(axis=0)
+        full = TextureAnalyzer(glcm_levels=256).compute_haralick(image, names).mean(axis=0)
+        np.testing.assert_allclose(quantized, full, rtol=0.1)
+        # The stored feature vector agrees too
+        _, quantized = TextureAnalyzer(glcm_levels=64).analyze_texture_defects(image)
+        _, full = TextureAnalyzer(glcm_levels=256).analyze_texture_defects(image)
+        np.testing.assert_allclose(quantized[[1, 3]], full[[1, 3]], rtol=0.1)
+
+    def test_tiled_texture_heat_map(self):
+        analyzer = TextureAnalyzer(tile_size=40, tile_stride=20, tile_levels=16)
+        result, heat_map = analyzer.analyze_texture_tiles(self.test_image)
+        self.assertIn(result, ['GOOD', 'DEFECT'])
+        self.assertEqual(heat_map.shape, (4, 4))  # (100 // 20) - 1 tiles per axis
+        # Negative correlation can push a score above 1, but never below 0
+        self.assertTrue(np.all(heat_map >= 0))
+    
+    def test_tile_cooccurrence_covers_image(self):
+        gray = cv2.cvtColor(self.test_image, cv2.COLOR_BGR2GRAY)
+        quantized = glcm.quantize(gray, 16)
+        # Non-overlapping tiles partition the pixel pairs of the whole image
+        tiles = glcm.tile_cooccurrence_matrices(quantized, 20, 20, 16)
+        np.testing.assert_array_equal(tiles.sum(axis=(0, 1)),
+                                      glcm.cooccurrence_matrices(quantized, 16))
+        # Overlapping tiles are sums of their cells
+        cells = glcm.cell_cooccurrence_matrices(quantized, 20, 16)
+        overlapping = glcm.tile_cooccurrence_matrices(quantized, 40, 20, 16)
+        expected = cells[1:3, 2:4].sum(axis=(0, 1))
+        np.testing.assert_array_equal(overlapping[1, 2], expected + np.swapaxes(expected, -1, -2))
     
     def test_texture_anomaly_detection(self):
         anomaly_score, features = self.analyzer.detect_texture_anomalies(self.test_image)
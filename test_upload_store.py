@@ -0,0 +1,75 @@
+# tests/test_upload_store.py
+import unittest
+import os
+import shutil
+import tempfile
+from unittest import mock
+import cv2
+import numpy as np
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.upload_store import UploadStore
+from src.image_acquisition import ImageCapture
+
+class TestUploadStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.store = UploadStore(self.temp_dir)
+        self.test_image = np.random.randint(0, 255, (60, 80, 3), dtype=np.uint8)
+        self.encoded = cv2.imencode('.png', self.test_image)[1].tobytes()
+
+    def tearDown(self):
+        self.store.shutdown()
+        shutil.rmtree(self.temp_dir)
+
+    def test_identical_uploads_share_one_file(self):
+        paths = [self.store.save(self.encoded, 'PNG') for _ in range(3)]
+        other = self.store.save(self.encoded + b'\0', 'png')
+        self.store.flush()
+
+        self.assertEqual(len(set(paths)), 1)
+        self.assertTrue(paths[0].endswith('.png'))
+        self.assertNotEqual(other, paths[0])
+        self.assertEqual(sorted(os.listdir(self.temp_dir)),
+                         sorted([os.path.basename(paths[0]), os.path.basename(other)]))
+        with open(paths[0], 'rb') as f:
+            self.assertEqual(f.read(), self.encoded)
+        # Saving again once the file exists queues no write
+        self.store.save(self.encoded, 'png')
+        self.assertEqual(self.store.pending, {})
+
+    def test_write_is_temp_then_rename(self):
+        renames = []
+        real_replace = os.replace
+
+        def checked_replace(src, dst):
+            # The final name only appears once the complete file is renamed into place
+            self.assertFalse(os.path.exists(dst))
+            with open(src, 'rb') as f:
+                renames.append((src, dst, f.read()))
+            real_replace(src, dst)
+
+        with mock.patch('os.replace', side_effect=checked_replace):
+            path = self.store.save(self.encoded, 'png')
+            self.store.flush()
+        self.assertEqual(len(renames), 1)
+        self.assertTrue(renames[0][0].endswith('.tmp'))
+        self.assertEqual(renames[0][1:], (path, self.encoded))
+
+        # A failed write leaves neither the image nor its temporary file behind
+        with mock.patch('os.replace', side_effect=OSError('disk full')):
+            failed = self.store.save(b'other upload', 'png')
+            self.store.flush()
+        self.assertFalse(os.path.exists(failed))
+        self.assertEqual(os.listdir(self.temp_dir), [os.path.basename(path)])
+
+    def test_decode_image(self):
+        capture = ImageCapture()
+        np.testing.assert_array_equal(capture.decode_image(self.encoded), self.test_image)
+        self.assertIsNone(capture.decode_image(b'not an image'))
+        self.assertIsNone(capture.decode_image(b''))
+        self.assertIsNone(capture.decode_image(self.encoded[:20]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,31 +3,41 @@ import cv2
 import numpy as np
 import mahotas as mt
 from sklearn.cluster import KMeans
+from src.frame_context import FrameContext
+from src import glcm, lbp
+
+# Haralick features used for texture defect scoring (mahotas indices 0-3)
+DEFECT_FEATURES = glcm.HARALICK_FEATURES[:4]
 
 class TextureAnalyzer:
-    def __init__(self):
+    def __init__(self, glcm_backend='numpy', glcm_levels=256, tile_size=100, tile_stride=50,
+                 tile_levels=16):
         self.kmeans = KMeans(n_clusters=3, random_state=42)
+        # 'numpy' uses the built-in GLCM engine, 'mahotas' is kept for parity checks
+        self.glcm_backend = glcm_backend
+        self.glcm_levels = glcm_levels
+        
+        # Tiled texture analysis settings
+        self.tile_size = tile_size
+        self.tile_stride = tile_stride
+        self.tile_levels = tile_levels
     
     def extract_haralick_features(self, image):
         """Extract Haralick texture features"""
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        
         # Calculate Haralick features
-        features = mt.features.haralick(gray)
+        features = self.compute_haralick(image)
         return features.mean(axis=0)  # Return mean of all directions
     
     def analyze_texture_defects(self, image):
         """Analyze texture for defects using GLCM and clustering"""
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        
         # Calculate GLCM and Haralick features
-        glcm = mt.features.haralick(gray)
+        haralick = self.compute_haralick(image, DEFECT_FEATURES)
         
         # Extract important texture features
-        contrast = glcm[:, 0].mean()
-        correlation = glcm[:, 1].mean()
-        energy = glcm[:, 2].mean()
-        homogeneity = glcm[:, 3].mean()
+        contrast = haralick[:, 0].mean()
+        correlation = haralick[:, 1].mean()
+        energy = haralick[:, 2].mean()
+        homogeneity = haralick[:, 3].mean()
         
         # Classify based on texture features
         defect_probability = self.calculate_defect_probability(
@@ -39,39 +49,88 @@ class TextureAnalyzer:
         else:
             return "GOOD", np.array([contrast, correlation, energy, homogeneity, defect_probability])
     
+    def compute_haralick(self, image, features=None):
+        """Haralick features for all four directions, shared through the frame context"""
+        frame = FrameContext.wrap(image)
+        
+        if self.glcm_backend == 'mahotas':
+            all_features = frame.get('haralick', lambda: mt.features.haralick(frame.gray))
+            if features is None:
+                return all_features
+            return all_features[:, [glcm.HARALICK_FEATURES.index(name) for name in features]]
+        
+        # Co-occurrence matrices are cached so every feature subset reuses them
+        cmats = frame.get(('glcm', self.glcm_levels), lambda: glcm.cooccurrence_matrices(
+            glcm.quantize(frame.gray, self.glcm_levels)))
+        # Gray-level dependent features are reported on the 256-level scale, so
+        # values and stored feature vectors do not depend on glcm_levels
+        names = tuple(features or glcm.HARALICK_FEATURES)
+        key = ('haralick', self.glcm_levels, names)
+        return frame.get(key, lambda: glcm.to_full_scale(
+            glcm.haralick_from_cooccurrence(cmats, features), names, self.glcm_levels))
+    
+    def analyze_texture_tiles(self, image):
+        """Per-tile texture defect probability heat map.
+        
+        Tiles of tile_size pixels are placed every tile_stride pixels, so
+        heat_map[r, c] covers the tile whose top-left corner is at
+        (r * tile_stride, c * tile_stride).
+        """
+        frame = FrameContext.wrap(image)
+        key = ('texture_tiles', self.tile_size, self.tile_stride, self.tile_levels)
+        heat_map = frame.get(key, lambda: self._tile_defect_probabilities(frame))
+        
+        if heat_map.size and heat_map.max() > 0.5:
+            return "DEFECT", heat_map
+        else:
+            return "GOOD", heat_map
+    
+    def _tile_cells(self, frame):
+        """Unsymmetrized co-occurrence counts per tile_stride cell, shared through the frame context"""
+        if self.tile_size % self.tile_stride:
+            raise ValueError('tile_size must be a multiple of tile_stride')
+        key = ('texture_cells', self.tile_stride, self.tile_levels)
+        return frame.get(key, lambda: glcm.cell_cooccurrence_matrices(
+            glcm.quantize(frame.gray, self.tile_levels), self.tile_stride, self.tile_levels))
+    
+    def _tile_defect_probabilities(self, frame):
+        """Score every tile with the same rule as the global analysis"""
+        cmats = glcm.window_sums(self._tile_cells(frame), self.tile_size // self.tile_stride)
+        cmats = cmats + np.swapaxes(cmats, -1, -2)
+        haralick = glcm.haralick_from_cooccurrence(cmats, DEFECT_FEATURES).mean(axis=2)
+        glcm.to_full_scale(haralick, DEFECT_FEATURES, self.tile_levels)
+        
+        return self.calculate_defect_probability(*np.moveaxis(haralick, -1, 0))
+    
     def calculate_defect_probability(self, contrast, correlation, energy, homogeneity):
         """Calculate probability of defect based on texture features"""
         # Higher contrast often indicates defects
-        contrast_score = min(contrast / 1000, 1.0)
+        contrast_score = np.minimum(contrast / 1000, 1.0)
         
         # Lower energy often indicates defects
-        energy_score = 1.0 - min(energy * 100, 1.0)
+        energy_score = 1.0 - np.minimum(energy * 100, 1.0)
         
         # Lower homogeneity often indicates defects
-        homogeneity_score = 1.0 - min(homogeneity * 2, 1.0)
+        homogeneity_score = 1.0 - np.minimum(homogeneity * 2, 1.0)
         
         # Weighted combination
         defect_prob = (0.5 * contrast_score + 0.3 * energy_score + 0.2 * homogeneity_score)
         return defect_prob
     
     def compute_lbp_features(self, image, radius=3, points=24):
-        """Compute Local Binary Pattern features"""
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        
-        # Compute LBP image
-        lbp = mt.features.lbp(gray, radius, points)
-        
-        # Compute LBP histogram
-        hist, _ = np.histogram(lbp, bins=points+2, range=(0, points+2))
-        hist = hist.astype("float")
-        hist /= (hist.sum() + 1e-7)  # Normalize
+        """Rotation-invariant uniform LBP histogram (points + 2 bins per scale).
         
-        return hist
+        radius and points may be sequences to concatenate several scales.
+        """
+        frame = FrameContext.wrap(image)
+        key = ('lbp', tuple(np.atleast_1d(radius).tolist()), tuple(np.atleast_1d(points).tolist()))
+        return frame.get(key, lambda: lbp.lbp_histogram(frame.gray, radius, points))
     
     def detect_texture_anomalies(self, image):
         """Detect texture anomalies using multiple methods"""
-        haralick_features = self.extract_haralick_features(image)
-        lbp_features = self.compute_lbp_features(image)
+        frame = FrameContext.wrap(image)
+        haralick_features = self.extract_haralick_features(frame)
+        lbp_features = self.compute_lbp_features(frame)
         
         # Combine features
         combined_features = np.concatenate([haralick_features, lbp_features])
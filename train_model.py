@@ -1,23 +1,19 @@
 # scripts/train_model.py
 #!/usr/bin/env python3
 
-import pickle
+import argparse
 import numpy as np
-from sklearn.svm import SVC
-from sklearn.preprocessing import StandardScaler
 import os
 from config import Config
+from src.defect_classifier import DefectClassifier, BACKENDS
+from src.model_artifact import save_model_artifact
 
-def train_sample_model():
-    """Train a sample defect classification model with synthetic data"""
-    print("Training defect classification model...")
-    
+def make_training_data(n_samples=1000, seed=42):
+    """Synthetic (features, labels) for the four severity classes"""
     # Create sample training data (in real scenario, this would come from labeled defects)
-    np.random.seed(42)
+    np.random.seed(seed)
     
     # Generate synthetic features for different defect types
-    n_samples = 1000
-    
     # GOOD products: low edge density, low texture variation
     good_features = np.column_stack([
         np.random.uniform(0.0, 0.2, n_samples//4),  # edge_density
@@ -62,31 +58,33 @@ def train_sample_model():
     X = np.vstack([good_features, minor_features, major_features, critical_features])
     y = ['GOOD'] * len(good_features) + ['MINOR'] * len(minor_features) + \
         ['MAJOR'] * len(major_features) + ['CRITICAL'] * len(critical_features)
+    return X, y
+
+def train_sample_model(backend=None):
+    """Train a sample defect classification model with synthetic data"""
+    print("Training defect classification model...")
     
-    # Train SVM classifier
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(X)
+    X, y = make_training_data()
     
-    svm_classifier = SVC(probability=True, random_state=42)
-    svm_classifier.fit(X_scaled, y)
+    classifier = DefectClassifier(backend)
+    classifier.train_classifier(X, y)
     
     # Create models directory if it doesn't exist
     os.makedirs(Config.MODEL_PATH, exist_ok=True)
     
-    # Save the trained model and scaler
-    model_data = {
-        'svm_classifier': svm_classifier,
-        'scaler': scaler,
-        'feature_names': ['edge_density', 'contrast', 'correlation', 'energy', 'homogeneity', 'defect_probability']
-    }
-    
-    with open(os.path.join(Config.MODEL_PATH, 'svm_classifier.pkl'), 'wb') as f:
-        pickle.dump(model_data, f)
+    # Save a versioned artifact; the app loads the newest one at startup
+    model_path = save_model_artifact(classifier, Config.MODEL_PATH,
+                                     {'training_samples': len(X), 'source': 'synthetic'})
     
     print("Model training completed!")
-    print(f"Model saved to: {os.path.join(Config.MODEL_PATH, 'svm_classifier.pkl')}")
+    print(f"Model saved to: {model_path}")
+    print(f"Backend: {classifier.backend}")
     print(f"Training samples: {len(X)}")
     print(f"Classes: {set(y)}")
 
 if __name__ == '__main__':
-    train_sample_model()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Train the defect severity model')
+    parser.add_argument('--backend', choices=BACKENDS, help='model backend (default: Config.CLASSIFIER_BACKEND)')
+    args = parser.parse_args()
+    
+    train_sample_model(args.backend)
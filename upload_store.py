@@ -0,0 +1,55 @@
+# src/upload_store.py
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+class UploadStore:
+    def __init__(self, upload_folder, max_workers=1):
+        self.upload_folder = upload_folder
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.pending = {}
+        self.lock = threading.Lock()
+        os.makedirs(self.upload_folder, exist_ok=True)
+
+    def path_for(self, data, extension='jpg'):
+        """Content-addressed path: identical uploads map to the same file"""
+        digest = hashlib.sha256(data).hexdigest()
+        return os.path.join(self.upload_folder, f"{digest}.{extension.lower()}")
+
+    def save(self, data, extension='jpg'):
+        """Queue an upload for writing and return its final path immediately"""
+        image_path = self.path_for(data, extension)
+
+        with self.lock:
+            if image_path in self.pending or os.path.exists(image_path):
+                return image_path
+            self.pending[image_path] = self.executor.submit(self._write, image_path, data)
+
+        return image_path
+
+    def _write(self, image_path, data):
+        """Write to a temporary file and rename so readers never see partial images"""
+        temp_path = f"{image_path}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, image_path)
+        except Exception as e:
+            print(f"Error saving upload {image_path}: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        finally:
+            with self.lock:
+                self.pending.pop(image_path, None)
+
+    def flush(self):
+        """Wait for every queued write to finish"""
+        with self.lock:
+            futures = list(self.pending.values())
+        for future in futures:
+            future.result()
+
+    def shutdown(self):
+        """Flush queued writes and stop the writer thread"""
+        self.executor.shutdown(wait=True)